@@ -5,6 +5,8 @@ Character 数据库管理 UI
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json, sys, os
+import queue, threading
+from bisect import bisect_left
 #from dao import CharacterDao, updateDb, dumpSql, dumpJson
 from init_database import import_from_json
 
@@ -17,7 +19,16 @@ from dao import dumpSql, updateDb
 
 class CharacterManagerUI:
     """Character 管理 UI 类"""
-    
+
+    # 列表每页加载的数量，滚动到底部附近时加载下一页
+    PAGE_SIZE = 200
+    # 列表显示的列
+    LIST_COLUMNS = ("id", "name", "attack_power", "health_points", "speed")
+    # 后台加载时轮询结果的间隔（毫秒）
+    POLL_INTERVAL = 30
+    # 搜索框停止输入多久后再查询（毫秒）
+    SEARCH_DELAY = 250
+
     def __init__(self, root):
         self.root = root
         self.root.title("Character 数据库管理")
@@ -26,6 +37,22 @@ class CharacterManagerUI:
         # 初始化数据访问对象
         #self.dao = CharacterDao()
         self.control = CharacterControl()
+
+        # 列表状态：{角色ID: 显示的值}，按ID升序的角色ID列表
+        self._rows = {}
+        self._order = []
+        # 每次刷新加一，丢弃过期的后台加载结果
+        self._generation = 0
+        self._results = queue.Queue()
+        self._loading = False
+        self._polling = False
+        # 数据库中是否还有未加载的角色
+        self._has_more = True
+        # 本次加载读取到的角色ID
+        self._seen = set()
+        # 当前的筛选条件，参照 CharacterDao.filter_clause
+        self._filters = {}
+        self._search_after = None
         
         # 创建 UI 组件
         self.create_widgets()
@@ -49,6 +76,27 @@ class CharacterManagerUI:
         # 左侧列表框架
         list_frame = ttk.LabelFrame(main_frame, text="Character 列表", padding="5")
         list_frame.grid(row=0, column=0, rowspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 5))
+
+        # 搜索栏：名称关键字、价格、速度（可填 2-5 表示范围）、羁绊，输入停止后自动查询
+        search_frame = ttk.Frame(list_frame)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        self.search_var = tk.StringVar()
+        self.price_var = tk.StringVar()
+        self.speed_var = tk.StringVar()
+        self.fetter_var = tk.StringVar()
+        ttk.Label(search_frame, text="搜索").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_var, width=14).pack(side=tk.LEFT, padx=2)
+        ttk.Label(search_frame, text="价格").pack(side=tk.LEFT)
+        ttk.Combobox(search_frame, textvariable=self.price_var, width=4,
+                     values=[""] + [str(i) for i in range(1, 7)]).pack(side=tk.LEFT, padx=2)
+        ttk.Label(search_frame, text="速度").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.speed_var, width=5).pack(side=tk.LEFT, padx=2)
+        ttk.Label(search_frame, text="羁绊").pack(side=tk.LEFT)
+        self.fetter_combo = ttk.Combobox(search_frame, textvariable=self.fetter_var, width=8)
+        self.fetter_combo.pack(side=tk.LEFT, padx=2)
+        self.load_fetter_options()
+        for var in (self.search_var, self.price_var, self.speed_var, self.fetter_var):
+            var.trace_add("write", self.on_search_changed)
         
         # Character 列表
         self.tree = ttk.Treeview(list_frame, columns=("ID", "Name", "ATK", "HP", "SPD"), show="headings", height=20)
@@ -64,16 +112,17 @@ class CharacterManagerUI:
         self.tree.column("HP", width=60)
         self.tree.column("SPD", width=60)
         
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         self.tree.bind('<<TreeviewSelect>>', self.on_select)
         
         # 滚动条
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.scrollbar = scrollbar
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
         
         list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
+        list_frame.rowconfigure(1, weight=1)
         
         # 右侧按钮框架
         button_frame = ttk.Frame(main_frame)
@@ -83,7 +132,7 @@ class CharacterManagerUI:
         ttk.Button(button_frame, text="新增列", command=self.add_column).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="编辑", command=self.edit_character).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="删除", command=self.delete_character).pack(side=tk.LEFT, padx=2)
-        ttk.Button(button_frame, text="刷新", command=self.refresh_list).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="刷新", command=self.reload_list).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="导入 JSON", command=import_from_json).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="导出 JSON", command=self.export_json).pack(side=tk.LEFT, padx=2)
         
@@ -98,22 +147,171 @@ class CharacterManagerUI:
         self.detail_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
     
     def refresh_list(self):
-        """刷新 character 列表"""
-        # 清空列表
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # 加载数据
-        #characters = self.dao.read_all()
-        characters = self.control.get_all_characters()
-        for char in characters:
-            self.tree.insert("", tk.END, values=(
-                char.get('id', ''),
-                char.get('name', ''),
-                char.get('attack_power', ''),
-                char.get('health_points', ''),
-                char.get('speed', '')
-            ))
+        """
+        刷新 character 列表（按当前的筛选条件）
+        在后台线程中按页重新读取已加载的范围，读取结果通过 root.after 回到界面线程，只更新有变化的行
+        """
+        self._generation += 1
+        self._has_more = True
+        self._seen = set()
+        target = max(self.PAGE_SIZE, len(self._order))
+        self._start_loading(0, target, full=True)
+
+    def reload_list(self):
+        """刷新按钮：先清空查询缓存，再刷新列表，数据库被其他程序修改后也能看到最新内容"""
+        self.control.clear_cache()
+        self.load_fetter_options()
+        self.refresh_list()
+
+    def load_fetter_options(self):
+        """读取羁绊列表作为羁绊筛选的候选项，羁绊编辑器新增或删除羁绊后刷新即可看到"""
+        fetter_ids = sorted({f.get("id") for f in FetterControl().get_all_fetters() if f.get("id")})
+        self.fetter_combo["values"] = [""] + fetter_ids
+
+    def on_search_changed(self, *args):
+        """搜索条件变化时重新计时，停止输入 SEARCH_DELAY 毫秒后才查询"""
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(self.SEARCH_DELAY, self.apply_search)
+
+    @staticmethod
+    def parse_range(text):
+        """
+        解析数值筛选条件："3" → 3，"2-5" → (2, 5)，"3-" → (3, None)，空或无效返回 None
+        """
+        text = text.strip()
+        try:
+            if "-" in text:
+                low, high = (part.strip() for part in text.split("-", 1))
+                if not low and not high:
+                    return None
+                return (int(low) if low else None, int(high) if high else None)
+            return int(text) if text else None
+        except ValueError:
+            return None
+
+    def apply_search(self):
+        """按搜索栏的条件刷新列表"""
+        self._search_after = None
+        filters = {
+            "name": self.search_var.get().strip() or None,
+            "price": self.parse_range(self.price_var.get()),
+            "speed": self.parse_range(self.speed_var.get()),
+            "fetter": self.fetter_var.get().strip() or None,
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if filters != self._filters:
+            self._filters = filters
+            self.refresh_list()
+
+    def load_more(self):
+        """加载下一页"""
+        if self._loading or not self._has_more:
+            return
+        after_id = self._order[-1] if self._order else 0
+        self._start_loading(after_id, self.PAGE_SIZE, full=False)
+
+    def on_tree_scroll(self, first, last):
+        """列表滚动时更新滚动条，接近底部时加载下一页"""
+        self.scrollbar.set(first, last)
+        if float(last) > 0.9:
+            self.load_more()
+
+    def _start_loading(self, after_id, target, full):
+        self._loading = True
+        worker = threading.Thread(
+            target=self._load_pages, args=(self._generation, after_id, target, full, dict(self._filters)), daemon=True
+        )
+        worker.start()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_INTERVAL, self._poll_results)
+
+    def _load_pages(self, generation, after_id, target, full, filters):
+        """
+        后台线程：读取 after_id 之后的 target 个角色，每页放入结果队列
+        界面控件只能在界面线程中修改，这里不直接操作 Treeview
+        """
+        loaded = 0
+        exhausted = False
+        failed = False
+        try:
+            while loaded < target:
+                limit = min(self.PAGE_SIZE, target - loaded)
+                page = self.control.get_character_page(after_id, limit, self.LIST_COLUMNS, filters)
+                if page is None:
+                    failed = True
+                    break
+                if page:
+                    self._results.put(("page", generation, page))
+                    loaded += len(page)
+                    after_id = page[-1].get("id")
+                if len(page) < limit:
+                    exhausted = True
+                    break
+        except Exception as e:
+            # 后台线程里抛出只会打印线程的 traceback，这里记录错误并通知界面线程读取失败
+            print("Error loading character pages:", e)
+            failed = True
+        finally:
+            self._results.put(("done", generation, (full, after_id if loaded else None, exhausted, failed)))
+
+    def _poll_results(self):
+        """界面线程：把后台读取的结果应用到列表"""
+        try:
+            while True:
+                kind, generation, payload = self._results.get_nowait()
+                if generation != self._generation:
+                    continue
+                if kind == "page":
+                    self._apply_page(payload)
+                else:
+                    self._finish_loading(*payload)
+        except queue.Empty:
+            pass
+        if self._loading:
+            self.root.after(self.POLL_INTERVAL, self._poll_results)
+        else:
+            self._polling = False
+
+    def _apply_page(self, page):
+        """插入新角色，更新有变化的角色"""
+        for char in page:
+            char_id = char.get("id")
+            values = tuple(char.get(c, '') for c in self.LIST_COLUMNS)
+            self._seen.add(char_id)
+            old = self._rows.get(char_id)
+            if old is None:
+                idx = bisect_left(self._order, char_id)
+                self._order.insert(idx, char_id)
+                self.tree.insert("", idx, iid=str(char_id), values=values)
+            elif old != values:
+                self.tree.item(str(char_id), values=values)
+            self._rows[char_id] = values
+
+    def _finish_loading(self, full, last_id, exhausted, failed=False):
+        """
+        一次加载结束：完整刷新时删除已读取范围内不再存在的角色
+        :param last_id: 本次读取到的最后一个角色ID，没有读取到角色时为 None
+        :param exhausted: 是否已经读到最后一个角色
+        :param failed: 读取是否出错；出错时不知道哪些角色已经不存在，保留列表中已有的行
+        """
+        if full and not failed:
+            for char_id in list(self._order):
+                beyond = last_id is not None and char_id > last_id
+                if char_id not in self._seen and (exhausted or not beyond):
+                    self._remove_row(char_id)
+        self._seen = set()
+        if not failed:
+            self._has_more = not exhausted
+        self._loading = False
+        if failed:
+            messagebox.showerror("错误", "读取角色列表失败，列表未更新，请稍后刷新重试。")
+
+    def _remove_row(self, char_id):
+        self._order.remove(char_id)
+        del self._rows[char_id]
+        self.tree.delete(str(char_id))
     
     def on_select(self, event):
         """选择 character 时显示详情"""
@@ -42,6 +42,19 @@ class CharacterControl:
             print("Error getting characters by price:", e)
             return []
 
+    def get_character_page(self, after_id=0, limit=100, columns=None, filters=None):
+        """
+        分页获取角色信息，按ID升序
+        :param filters: 筛选条件 {"name", "price", "speed", "fetter"}
+        :return: 角色列表；读取出错时返回 None，与没有更多角色的空列表区分
+        """
+        try:
+            res = self.char_service.select_character_page(after_id, limit, columns, filters)
+            return res
+        except Exception as e:
+            print("Error getting character page:", e)
+            return None
+
     def add_character(self, character: dict):
         """
         添加新角色
@@ -117,6 +130,12 @@ class CharacterControl:
         except Exception as e:
             print("Error dumping JSON:", e)
 
+    def clear_cache(self):
+        """
+        清空查询缓存，之后的读取直接查询数据库，用于显示其他程序对数据库的修改
+        """
+        service.cache.clear()
+
 class FetterControl:
     def __init__(self):
         self.fetter_service : service.FetterService = service.FetterService()
@@ -143,6 +162,17 @@ class FetterControl:
             print("Error getting fetter by ID:", e)
             return {}
 
+    def search_fetters(self, keyword):
+        """
+        按关键字查找羁绊
+        """
+        try:
+            res = self.fetter_service.search_fetters(keyword)
+            return res
+        except Exception as e:
+            print("Error searching fetters:", e)
+            return []
+
     def insert_fetter(self, fetter: dict):
         """
         插入新羁绊
@@ -186,5 +216,11 @@ class FetterControl:
             print("Error dumping JSON:", e)
             return False
 
+    def clear_cache(self):
+        """
+        清空查询缓存，之后的读取直接查询数据库，用于显示其他程序对数据库的修改
+        """
+        service.cache.clear()
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -5,6 +5,7 @@
 import sqlite3
 import json
 import os
+import functools
 from pathlib import Path
 
 # 获取当前文件所在目录
@@ -16,6 +17,42 @@ MAPPER_PATH = BASE_DIR / "mapper.json"
 with open(MAPPER_PATH, "r", encoding="utf-8") as f:
     mapper = json.load(f)
 
+# 角色名称全文索引（FTS5 外部内容表，数据来自 Character 表，由触发器同步）
+SEARCH_TABLE = "CharacterSearch"
+# trigram 分词至少需要 3 个字符，更短的关键字用 LIKE 查询
+SEARCH_MIN_LENGTH = 3
+# JSON 列解码结果的缓存条数，同样的内容只解析一次
+JSON_CACHE_SIZE = 1024
+
+@functools.lru_cache(maxsize=JSON_CACHE_SIZE)
+def _parse_json(raw: bytes):
+    text = raw.decode("utf-8").replace("'", "")
+    return json.loads(text) if text else []
+
+def copy_json(value):
+    """
+    复制解码后的 JSON 值，列表和字典逐层复制，其余类型不可变，直接共享
+    """
+    if isinstance(value, list):
+        return [copy_json(v) for v in value]
+    if isinstance(value, dict):
+        return {k: copy_json(v) for k, v in value.items()}
+    return value
+
+def decode_json(raw: bytes):
+    """
+    JSON 文本列的转换器，去掉默认值带的单引号，空值解码为 []
+    解析结果按内容缓存，每次返回一份新的副本，调用方可以原地修改
+    """
+    return copy_json(_parse_json(raw))
+
+# 列转换器，mapper 字段中用 "converter" 指定，读取时由 sqlite3 调用
+CONVERTERS = {
+    "JSON": decode_json,
+}
+for converter_name, converter in CONVERTERS.items():
+    sqlite3.register_converter(converter_name, converter)
+
 def connect_database(db_path=None):
     """
     连接到 SQLite 数据库
@@ -25,7 +62,8 @@ def connect_database(db_path=None):
     if db_path is None:
         db_path = DB_PATH
     
-    conn = sqlite3.connect(db_path)
+    # 开启 PARSE_COLNAMES，select_query 中 "列名 [转换器]" 形式的列会自动解码
+    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_COLNAMES)
     conn.row_factory = sqlite3.Row  # 使查询结果可以像字典一样访问
     return conn
 
@@ -47,7 +85,11 @@ def updateDb(db_path=None):
         with open(sql_file, "r", encoding="utf-8") as f:
             sql_script = f.read()
             cursor.executescript(sql_script)
-    
+
+    # 导入会重建表，同步触发器随表一起被删除，需要重新建立索引
+    for mapper_name in mapper:
+        create_indexes(mapper_name[:-len("Dao")], conn)
+    create_search_index(conn)
     conn.commit()
     conn.close()
 
@@ -64,9 +106,12 @@ def dumpSql(db_path=None, output_dir=None):
         output_dir = SQL_DIR
 
     conn = connect_database(db_path)
-    cursor = conn.cursor()
+    # 全文索引可以由数据重建，不写入导出文件：在内存副本上删除后再导出
+    dump_conn = sqlite3.connect(":memory:")
+    conn.backup(dump_conn)
+    drop_search_index(dump_conn)
 
-    sql_list = conn.iterdump()
+    sql_list = dump_conn.iterdump()
 
     os.makedirs(output_dir, exist_ok=True)
     output_path = Path(output_dir) / "database_dump_new.sql"
@@ -78,6 +123,7 @@ def dumpSql(db_path=None, output_dir=None):
                 f.write(f"DROP TABLE IF EXISTS `{tbl}`;\n")
             f.write(line + "\n")
 
+    dump_conn.close()
     conn.close()
     return True
 
@@ -103,11 +149,21 @@ def update_mapper(table_name="Character"):
         update_query = f"""UPDATE {table_name} SET 
         {', '.join([f"{field} = ?" for field in fields.keys() if field not in primary_keys])} WHERE {' AND '.join([f"{field} = ?" for field in primary_keys])};"""
     insert_query = f"""INSERT INTO {table_name} ({', '.join(fields.keys())}) VALUES ({', '.join(['?' for _ in fields])});"""
+    # 声明了 converter 的列取出时交给对应的转换器；空内容不会传给转换器，NULL 和空字符串都按 [] 处理
+    select_columns = [f"COALESCE(NULLIF({field}, ''), '[]') AS \"{field} [{props['converter']}]\"" if props.get('converter') else field for field, props in fields.items()]
+    select_query = f"""SELECT {', '.join(select_columns)} FROM {table_name}"""
+    # 二级索引：{"索引名": {"columns": [列名, ...], "unique": 是否唯一}}
+    create_index_queries = [
+        f"""CREATE {'UNIQUE ' if props.get('unique') else ''}INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(props['columns'])});"""
+        for index_name, props in aim_mapper.get("indexes", {}).items()
+    ]
     #update_query = f"""UPDATE {table_name} SET {', '.join([f"{field} = ?" for field in fields.keys() if field != 'id'])} WHERE id = ?;"""
 
     aim_mapper["create_table_query"] = create_table_query
     aim_mapper["insert_query"] = insert_query
     aim_mapper["update_query"] = update_query
+    aim_mapper["select_query"] = select_query
+    aim_mapper["create_index_queries"] = create_index_queries
 
     mapper[mapper_name] = aim_mapper
     #print("Updated mapper for", aim_mapper)
@@ -123,9 +179,80 @@ def create_table(table_name):
     mapper_name = f"{table_name}Dao"
     table_mapper = mapper.get(mapper_name, {})
     cursor.execute(table_mapper.get("create_table_query"))
+    create_indexes(table_name, conn)
+    if table_name == "Character":
+        create_search_index(conn)
     conn.commit()
     conn.close()
 
+def create_indexes(table_name, conn):
+    """
+    建立 mapper 中声明的二级索引
+    :param table_name: 表名
+    """
+    table_mapper = mapper.get(f"{table_name}Dao", {})
+    if not table_exists(table_name, conn):
+        return
+    cursor = conn.cursor()
+    for query in table_mapper.get("create_index_queries", []):
+        cursor.execute(query)
+
+def table_exists(table_name, conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE", (table_name,))
+    return cursor.fetchone() is not None
+
+def create_search_index(conn):
+    """
+    建立角色名称全文索引，并按 Character 表重建全文索引的内容
+    当前 SQLite 不支持 FTS5 trigram 分词时不建立，名称查询退化为 LIKE
+    :return: 是否建立了全文索引
+    """
+    cursor = conn.cursor()
+    if not table_exists("Character", conn):
+        cursor.execute(mapper["CharacterDao"]["create_table_query"])
+    try:
+        cursor.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}
+                           USING fts5(name, content='Character', content_rowid='id', tokenize='trigram')""")
+    except sqlite3.OperationalError:
+        return False
+    cursor.executescript(f"""
+        CREATE TRIGGER IF NOT EXISTS character_search_ai AFTER INSERT ON Character BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, name) VALUES (new.id, new.name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS character_search_ad AFTER DELETE ON Character BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS character_search_au AFTER UPDATE OF id, name ON Character BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO {SEARCH_TABLE}(rowid, name) VALUES (new.id, new.name);
+        END;
+    """)
+    cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    return True
+
+def drop_search_index(conn):
+    """
+    删除名称全文索引和同步触发器
+    """
+    cursor = conn.cursor()
+    for trigger in ("character_search_ai", "character_search_ad", "character_search_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    conn.commit()
+
+def search_enabled(conn):
+    """
+    :return: 数据库中是否有名称全文索引
+    """
+    return table_exists(SEARCH_TABLE, conn)
+
+def like_pattern(keyword):
+    """
+    包含关键字的 LIKE 模式，转义 % 和 _，配合 ESCAPE '\\' 使用
+    """
+    return "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
 def drop_table(table_name):
     """
     删除指定表
@@ -163,6 +290,10 @@ class CharacterDao:
         """
         if column_name in self.mapper.get("fields", {}):
             del self.mapper["fields"][column_name]
+            # 删除用到该列的索引
+            indexes = self.mapper.get("indexes", {})
+            for index_name in [name for name, props in indexes.items() if column_name in props.get("columns", [])]:
+                del indexes[index_name]
             update_mapper("Character")
 
     def get_character_count(self, conn):
@@ -191,7 +322,7 @@ class CharacterDao:
         :return: 角色信息列表
         """
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM character")
+        cursor.execute(self.mapper.get("select_query"))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
@@ -202,7 +333,7 @@ class CharacterDao:
         :return: 角色信息字典
         """
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM character WHERE id = ?", (char_id,))
+        cursor.execute(f"{self.mapper.get('select_query')} WHERE id = ?", (char_id,))
         row = cursor.fetchone()
         if row:
             return dict(row)
@@ -215,7 +346,69 @@ class CharacterDao:
         :return: 角色信息列表
         """
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM character WHERE price = ?", (price,))
+        cursor.execute(f"{self.mapper.get('select_query')} WHERE price = ?", (price,))
+        rows = cursor.fetchall()
+        return [dict(row) for row in rows]
+
+    def filter_clause(self, filters, conn):
+        """
+        把筛选条件转换为 WHERE 子句
+        :param filters: {"name": 名称关键字, "price": 价格, "speed": 速度, "fetter": 羁绊ID}，
+                        price / speed 可以是 (最小值, 最大值)，值为 None 的条件忽略
+        :return: (子句列表, 参数列表)
+        """
+        clauses, params = [], []
+        filters = filters or {}
+        for column in ("price", "speed"):
+            value = filters.get(column)
+            if value is None:
+                continue
+            if isinstance(value, (tuple, list)):
+                low, high = value
+                if low is not None:
+                    clauses.append(f"{column} >= ?")
+                    params.append(low)
+                if high is not None:
+                    clauses.append(f"{column} <= ?")
+                    params.append(high)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        fetter = filters.get("fetter")
+        if fetter:
+            clauses.append("id IN (SELECT character_id FROM CharacterFetter WHERE fetter_id = ?)")
+            params.append(fetter)
+        name = (filters.get("name") or "").strip()
+        if name:
+            if len(name) >= SEARCH_MIN_LENGTH and search_enabled(conn):
+                # 作为短语匹配，关键字中的引号需要转义
+                clauses.append(f"id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)")
+                params.append('"' + name.replace('"', '""') + '"')
+            else:
+                clauses.append("name LIKE ? ESCAPE '\\'")
+                params.append(like_pattern(name))
+        return clauses, params
+
+    def select_character_page(self, after_id, limit, conn, columns=None, filters=None):
+        """
+        按ID顺序分页获取角色，从 after_id 之后开始，走主键索引，不需要 OFFSET 扫描前面的行
+        :param after_id: 上一页最后一个角色的ID，第一页传 0
+        :param limit: 每页数量
+        :param columns: 只查询这些列（不解码），默认全部列
+        :param filters: 筛选条件，参照 filter_clause
+        :return: 角色信息列表
+        """
+        if columns:
+            unknown = [c for c in columns if c not in self.mapper.get("fields", {})]
+            if unknown:
+                raise ValueError(f"Unknown columns: {unknown}")
+            select = f"SELECT {', '.join(columns)} FROM character"
+        else:
+            select = self.mapper.get("select_query")
+        clauses, params = self.filter_clause(filters, conn)
+        where = " AND ".join(["id > ?"] + clauses)
+        cursor = conn.cursor()
+        cursor.execute(f"{select} WHERE {where} ORDER BY id LIMIT ?", (after_id, *params, limit))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
@@ -332,6 +525,18 @@ class FetterDao:
             return [dict(row) for row in rows]
         return None
 
+    def search_fetters(self, keyword, conn):
+        """
+        按名称或描述中的关键字查找羁绊
+        :param keyword: 关键字
+        :return: 羁绊信息列表
+        """
+        pattern = like_pattern(keyword)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM fetter WHERE id LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\'", (pattern, pattern))
+        rows = cursor.fetchall()
+        return [dict(row) for row in rows]
+
     def get_ralated_characters(self, fetter_id, conn):
         """
         根据羁绊ID获取关联角色信息
@@ -399,6 +604,111 @@ class CharacterFetterDao:
         rows = cursor.fetchall()
         return [dict(row).get("fetter_id") for row in rows]
 
+def _mapper_only(dao_class):
+    """
+    只带 mapper 的 DAO 实例，不执行 __init__ 中的 update_mapper 和 create_table
+    """
+    dao = dao_class.__new__(dao_class)
+    dao.mapper = mapper.get(dao_class.__name__, {})
+    return dao
+
+def is_full_scan(detail):
+    """
+    查询计划的一行是否为全表扫描；全文索引虚拟表的 "SCAN ... VIRTUAL TABLE INDEX" 是索引查询，不算
+    """
+    return detail.startswith("SCAN") and " VIRTUAL TABLE INDEX " not in detail
+
+def explain_queries(db_path=None):
+    """
+    用示例参数调用每个 DAO 方法，打印实际执行的 SQL 和 EXPLAIN QUERY PLAN
+    以只读方式打开数据库，在内存副本上执行，不修改数据库文件和 mapper.json
+    :param db_path: 数据库文件路径
+    :return: [(DAO 方法名, SQL, 查询计划行列表)]
+    """
+    # 不调用 DAO 的 __init__：它会重写 mapper.json 并在默认数据库上建表，这里直接使用已加载的 mapper
+    char_dao, fetter_dao, char_fetter_dao = (_mapper_only(cls) for cls in (CharacterDao, FetterDao, CharacterFetterDao))
+    source = sqlite3.connect(f"{Path(db_path or DB_PATH).resolve().as_uri()}?mode=ro", uri=True)
+    conn = sqlite3.connect(":memory:")
+    source.backup(conn)
+    source.close()
+    conn.row_factory = sqlite3.Row
+    # 在副本上补齐 mapper 声明的索引和名称全文索引，和 DAO 初始化后的数据库一致
+    for table_name in ("Character", "Fetter", "CharacterFetter"):
+        create_indexes(table_name, conn)
+    create_search_index(conn)
+
+    cursor = conn.cursor()
+    char = dict(cursor.execute("SELECT * FROM character ORDER BY id LIMIT 1").fetchone() or {})
+    fetter = dict(cursor.execute("SELECT * FROM fetter LIMIT 1").fetchone() or {})
+    char_id = char.get("id", 1)
+    fetter_id = fetter.get("id", "")
+    fetter_key = (fetter_id, fetter.get("numofpeople", 0))
+    char_values = [char.get(field) for field in char_dao.mapper.get("fields", {})]
+    fetter_values = [fetter.get(field) for field in fetter_dao.mapper.get("fields", {})]
+
+    calls = [
+        ("CharacterDao.get_character_count", lambda: char_dao.get_character_count(conn)),
+        ("CharacterDao.get_next_id", lambda: char_dao.get_next_id(conn)),
+        ("CharacterDao.select_all_characters", lambda: char_dao.select_all_characters(conn)),
+        ("CharacterDao.select_character_by_id", lambda: char_dao.select_character_by_id(char_id, conn)),
+        ("CharacterDao.select_character_by_price", lambda: char_dao.select_character_by_price(char.get("price", 1), conn)),
+        ("CharacterDao.select_character_page", lambda: char_dao.select_character_page(0, 100, conn)),
+        ("CharacterDao.select_character_page", lambda: char_dao.select_character_page(
+            0, 100, conn, filters={"name": char.get("name", ""), "price": (1, 3), "speed": char.get("speed"), "fetter": fetter_id})),
+        ("CharacterDao.get_related_fetters", lambda: char_dao.get_related_fetters(char_id, conn)),
+        ("CharacterDao.update_character", lambda: char_dao.update_character(char_id, char_values[1:], conn)),
+        ("CharacterDao.delete_character", lambda: char_dao.delete_character(char_id, conn)),
+        ("CharacterDao.insert_character", lambda: char_dao.insert_character([None] + char_values[1:], conn)),
+        ("FetterDao.select_all_fetters", lambda: fetter_dao.select_all_fetters(conn)),
+        ("FetterDao.select_all_fetter_id", lambda: fetter_dao.select_all_fetter_id(conn)),
+        ("FetterDao.select_fetter_by_id", lambda: fetter_dao.select_fetter_by_id(fetter_id, conn)),
+        ("FetterDao.search_fetters", lambda: fetter_dao.search_fetters(fetter_id, conn)),
+        ("FetterDao.get_ralated_characters", lambda: fetter_dao.get_ralated_characters(fetter_id, conn)),
+        ("FetterDao.update_fetter", lambda: fetter_dao.update_fetter(fetter_key, fetter_values[2:], conn)),
+        ("FetterDao.delete_fetter", lambda: fetter_dao.delete_fetter(*fetter_key, conn)),
+        ("FetterDao.insert_fetter", lambda: fetter_dao.insert_fetter(fetter_values, conn)),
+        ("CharacterFetterDao.get_fetters_by_char_id", lambda: char_fetter_dao.get_fetters_by_char_id(char_id, conn)),
+        ("CharacterFetterDao.delete_character_fetter_by_char_id", lambda: char_fetter_dao.delete_character_fetter_by_char_id(char_id, conn)),
+        ("CharacterFetterDao.delete_character_fetter_by_fetter_id", lambda: char_fetter_dao.delete_character_fetter_by_fetter_id(fetter_id, conn)),
+        ("CharacterFetterDao.insert_character_fetter", lambda: char_fetter_dao.insert_character_fetter([char_id, fetter_id], conn)),
+    ]
+
+    # trace 回调拿到的是代入参数后的 SQL，可以直接 EXPLAIN；只保留增删改查语句
+    statements = []
+    conn.set_trace_callback(statements.append)
+    results = []
+    for name, call in calls:
+        statements.clear()
+        try:
+            call()
+        except sqlite3.Error as e:
+            print(f"{name}: {e}")
+            continue
+        # 触发器执行时同一条语句会被重复回调，按顺序去重
+        for sql in dict.fromkeys(s for s in statements if s.split(None, 1)[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE")):
+            conn.set_trace_callback(None)
+            plan = [tuple(row) for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            conn.set_trace_callback(statements.append)
+            results.append((name, sql, plan))
+    conn.set_trace_callback(None)
+    conn.close()
+
+    for name, sql, plan in results:
+        print(f"{name}\n    {' '.join(sql.split())}")
+        depth = {0: 0}
+        for node_id, parent, _, detail in plan:
+            depth[node_id] = depth.get(parent, 0) + 1
+            flag = "    <- 全表扫描" if is_full_scan(detail) else ""
+            print(f"    {'  ' * depth[node_id]}{detail}{flag}")
+    return results
+
 if __name__ == "__main__":
-    dumpSql()
-    pass
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="导出数据库，或查看 DAO 查询的执行计划")
+    parser.add_argument("--explain", action="store_true", help="打印每个 DAO 查询的 EXPLAIN QUERY PLAN")
+    parser.add_argument("--db", default=None, help="数据库文件路径")
+    args = parser.parse_args()
+    if args.explain:
+        explain_queries(args.db)
+    else:
+        dumpSql(args.db)
\ No newline at end of file
@@ -17,6 +17,9 @@ from dao import dumpSql, updateDb
 class FetterManagerUI:
     """Fetter 管理 UI 类"""
 
+    # 搜索框停止输入多久后再查询（毫秒）
+    SEARCH_DELAY = 250
+
     def __init__(self, root):
         self.root = root
         self.root.title("Fetter 数据库管理")
@@ -24,6 +27,7 @@ class FetterManagerUI:
 
         # 控制层
         self.control = FetterControl()
+        self._search_after = None
 
         # 创建 UI
         self.create_widgets()
@@ -44,20 +48,28 @@ class FetterManagerUI:
         list_frame = ttk.LabelFrame(main_frame, text="Fetter 列表", padding="5")
         list_frame.grid(row=0, column=0, rowspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 5))
 
+        # 搜索栏：按名称或描述中的关键字筛选，输入停止后自动查询
+        search_frame = ttk.Frame(list_frame)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        self.search_var = tk.StringVar()
+        ttk.Label(search_frame, text="搜索").pack(side=tk.LEFT)
+        ttk.Entry(search_frame, textvariable=self.search_var, width=24).pack(side=tk.LEFT, padx=2, fill=tk.X, expand=True)
+        self.search_var.trace_add("write", self.on_search_changed)
+
         self.tree = ttk.Treeview(list_frame, columns=("ID", "Variants"), show="headings", height=30)
         self.tree.heading("ID", text="名称 ID")
         self.tree.heading("Variants", text="人数变体 (numofpeople)")
         self.tree.column("ID", width=160)
         self.tree.column("Variants", width=160)
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         self.tree.bind('<<TreeviewSelect>>', self.on_select)
 
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
         self.tree.configure(yscrollcommand=scrollbar.set)
 
         list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
+        list_frame.rowconfigure(1, weight=1)
 
         # 右侧按钮
         button_frame = ttk.Frame(main_frame)
@@ -66,7 +78,7 @@ class FetterManagerUI:
         ttk.Button(button_frame, text="新建", command=self.create_fetter).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="编辑", command=self.edit_fetter).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="删除", command=self.delete_fetter).pack(side=tk.LEFT, padx=2)
-        ttk.Button(button_frame, text="刷新", command=self.refresh_list).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="刷新", command=self.reload_list).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="导入 JSON", command=import_from_json).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="导出 JSON", command=self.export_json).pack(side=tk.LEFT, padx=2)
 
@@ -79,12 +91,27 @@ class FetterManagerUI:
         self.detail_text = scrolledtext.ScrolledText(detail_frame, width=80, height=30, wrap=tk.WORD)
         self.detail_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
+    def on_search_changed(self, *args):
+        """搜索关键字变化时重新计时，停止输入 SEARCH_DELAY 毫秒后才查询"""
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(self.SEARCH_DELAY, self.apply_search)
+
+    def apply_search(self):
+        self._search_after = None
+        self.refresh_list()
+
+    def reload_list(self):
+        """刷新按钮：先清空查询缓存，再刷新列表，数据库被其他程序修改后也能看到最新内容"""
+        self.control.clear_cache()
+        self.refresh_list()
+
     def refresh_list(self):
-        """刷新羁绊列表，左侧只显示同名羁绊一次，Variants 列显示可用 numofpeople 列表"""
+        """刷新羁绊列表（按搜索关键字筛选），左侧只显示同名羁绊一次，Variants 列显示可用 numofpeople 列表"""
         for item in self.tree.get_children():
             self.tree.delete(item)
 
-        fetters = self.control.get_all_fetters()
+        fetters = self.control.search_fetters(self.search_var.get().strip())
         # fetters expected to be list of dicts with keys: id, numofpeople, description
         grouped = {}
         for f in fetters:
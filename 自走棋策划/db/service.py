@@ -1,10 +1,85 @@
 
 from uuid6 import uuid7
-import json, sys, os
+import json, sys, os, threading
 
 # 添加当前目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import dao as dao
+
+class ReadCache:
+    """
+    读穿透缓存：按 (分区, 参数) 缓存查询结果，写操作按分区或单个参数失效
+    进程内所有 Service 共用一份；绕过 Service 直接修改数据库后需要调用 clear()
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        # 分区每次失效版本号加一，用来丢弃失效前开始、失效后才读完的结果
+        self._versions = {}
+
+    def get(self, namespace, key, loader):
+        """
+        :param loader: 未命中时调用的查询函数
+        :return: 查询结果的副本，JSON 列的列表和字典也逐层复制，调用方修改不会影响缓存
+        """
+        with self._lock:
+            entries = self._data.get(namespace, {})
+            if key in entries:
+                return _copy_result(entries[key])
+            version = self._versions.get(namespace, 0)
+        value = loader()
+        with self._lock:
+            if self._versions.get(namespace, 0) == version:
+                self._data.setdefault(namespace, {})[key] = value
+        return _copy_result(value)
+
+    def invalidate(self, namespace, key=None):
+        """
+        :param key: 只失效这一条，为 None 时失效整个分区
+        """
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            if key is None:
+                self._data.pop(namespace, None)
+            else:
+                self._data.get(namespace, {}).pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            for namespace in self._data:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            self._data.clear()
+
+def _copy_result(value):
+    return dao.copy_json(value)
+
+def _char_key(char_id):
+    """
+    角色缓存的键，界面传入的ID可能是字符串；无法转换时返回 None，查询时不走缓存，失效时按整个分区处理
+    """
+    try:
+        return int(char_id)
+    except (TypeError, ValueError):
+        return None
+
+def _freeze(value):
+    """
+    把筛选条件等参数转换为可以作为缓存键的形式
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+# 缓存分区：单个角色按ID、角色列表类查询、羁绊查询、角色表列名
+CHARACTER = "character"
+CHARACTERS = "characters"
+FETTERS = "fetters"
+COLUMNS = "columns"
+
+cache = ReadCache()
+
 class CharacterService:
     def __init__(self):
         self.char_dao : dao.CharacterDao = dao.CharacterDao()
@@ -15,15 +90,12 @@ class CharacterService:
         获取所有角色信息
         :return: 角色信息列表
         """
+        return cache.get(CHARACTERS, ("all",), self._select_all_characters)
+
+    def _select_all_characters(self):
         conn = dao.connect_database()
         res = self.char_dao.select_all_characters(conn)
         for char in res:
-            for k, v in char.items():
-                if k in ['weapon', 'avaliable_location', 'hate_matrix']:
-                    if v:
-                        char[k] = json.loads(v.replace("'", ''))
-                    else:
-                        char[k] = []
             char["fetters"] = self.char_fetter_dao.get_fetters_by_char_id(char.get("id"), conn)
         conn.close()
         return res
@@ -34,14 +106,14 @@ class CharacterService:
         :param char_id: 角色ID
         :return: 角色信息字典
         """
+        key = _char_key(char_id)
+        if key is None:
+            return self._select_character_by_id(char_id)
+        return cache.get(CHARACTER, key, lambda: self._select_character_by_id(char_id))
+
+    def _select_character_by_id(self, char_id):
         conn = dao.connect_database()
         res = self.char_dao.select_character_by_id(char_id, conn)
-        for k, v in res.items():
-            if k in ['weapon', 'avaliable_location', 'hate_matrix']:
-                if v:
-                    res[k] = json.loads(v.replace("'", ''))
-                else:
-                    res[k] = []
         res["fetters"] = self.char_fetter_dao.get_fetters_by_char_id(res.get("id"), conn)
         conn.close()
         return res
@@ -52,19 +124,40 @@ class CharacterService:
         :param price: 角色价格
         :return: 角色信息列表
         """
+        return cache.get(CHARACTERS, ("price", price), lambda: self._select_character_by_price(price))
+
+    def _select_character_by_price(self, price):
         conn = dao.connect_database()
         res = self.char_dao.select_character_by_price(price, conn)
         for char in res:
-            for k, v in char.items():
-                if k in ['weapon', 'avaliable_location', 'hate_matrix']:
-                    if v:
-                        char[k] = json.loads(v.replace("'", ''))
-                    else:
-                        char[k] = []
             char["fetters"] = self.char_fetter_dao.get_fetters_by_char_id(char.get("id"), conn)
         conn.close()
         return res
 
+    def select_character_page(self, after_id=0, limit=100, columns=None, filters=None):
+        """
+        分页获取角色信息
+        :param after_id: 上一页最后一个角色的ID，第一页传 0
+        :param limit: 每页数量
+        :param columns: 只查询这些列（不解码 JSON 列、不查询羁绊），默认返回完整的角色信息
+        :param filters: 筛选条件 {"name", "price", "speed", "fetter"}，参照 CharacterDao.filter_clause
+        :return: 角色信息列表，按ID升序
+        """
+        key = ("page", after_id, limit, _freeze(columns), _freeze(filters))
+        return cache.get(CHARACTERS, key, lambda: self._select_character_page(after_id, limit, columns, filters))
+
+    def _select_character_page(self, after_id, limit, columns, filters):
+        conn = dao.connect_database()
+        try:
+            res = self.char_dao.select_character_page(after_id, limit, conn, columns, filters)
+            if columns:
+                return res
+            for char in res:
+                char["fetters"] = self.char_fetter_dao.get_fetters_by_char_id(char.get("id"), conn)
+            return res
+        finally:
+            conn.close()
+
     def insert_character(self, character: dict):
         """
         插入新角色
@@ -80,6 +173,8 @@ class CharacterService:
             else:
                 default_value = self.char_dao.mapper.get("fields").get(field).get("default", None)
             value = character.get(field, default_value)
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False)
             values.append(value)
         cid = self.char_dao.insert_character(values, conn)
 
@@ -96,6 +191,7 @@ class CharacterService:
 
         conn.commit()
         conn.close()
+        cache.invalidate(CHARACTERS)
         return
 
     def update_character(self, char_id, updates: dict):
@@ -128,6 +224,7 @@ class CharacterService:
             self.char_fetter_dao.insert_character_fetter(char_fetter_values, conn)
         conn.commit()
         conn.close()
+        self._invalidate_character(char_id)
         return True
 
     def insert_column(self, column: dict):
@@ -156,6 +253,7 @@ class CharacterService:
 
         conn.commit()
         conn.close()
+        self._invalidate_columns()
 
 
     def delete_character(self, char_id):
@@ -168,6 +266,7 @@ class CharacterService:
 
         conn.commit()
         conn.close()
+        self._invalidate_character(char_id)
 
     def delete_column(self, column_name):
         """
@@ -187,6 +286,7 @@ class CharacterService:
             self.insert_character(char, conn)
         conn.commit()
         conn.close()
+        self._invalidate_columns()
 
     def get_next_character_id(self):
         """
@@ -200,10 +300,28 @@ class CharacterService:
     
     def get_all_columns(self):
         """"""
+        return cache.get(COLUMNS, ("all",), self._get_all_columns)
+
+    def _get_all_columns(self):
         res = list(self.char_dao.mapper.get("fields").keys())
         res.append("fetters")
         return res
 
+    def _invalidate_character(self, char_id):
+        """
+        角色被修改或删除：失效这个角色和所有列表类查询
+        """
+        cache.invalidate(CHARACTER, _char_key(char_id))
+        cache.invalidate(CHARACTERS)
+
+    def _invalidate_columns(self):
+        """
+        角色表结构变化：所有角色查询的结果形状都变了
+        """
+        cache.invalidate(COLUMNS)
+        cache.invalidate(CHARACTER)
+        cache.invalidate(CHARACTERS)
+
     def dumpJson(self):
         """
         导出 JSON 文件
@@ -224,6 +342,9 @@ class FetterService:
         获取所有羁绊信息
         :return: 羁绊信息列表
         """
+        return cache.get(FETTERS, ("all",), self._get_all_fetters)
+
+    def _get_all_fetters(self):
         conn = dao.connect_database()
         res = self.fetter_dao.select_all_fetters(conn)
         conn.close()
@@ -235,11 +356,30 @@ class FetterService:
         :param fetter_id: 羁绊ID
         :return: 羁绊信息字典
         """
+        return cache.get(FETTERS, ("id", fetter_id), lambda: self._get_fetter_by_id(fetter_id))
+
+    def _get_fetter_by_id(self, fetter_id):
         conn = dao.connect_database()
         res = self.fetter_dao.select_fetter_by_id(fetter_id, conn)
         conn.close()
         return res
     
+    def search_fetters(self, keyword):
+        """
+        按名称或描述中的关键字查找羁绊
+        :param keyword: 关键字，为空时返回全部羁绊
+        :return: 羁绊信息列表
+        """
+        if not keyword:
+            return self.get_all_fetters()
+        return cache.get(FETTERS, ("search", keyword), lambda: self._search_fetters(keyword))
+
+    def _search_fetters(self, keyword):
+        conn = dao.connect_database()
+        res = self.fetter_dao.search_fetters(keyword, conn)
+        conn.close()
+        return res
+
     def insert_fetter(self, fetter: dict):
         """
         插入新羁绊
@@ -263,6 +403,7 @@ class FetterService:
 
         conn.commit()
         conn.close()
+        cache.invalidate(FETTERS)
         return
 
     def update_fetter(self, fetter_key: tuple, updates: dict):
@@ -276,6 +417,7 @@ class FetterService:
         self.fetter_dao.update_fetter(fetter_key, updates_list, conn)
         conn.commit()
         conn.close()
+        cache.invalidate(FETTERS)
         return True
 
     def delete_fetter(self, fetter_key: tuple):
@@ -287,6 +429,7 @@ class FetterService:
         self.fetter_dao.delete_fetter(*fetter_key, conn)
         conn.commit()
         conn.close()
+        cache.invalidate(FETTERS)
         return True
 
     def dumpJson(self):
@@ -0,0 +1,43 @@
+import copy
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+DB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(DB_DIR))
+
+import dao
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    用 sql/ 中的导出文件在临时目录建库
+    默认数据库和 mapper.json 都指向临时目录，创建 DAO、增删列不会修改仓库中的文件
+    """
+    mapper_path = tmp_path / "mapper.json"
+    shutil.copy(dao.MAPPER_PATH, mapper_path)
+    monkeypatch.setattr(dao, "MAPPER_PATH", mapper_path)
+    monkeypatch.setattr(dao, "mapper", copy.deepcopy(dao.mapper))
+    monkeypatch.setattr(dao, "DB_PATH", tmp_path / "test.db")
+    dao.updateDb()
+    yield dao.DB_PATH
+    # service 依赖 uuid6，只在用到 Service 的测试中导入
+    if "service" in sys.modules:
+        sys.modules["service"].cache.clear()
+
+
+@pytest.fixture
+def char_service(db):
+    service = pytest.importorskip("service")
+    service.cache.clear()
+    return service.CharacterService()
+
+
+@pytest.fixture
+def fetter_service(db):
+    service = pytest.importorskip("service")
+    service.cache.clear()
+    return service.FetterService()
@@ -0,0 +1,97 @@
+import pytest
+
+pytest.importorskip("uuid6")
+
+import dao
+
+# 导出文件中已有：1 测试角色1（价格 2，速度 2，武当），2 测试角色2（价格 3，速度 2，武当、峨眉）
+NEW_CHARACTERS = [
+    {"id": None, "name": "青城剑客", "price": 1, "speed": 5, "fetters": ["少林"]},
+    {"id": None, "name": "峨眉女侠", "price": 4, "speed": 3, "fetters": ["峨眉"]},
+    {"id": None, "name": "100%_剑", "price": 5, "speed": 3},
+]
+
+
+@pytest.fixture
+def chars(char_service):
+    for char in NEW_CHARACTERS:
+        char_service.insert_character(dict(char))
+    return char_service
+
+
+def page_ids(char_service, filters=None, after_id=0, limit=100):
+    return [row["id"] for row in char_service.select_character_page(after_id, limit, ["id", "name"], filters)]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({}, [1, 2, 4, 5, 6]),
+    ({"name": "  ", "price": None, "speed": None, "fetter": ""}, [1, 2, 4, 5, 6]),
+    ({"price": 3}, [2]),
+    ({"price": (2, 4)}, [1, 2, 5]),
+    ({"price": [None, 1]}, [4]),
+    ({"speed": 3}, [5, 6]),
+    ({"fetter": "峨眉"}, [2, 5]),
+    ({"fetter": "武当", "price": 3}, [2]),
+    ({"name": "剑客"}, [4]),
+    ({"name": "测试角色"}, [1, 2]),
+    ({"name": "女侠", "speed": (3, 3)}, [5]),
+    ({"name": "%"}, [6]),
+    ({"name": "_"}, [6]),
+    ({"name": "0%_"}, [6]),
+    ({"name": '"剑客"'}, []),
+])
+def test_filters(chars, filters, expected):
+    assert page_ids(chars, filters) == expected
+
+
+def test_pages_follow_id_order(chars):
+    assert page_ids(chars, limit=2) == [1, 2]
+    assert page_ids(chars, after_id=2, limit=2) == [4, 5]
+    assert page_ids(chars, after_id=6, limit=2) == []
+
+
+def test_full_rows_decode_json_and_fetters(chars):
+    row, = chars.select_character_page(4, 1, None, None)
+    assert row["id"] == 5 and row["name"] == "峨眉女侠"
+    assert row["fetters"] == ["峨眉"]
+    assert row["avaliable_location"] == []
+    assert row["hate_matrix"] == [[1, 1, 1], [1, 1, 1], [1, 1, 1]]
+
+
+def test_unknown_column(chars):
+    with pytest.raises(ValueError):
+        chars.select_character_page(0, 10, ["id", "nope"], None)
+
+
+def test_name_filter_uses_search_index(db):
+    conn = dao.connect_database()
+    try:
+        if not dao.search_enabled(conn):
+            pytest.skip("SQLite 不支持 FTS5 trigram 分词")
+        char_dao = dao.CharacterDao()
+        clauses, _ = char_dao.filter_clause({"name": "测试角色"}, conn)
+        assert dao.SEARCH_TABLE in clauses[0]
+        # 不足 SEARCH_MIN_LENGTH 个字符时 trigram 无法匹配，退化为 LIKE
+        clauses, _ = char_dao.filter_clause({"name": "测试"}, conn)
+        assert "LIKE" in clauses[0]
+    finally:
+        conn.close()
+
+
+def test_search_index_follows_writes(chars):
+    chars.update_character(4, {"name": "昆仑剑客", "price": 1, "speed": 5, "fetters": "[]"})
+    assert page_ids(chars, {"name": "青城剑"}) == []
+    assert page_ids(chars, {"name": "昆仑剑"}) == [4]
+    chars.delete_character(4)
+    assert page_ids(chars, {"name": "昆仑剑"}) == []
+
+
+def test_update_db_rebuilds_search_index(db):
+    conn = dao.connect_database()
+    try:
+        if not dao.search_enabled(conn):
+            pytest.skip("SQLite 不支持 FTS5 trigram 分词")
+        rows = conn.execute(f"SELECT rowid FROM {dao.SEARCH_TABLE} WHERE {dao.SEARCH_TABLE} MATCH ?", ('"测试角色"',))
+        assert sorted(row[0] for row in rows) == [1, 2]
+    finally:
+        conn.close()
@@ -0,0 +1,60 @@
+"""
+角色编辑器的后台加载和刷新，不创建窗口，直接调用 CharacterManagerUI 的方法
+"""
+import queue
+import sqlite3
+
+import pytest
+
+pytest.importorskip("uuid6")
+pytest.importorskip("tkinter")
+
+import controller
+from character_ui import CharacterManagerUI
+
+
+def make_ui() -> CharacterManagerUI:
+    ui = object.__new__(CharacterManagerUI)
+    ui.control = controller.CharacterControl()
+    ui._results = queue.Queue()
+    ui.fetter_combo = {}
+    return ui
+
+
+def drain(results: queue.Queue) -> list:
+    items = []
+    while not results.empty():
+        items.append(results.get_nowait())
+    return items
+
+
+def test_load_pages_reports_errors_without_raising(db, monkeypatch, capsys):
+    ui = make_ui()
+
+    def broken(*args):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(ui.control, "get_character_page", broken)
+    ui._load_pages(1, 0, 10, True, {})
+    assert drain(ui._results) == [("done", 1, (True, None, False, True))]
+    assert "database is locked" in capsys.readouterr().out
+
+
+def test_load_pages_puts_pages_then_done(db):
+    ui = make_ui()
+    ui._load_pages(3, 0, 10, True, {})
+    (kind, generation, page), done = drain(ui._results)
+    assert (kind, generation) == ("page", 3)
+    assert [row["id"] for row in page] == [1, 2]
+    assert done == ("done", 3, (True, 2, True, False))
+
+
+def test_reload_list_refreshes_fetter_options(db, monkeypatch):
+    ui = make_ui()
+    monkeypatch.setattr(ui, "refresh_list", lambda: None)
+    ui.load_fetter_options()
+    assert ui.fetter_combo["values"] == ["", "少林", "峨眉", "武当", "炁体源流"]
+    # 其他程序（例如羁绊编辑器）直接修改了数据库
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO Fetter (id, numofpeople, description) VALUES ('丐帮', 2, '略')")
+    ui.reload_list()
+    assert "丐帮" in ui.fetter_combo["values"]
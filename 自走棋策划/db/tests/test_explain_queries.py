@@ -0,0 +1,35 @@
+import pytest
+
+import dao
+
+
+def test_explain_queries_leaves_files_untouched(db, capsys):
+    mapper_before = dao.MAPPER_PATH.read_bytes()
+    db_before = db.read_bytes()
+    results = dao.explain_queries(db)
+    assert dao.MAPPER_PATH.read_bytes() == mapper_before
+    assert db.read_bytes() == db_before
+    # 写入类的方法也在内存副本上执行过
+    names = {name for name, _, _ in results}
+    assert {"CharacterDao.select_character_by_id", "CharacterDao.delete_character", "FetterDao.insert_fetter"} <= names
+    assert "CharacterDao.select_character_by_id" in capsys.readouterr().out
+
+
+def test_lookups_by_key_are_not_full_scans(db):
+    plans = {}
+    for name, _, plan in dao.explain_queries(db):
+        plans.setdefault(name, []).extend(detail for _, _, _, detail in plan)
+    for name in ("CharacterDao.select_character_by_id", "FetterDao.select_fetter_by_id",
+                 "CharacterFetterDao.get_fetters_by_char_id"):
+        assert not any(dao.is_full_scan(detail) for detail in plans[name]), name
+
+
+@pytest.mark.parametrize("detail, expected", [
+    ("SCAN Character", True),
+    ("SCAN c", True),
+    ("SEARCH Character USING INTEGER PRIMARY KEY (rowid=?)", False),
+    ("SCAN CharacterSearch VIRTUAL TABLE INDEX 0:M2", False),
+    ("USE TEMP B-TREE FOR ORDER BY", False),
+])
+def test_is_full_scan(detail, expected):
+    assert dao.is_full_scan(detail) is expected
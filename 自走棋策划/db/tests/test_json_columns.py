@@ -0,0 +1,56 @@
+import pytest
+
+import dao
+
+
+def test_decode_json_returns_copies():
+    raw = b'{"a": [1, [2, 3]], "b": "x"}'
+    first = dao.decode_json(raw)
+    first["a"][1].append(4)
+    first["c"] = 0
+    assert dao.decode_json(raw) == {"a": [1, [2, 3]], "b": "x"}
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (b"", []),
+    (b"'[]'", []),
+    (b"'[[1,1,1],[1,1,1],[1,1,1]]'", [[1, 1, 1], [1, 1, 1], [1, 1, 1]]),
+    ('["武当"]'.encode("utf-8"), ["武当"]),
+])
+def test_decode_json_values(raw, expected):
+    assert dao.decode_json(raw) == expected
+
+
+def test_same_text_is_parsed_once():
+    raw = b'[["only", "once"]]'
+    dao._parse_json.cache_clear()
+    dao.decode_json(raw)
+    dao.decode_json(raw)
+    info = dao._parse_json.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+
+def test_rows_do_not_share_decoded_values(db):
+    conn = dao.connect_database()
+    try:
+        # 导出文件中两个角色的 weapon 文本相同
+        first, second = dao.CharacterDao().select_all_characters(conn)
+    finally:
+        conn.close()
+    assert first["weapon"] == second["weapon"] == []
+    first["weapon"].append("剑")
+    assert second["weapon"] == []
+
+
+def test_cached_results_are_copies(char_service):
+    first = char_service.select_character_by_id(2)
+    first["name"] = "改过"
+    first["fetters"].append("少林")
+    rows = char_service.select_all_characters()
+    rows[0]["fetters"].clear()
+    rows.append({})
+    again = char_service.select_character_by_id(2)
+    assert again["name"] == "测试角色2"
+    assert sorted(again["fetters"]) == sorted(["武当", "峨眉"])
+    assert char_service.select_all_characters() == char_service.select_all_characters()
+    assert char_service.select_all_characters()[0]["fetters"] == ["武当"]
@@ -0,0 +1,118 @@
+"""
+每个写入路径都要让之前缓存的查询结果失效
+写入都通过另一个 Service 实例，缓存在进程内共用
+"""
+import pytest
+
+pytest.importorskip("uuid6")
+
+import controller
+import dao
+import service
+
+
+def character_reads(cs) -> dict:
+    """读取一遍所有角色查询，同时把结果放进缓存"""
+    return {
+        "all": cs.select_all_characters(),
+        "by_id": cs.select_character_by_id(2),
+        "by_price": cs.select_character_by_price(3),
+        "page": cs.select_character_page(0, 10, None, None),
+        "page_columns": cs.select_character_page(0, 10, ["id", "name"], {"fetter": "武当"}),
+        "columns": cs.get_all_columns(),
+    }
+
+
+def fetter_reads(fs) -> dict:
+    return {
+        "all": fs.get_all_fetters(),
+        "by_id": fs.get_fetter_by_id("少林"),
+        "search": fs.search_fetters("略"),
+    }
+
+
+def names(rows) -> list:
+    return [row["name"] for row in rows]
+
+
+@pytest.fixture
+def writer(db):
+    return service.CharacterService()
+
+
+def test_reads_are_cached(char_service):
+    character_reads(char_service)
+    conn = dao.connect_database()
+    conn.execute("UPDATE Character SET name = '改名' WHERE id = 2")
+    conn.commit()
+    conn.close()
+    # 绕过 Service 的修改看不到，直到清空缓存
+    assert names(char_service.select_all_characters()) == ["测试角色1", "测试角色2"]
+    controller.CharacterControl().clear_cache()
+    assert names(char_service.select_all_characters()) == ["测试角色1", "改名"]
+
+
+def test_insert_character(char_service, writer):
+    character_reads(char_service)
+    writer.insert_character({"id": None, "name": "新角色", "price": 3, "fetters": ["武当"]})
+    reads = character_reads(char_service)
+    assert names(reads["all"]) == ["测试角色1", "测试角色2", "新角色"]
+    assert names(reads["by_price"]) == ["测试角色2", "新角色"]
+    assert names(reads["page"]) == ["测试角色1", "测试角色2", "新角色"]
+    assert names(reads["page_columns"]) == ["测试角色1", "测试角色2", "新角色"]
+
+
+def test_update_character(char_service, writer):
+    character_reads(char_service)
+    writer.update_character("2", {"name": "新名字", "price": 5, "fetters": "['少林']"})
+    reads = character_reads(char_service)
+    assert reads["by_id"]["name"] == "新名字"
+    assert reads["by_id"]["fetters"] == ["少林"]
+    assert names(reads["all"]) == ["测试角色1", "新名字"]
+    assert reads["by_price"] == []
+    assert names(reads["page"]) == ["测试角色1", "新名字"]
+    assert names(reads["page_columns"]) == ["测试角色1"]
+
+
+def test_delete_character(char_service, writer):
+    character_reads(char_service)
+    writer.delete_character(2)
+    assert names(char_service.select_all_characters()) == ["测试角色1"]
+    assert char_service.select_character_by_price(3) == []
+    assert names(char_service.select_character_page(0, 10, None, None)) == ["测试角色1"]
+    with pytest.raises(AttributeError):
+        char_service.select_character_by_id(2)
+
+
+def test_insert_column(char_service, writer):
+    character_reads(char_service)
+    writer.insert_column({"name": "rarity", "type": "INTEGER", "default": 1})
+    reads = character_reads(char_service)
+    assert "rarity" in reads["columns"]
+    assert reads["by_id"]["rarity"] == 1
+    assert all(row["rarity"] == 1 for row in reads["all"] + reads["page"])
+
+
+@pytest.mark.xfail(raises=TypeError, strict=True,
+                   reason="delete_column 调用 insert_character 时多传了 conn 参数，删除列目前不可用")
+def test_delete_column(char_service, writer):
+    character_reads(char_service)
+    writer.delete_column("weapon")
+    reads = character_reads(char_service)
+    assert "weapon" not in reads["columns"]
+    assert "weapon" not in reads["by_id"]
+
+
+@pytest.mark.parametrize("write, check", [
+    (lambda fs: fs.insert_fetter({"id": "丐帮", "numofpeople": 2, "description": "略"}),
+     lambda reads: "丐帮" in [f["id"] for f in reads["all"] + reads["search"]]),
+    (lambda fs: fs.update_fetter(("少林", 3), {"description": "金钟罩"}),
+     lambda reads: reads["by_id"][0]["description"] == "金钟罩" and "少林" not in [f["id"] for f in reads["search"]]),
+    (lambda fs: fs.delete_fetter(("少林", 3)),
+     lambda reads: reads["by_id"] is None and "少林" not in [f["id"] for f in reads["all"]]),
+], ids=["insert", "update", "delete"])
+def test_fetter_writes(fetter_service, write, check):
+    fetter_reads(fetter_service)
+    write(service.FetterService())
+    assert check(fetter_reads(fetter_service))
+
@@ -0,0 +1,185 @@
+"""
+battle_cache.py - 战斗结果缓存
+对 GameBoard 做规范化哈希（角色ID、站位、属性、Buff、技能、随机种子），
+并带上角色配置和关键字配置的摘要，修改配置后旧结果不会再被命中；
+结果先查内存 LRU，再查 SQLite 文件，批量模拟中断后可以从磁盘继续
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+
+from util import *
+from entity import Character
+from grid import GameGrid, GameBoard
+from keywords import registry as keyword_registry
+from simulator import attackSimulator, ENGINE_VERSION
+
+BATTLE_ROWS = ["front", "middle", "back"]
+# 缓存文件放在用户缓存目录，不写进源码目录；可用环境变量 BATTLE_CACHE_DB 指定
+USER_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+CACHE_DB_PATH = Path(os.environ.get("BATTLE_CACHE_DB") or USER_CACHE_DIR / "autochess" / "battle_cache.db")
+CHARACTER_CONFIG_PATH = BASE_DIR / 'character_config.json'
+
+
+def configDigest(paths=None) -> str:
+    """
+    影响战斗结果的配置文件内容的摘要：角色配置（含技能）和关键字定义
+    :param paths: 配置文件列表，为空时使用 character_config.json 和关键字注册表的定义文件
+    """
+    if paths is None:
+        paths = [CHARACTER_CONFIG_PATH, keyword_registry.file_path]
+    digest = hashlib.sha1()
+    for path in paths:
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        # 分隔各个文件，避免内容拼接后相同
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _skillState(skill) -> list:
+    info = skill.info
+    return [
+        info["id"],
+        info["type"],
+        info["trigger"],
+        [(c.condi_type, c.param) for c in info["condition"]],
+        [(e.effect_type, e.param, e.mode) for e in info["effect"]],
+    ]
+
+
+def _characterState(char: Character) -> list:
+    """
+    角色影响战斗结果的全部状态，不包含 team_id 等每局随机生成的信息
+    """
+    return [
+        char.getAttr("info.id"),
+        char.attrs["base"],
+        char.attrs["max"],
+        char.attrs["current"],
+        char.attrs["hate_bias_matrix"],
+        [(b.name, b.layer, b.duration, [(e.effect_type, e.param, e.mode) for e in b.effect_list]) for b in char.buffs.buffs],
+        sorted(char.status),
+        sorted((k.id, k.amount) for k in char.keywords),
+        [_skillState(skill) for skill in char.skills],
+    ]
+
+
+def gridState(grid: GameGrid) -> list:
+    return [
+        [_characterState(c) if isinstance(c, Character) else None for c in grid.grid[row_name].entities]
+        for row_name in BATTLE_ROWS
+    ]
+
+
+def boardHash(board: GameBoard, seed=None, config: str = "") -> str:
+    """
+    棋盘的规范化哈希
+    :param board: 对战棋盘
+    :param seed: 战斗使用的随机种子
+    :param config: 配置摘要，参照 configDigest
+    :return: 十六进制哈希字符串
+    """
+    state = [ENGINE_VERSION, config, seed, gridState(board.red_group), gridState(board.blue_group)]
+    return hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def battleResult(board: GameBoard, winner) -> dict:
+    """
+    把战斗结束后的棋盘整理成可缓存的结果
+    :return: {"winner": "RED"/"BLUE"/None, "survivors": [[角色ID, 价格, 剩余生命], ...]}
+    """
+    group = {"RED": board.red_group, "BLUE": board.blue_group}.get(winner)
+    survivors = [
+        [c.getAttr("info.id"), c.getAttr("info.price"), c.getAttr("current.hp")]
+        for c in group.getAliveCharacterList()
+    ] if group is not None else []
+    return {"winner": winner, "survivors": survivors}
+
+
+class BattleCache:
+    """
+    两级战斗结果缓存：内存 LRU + SQLite
+    """
+
+    def __init__(self, db_path=CACHE_DB_PATH, capacity: int = 4096, config: str = None):
+        """
+        :param db_path: SQLite 文件路径，为 None 时只使用内存缓存
+        :param capacity: 内存 LRU 的容量
+        :param config: 配置摘要，为空时在创建缓存时计算 configDigest()
+        """
+        self.config = configDigest() if config is None else config
+        self.capacity = capacity
+        self.lru: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        if db_path is not None:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.conn = sqlite3.connect(db_path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS BattleResult (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+            self.conn.commit()
+
+    def _remember(self, key: str, result: dict):
+        self.lru[key] = result
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.capacity:
+            self.lru.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        result = self.lru.get(key)
+        if result is not None:
+            self.lru.move_to_end(key)
+            self.hits += 1
+            return result
+        if self.conn is not None:
+            row = self.conn.execute("SELECT result FROM BattleResult WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                self._remember(key, result)
+                self.hits += 1
+                return result
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: dict):
+        self._remember(key, result)
+        if self.conn is not None:
+            self.conn.execute("INSERT OR REPLACE INTO BattleResult (key, result) VALUES (?, ?)", (key, json.dumps(result)))
+            self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __str__(self):
+        return f"BattleCache(size={len(self.lru)}, hits={self.hits}, misses={self.misses})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def cachedBattle(board: GameBoard, cache: BattleCache, seed=None) -> dict:
+    """
+    先查缓存，未命中时用给定种子模拟战斗并写入缓存
+    :param board: 对战棋盘，未命中缓存时会被战斗修改
+    :param cache: 战斗结果缓存
+    :param seed: 随机种子，相同棋盘和种子的战斗结果相同
+    :return: battleResult 格式的结果
+    """
+    key = boardHash(board, seed, cache.config)
+    result = cache.get(key)
+    if result is not None:
+        return result
+    # 只在未命中时模拟，恢复全局 random 的状态，调用方之后的随机数与缓存是否命中无关
+    with seededRandom(seed):
+        winner = attackSimulator(board, headless=True)
+    result = battleResult(board, winner)
+    cache.put(key, result)
+    return result
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+战斗与商店热点路径基准
+测量每个用例的 ops/sec 和内存峰值，追加到 benchmarks/history.json，并与上一次记录对比
+
+用法：
+    python benchmarks/bench_hotpath.py [-t 每轮最少秒数] [-r 轮数] [-k 用例名子串] [--no-save]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+DB_DIR = PKG_DIR.parent / "db"
+HISTORY_PATH = Path(__file__).resolve().parent / "history.json"
+
+sys.path.insert(0, str(PKG_DIR))
+
+from util import log, EventManager
+from entity import Character
+from grid import GameGrid, GameBoard
+from game import ShopRow
+from card_pool import CardPool
+from simulator import attackSelector, generateActionList, attackSimulator
+
+log.enabled = False
+
+
+def _board() -> GameBoard:
+    red, blue = GameGrid(), GameGrid()
+    for i, char_id in enumerate(["0002", "0004", "0006", "0003", "0008"]):
+        red.setCharacter(Character.byId(char_id), ["front", "middle", "back"][i % 3])
+    for i, char_id in enumerate(["0005", "0007", "0009", "0010", "0011"]):
+        blue.setCharacter(Character.byId(char_id), ["front", "middle", "back"][i % 3])
+    return GameBoard(red, blue)
+
+
+def benchById():
+    return lambda: Character.byId("0003")
+
+
+def benchGetAttrDotted():
+    char = Character.byId("0003")
+    return lambda: char.getAttr("current.hp")
+
+
+def benchGetAttrSearch():
+    char = Character.byId("0003")
+    return lambda: char.getAttr("name")
+
+
+def benchSetAttr():
+    char = Character.byId("0003")
+    values = [1, 2]
+    state = {"i": 0}
+
+    def run():
+        state["i"] ^= 1
+        char.setAttr("current.hp", values[state["i"]])
+    return run
+
+
+def benchBroadcast():
+    manager = EventManager()
+    for _ in range(8):
+        manager.listeners.setdefault("bench", []).append(lambda **context: None)
+    return lambda: manager.broadcast("bench", character=None, attr="hp", before=1, after=2)
+
+
+def benchAttackSelector():
+    board = _board()
+    char = board.red_group.getCharacterList()[0]
+    return lambda: attackSelector(char, board.blue_group)
+
+
+def benchActionList():
+    board = _board()
+    return lambda: generateActionList(board, draw=False)
+
+
+def benchBattle():
+    board = _board()
+    state = board.snapshot()
+
+    def run():
+        board.restore(state)
+        random.seed(0)
+        attackSimulator(board, headless=True)
+    return run
+
+
+def benchShopRefresh():
+    pool = CardPool(rng=random.Random(0))
+    row = ShopRow(6, pool=pool)
+    return lambda: row.refresh(3)
+
+
+_services = []
+
+
+def _service():
+    """
+    在临时数据库上创建 CharacterService / FetterService，依赖缺失时返回 None
+    db 用例共用同一份临时数据库，只创建一次
+    """
+    if _services:
+        return _services[0]
+    import tempfile
+    sys.path.insert(0, str(DB_DIR))
+    try:
+        import dao
+        import service
+    except ImportError as e:
+        print(f"跳过 db 用例：{e}")
+        _services.append(None)
+        return None
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    dao.DB_PATH = db_path
+    dao.updateDb(db_path)
+    _services.append((service.CharacterService(), service.FetterService(), service.cache))
+    return _services[0]
+
+
+def _serviceCase(index: int, query, cached: bool):
+    """
+    :param index: 0 为 CharacterService，1 为 FetterService
+    :param query: 以 Service 为参数的查询
+    :param cached: 为 False 时每次调用前清空查询缓存，测量的是实际查询数据库的开销
+    """
+    services = _service()
+    if services is None:
+        return None
+    target, cache = services[index], services[2]
+    if cached:
+        return lambda: query(target)
+
+    def uncached():
+        cache.clear()
+        return query(target)
+    return uncached
+
+
+def benchServiceAll(cached: bool = False):
+    return _serviceCase(0, lambda s: s.select_all_characters(), cached)
+
+
+def benchServiceById(cached: bool = False):
+    return _serviceCase(0, lambda s: s.select_character_by_id(1), cached)
+
+
+def benchServiceFetters(cached: bool = False):
+    return _serviceCase(1, lambda s: s.get_all_fetters(), cached)
+
+
+BENCHMARKS = {
+    "Character.byId": benchById,
+    "Entity.getAttr(dotted)": benchGetAttrDotted,
+    "Entity.getAttr(search)": benchGetAttrSearch,
+    "Character.setAttr": benchSetAttr,
+    "EventManager.broadcast": benchBroadcast,
+    "attackSelector": benchAttackSelector,
+    "generateActionList": benchActionList,
+    "attackSimulator": benchBattle,
+    "ShopRow.refresh": benchShopRefresh,
+    "CharacterService.select_all_characters": benchServiceAll,
+    "CharacterService.select_character_by_id": benchServiceById,
+    "FetterService.get_all_fetters": benchServiceFetters,
+    "CharacterService.select_all_characters(cached)": lambda: benchServiceAll(cached=True),
+    "CharacterService.select_character_by_id(cached)": lambda: benchServiceById(cached=True),
+    "FetterService.get_all_fetters(cached)": lambda: benchServiceFetters(cached=True),
+}
+
+
+def measure(fn, min_time: float = 0.2, rounds: int = 3) -> dict:
+    """
+    测量一个用例
+    :param fn: 无参调用的用例
+    :param min_time: 每轮最少运行的秒数
+    :param rounds: 轮数，取最快的一轮
+    :return: {"ops_per_sec": 每秒次数, "peak_kib": 单次调用的内存峰值(KiB)}
+    """
+    # 估算每轮的调用次数
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops_per_sec": 1 / best if best > 0 else float("inf"), "peak_kib": peak / 1024}
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PKG_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def loadHistory(path=HISTORY_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def saveHistory(history: list, path=HISTORY_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def runBenchmarks(keyword: str = None, min_time: float = 0.2, rounds: int = 3) -> dict:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if keyword and keyword not in name:
+            continue
+        fn = setup()
+        if fn is None:
+            continue
+        results[name] = measure(fn, min_time, rounds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="战斗与商店热点路径基准")
+    parser.add_argument("-t", "--min-time", type=float, default=0.2, help="每轮最少运行的秒数")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="轮数，取最快的一轮")
+    parser.add_argument("-k", "--keyword", help="只运行名称包含该子串的用例")
+    parser.add_argument("--no-save", action="store_true", help="不写入 history.json")
+    args = parser.parse_args()
+
+    history = loadHistory()
+    previous = history[-1]["results"] if history else {}
+    results = runBenchmarks(args.keyword, args.min_time, args.rounds)
+
+    print(f"{'benchmark':<50}{'ops/sec':>14}{'peak KiB':>10}{'change':>10}")
+    for name, res in results.items():
+        change = ""
+        if name in previous and previous[name]["ops_per_sec"]:
+            change = f"{(res['ops_per_sec'] / previous[name]['ops_per_sec'] - 1) * 100:+.1f}%"
+        print(f"{name:<50}{res['ops_per_sec']:>14,.0f}{res['peak_kib']:>10.1f}{change:>10}")
+
+    if not args.no_save:
+        history.append({
+            "commit": _commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "results": results,
+        })
+        saveHistory(history)
+        print(f"已追加到 {HISTORY_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准：在全新的子进程中测量导入模拟核心模块的冷启动时间
+
+用法：
+    python benchmarks/bench_startup.py [-n 次数] [模块 ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ["simulator", "entity", "game"]
+
+_SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def importTime(module: str, repeat: int = 10) -> list[float]:
+    """
+    在新的解释器中导入模块 repeat 次
+    :return: 每次导入的耗时（毫秒）
+    """
+    res = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(module=module)],
+            cwd=PKG_DIR, capture_output=True, text=True, check=True,
+        )
+        res.append(float(out.stdout.strip().splitlines()[-1]))
+    return res
+
+
+def benchStartup(modules: list[str] = None, repeat: int = 10) -> dict:
+    """
+    :return: {模块名: {"min": 毫秒, "median": 毫秒, "max": 毫秒}}
+    """
+    modules = modules if modules else DEFAULT_MODULES
+    # 预热一次，保证 .pyc 已生成，测到的是加载而不是编译
+    subprocess.run([sys.executable, "-c", "import " + ", ".join(modules)], cwd=PKG_DIR, check=True)
+    res = {}
+    for module in modules:
+        times = importTime(module, repeat)
+        res[module] = {"min": min(times), "median": statistics.median(times), "max": max(times)}
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟核心模块冷启动导入耗时")
+    parser.add_argument("modules", nargs="*", help=f"要测量的模块，默认 {' '.join(DEFAULT_MODULES)}")
+    parser.add_argument("-n", "--repeat", type=int, default=10, help="每个模块测量的次数")
+    args = parser.parse_args()
+
+    res = benchStartup(args.modules, args.repeat)
+    print(f"{'module':<12}{'min(ms)':>10}{'median(ms)':>12}{'max(ms)':>10}")
+    for module, t in res.items():
+        print(f"{module:<12}{t['min']:>10.2f}{t['median']:>12.2f}{t['max']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+card_pool.py - 商店卡池：按商店等级的品质概率抽卡，同一对局内所有商店共享一个有限卡池
+"""
+import random
+import threading
+from util import *
+
+
+class FenwickTree:
+    """
+    树状数组，维护一组非负权重的前缀和
+    单点修改、前缀求和、按权重定位均为 O(log n)
+    """
+    def __init__(self, weights: list = None):
+        weights = weights if weights is not None else []
+        self.size = len(weights)
+        self.tree = [0] * (self.size + 1)
+        self.weights = [0] * self.size
+        for i, w in enumerate(weights):
+            self.add(i, w)
+
+    def add(self, idx: int, delta: int):
+        """
+        修改第 idx 个元素的权重（0-based）
+        :param idx: 元素下标
+        :param delta: 权重变化量
+        """
+        self.weights[idx] += delta
+        i = idx + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, idx: int) -> int:
+        """
+        前 idx 个元素的权重和
+        """
+        res = 0
+        i = idx
+        while i > 0:
+            res += self.tree[i]
+            i -= i & -i
+        return res
+
+    def total(self) -> int:
+        return self.prefix(self.size)
+
+    def find(self, target: int) -> int:
+        """
+        找到最小的下标 idx，使前 idx + 1 个元素的权重和大于 target
+        :param target: 0 <= target < total()
+        :return: 元素下标（0-based）
+        """
+        pos = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class CardPool:
+    """
+    卡池类，记录每个角色剩余的卡牌数量
+    抽卡时先按商店等级的品质概率选出品质（价格），再在该品质内按剩余数量加权抽取角色
+    """
+
+    # 商店等级 -> 各品质（价格 1~6）的出现权重
+    TIER_ODDS = {
+        0: [100, 0, 0, 0, 0, 0],
+        1: [80, 20, 0, 0, 0, 0],
+        2: [60, 25, 14, 1, 0, 0],
+        3: [37, 30, 20, 3, 0, 0],
+        4: [20, 40, 29, 10, 1, 0],
+        5: [10, 27, 40, 20, 3, 0],
+        6: [10, 15, 30, 35, 10, 1],
+        7: [5, 10, 20, 40, 20, 5],
+    }
+    # 商店的最高等级
+    MAX_GRADE = max(TIER_ODDS)
+
+    # 品质（价格） -> 每个角色在卡池中的卡牌数量
+    TIER_COPIES = {1: 29, 2: 22, 3: 18, 4: 12, 5: 10, 6: 9}
+
+    _default = None
+
+    def __init__(self, char_configs: dict = None, copies: dict = None, rng: random.Random = None):
+        """
+        初始化卡池
+        :param char_configs: {角色ID: 角色配置}，默认读取 character_config.json
+        :param copies: {品质: 每个角色的卡牌数量}，默认使用 TIER_COPIES
+        :param rng: 随机数生成器，传入带种子的 random.Random 可复现抽卡结果
+        """
+        if char_configs is None:
+            char_configs = loadJsonConfig(BASE_DIR / 'character_config.json')
+        copies = copies if copies is not None else CardPool.TIER_COPIES
+        self.rng = rng if rng is not None else random.Random()
+        self._lock = threading.Lock()
+
+        tier_ids = {}
+        for char_id, config in char_configs.items():
+            tier = config.get("price", 1)
+            tier_ids.setdefault(tier, []).append(str(char_id).zfill(4))
+
+        # 品质 -> 角色ID列表 / 品质 -> 树状数组
+        self.tier_ids: dict = {}
+        self.tier_trees: dict = {}
+        # 角色ID -> (品质, 下标)
+        self.index: dict = {}
+        for tier, ids in sorted(tier_ids.items()):
+            ids.sort()
+            self.tier_ids[tier] = ids
+            self.tier_trees[tier] = FenwickTree([copies.get(tier, 0)] * len(ids))
+            for i, char_id in enumerate(ids):
+                self.index[char_id] = (tier, i)
+
+    @classmethod
+    def default(cls) -> "CardPool":
+        """
+        进程内共享的默认卡池，仅用于不需要扣减卡牌的抽取
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def remaining(self, char_id) -> int:
+        """
+        查询某个角色剩余的卡牌数量
+        """
+        char_id = str(char_id).zfill(4)
+        if char_id not in self.index:
+            return 0
+        tier, i = self.index[char_id]
+        return self.tier_trees[tier].weights[i]
+
+    def tierRemaining(self, tier: int) -> int:
+        """
+        查询某个品质剩余的卡牌总数
+        """
+        tree = self.tier_trees.get(tier)
+        return tree.total() if tree is not None else 0
+
+    def _pickTier(self, grade: int):
+        odds = CardPool.TIER_ODDS[max(0, min(grade, CardPool.MAX_GRADE))]
+        weights = [odds[t - 1] if 1 <= t <= len(odds) and self.tierRemaining(t) > 0 else 0 for t in self.tier_ids]
+        if sum(weights) <= 0:
+            # 当前等级可出现的品质都已被抽空
+            return None
+        return self.rng.choices(list(self.tier_ids), weights=weights)[0]
+
+    def draw(self, grade: int = 0, take: bool = True) -> str | None:
+        """
+        按商店等级抽取一个角色ID
+        :param grade: 商店等级
+        :param take: 是否从卡池中扣除这张卡
+        :return: 角色ID，卡池为空时返回 None
+        """
+        with self._lock:
+            tier = self._pickTier(grade)
+            if tier is None:
+                return None
+            tree = self.tier_trees[tier]
+            i = tree.find(self.rng.randrange(tree.total()))
+            if take:
+                tree.add(i, -1)
+            return self.tier_ids[tier][i]
+
+    def drawCharacter(self, grade: int = 0, take: bool = True, events=None):
+        """
+        按商店等级抽取一个角色实例
+        :param events: 角色所属的事件管理器，默认为全局的 em
+        :return: Character 实例，卡池为空时返回 None
+        """
+        from entity import Character
+        char_id = self.draw(grade, take)
+        return Character.byId(char_id, events) if char_id is not None else None
+
+    def take(self, char_id) -> bool:
+        """
+        从卡池中扣除一张指定角色的卡
+        :return: 卡池中没有该角色时返回 False
+        """
+        char_id = str(char_id).zfill(4)
+        with self._lock:
+            if self.remaining(char_id) <= 0:
+                return False
+            tier, i = self.index[char_id]
+            self.tier_trees[tier].add(i, -1)
+            return True
+
+    def putBack(self, char_id) -> bool:
+        """
+        将一张角色卡放回卡池（商店刷新未购买、玩家出售时调用）
+        """
+        char_id = str(char_id).zfill(4)
+        if char_id not in self.index:
+            return False
+        with self._lock:
+            tier, i = self.index[char_id]
+            self.tier_trees[tier].add(i, 1)
+        return True
+
+    def __str__(self):
+        return f"CardPool({ {t: self.tierRemaining(t) for t in self.tier_ids} })"
+
+    def __repr__(self):
+        return self.__str__()
@@ -2,21 +2,41 @@
 effect.py - 实现效果(Effect)、增益/减益(Buff)和增益列表(BuffList)的管理系统
 """
 
-from typing import Tuple, List, Dict, Optional
 from types import SimpleNamespace
 import re
 
+def _always(character, context) -> bool:
+    return True
+
+def _never(character, context) -> bool:
+    return False
+
+def _paramValue(param, key: str, default=0):
+    """
+    条件参数既可以是 {"key": 值} 也可以直接是值
+    """
+    if isinstance(param, dict):
+        return param.get(key, default)
+    return param if param is not None else default
+
+
 class Condition:
 
     TYPE = SimpleNamespace(
         ALWAYS="always",
         CONSUNRG="consume_energy",
         CONSUHP="consume_hp",
+        CONSUHEALTH="consume_health",
         HASSTATU="has_statu",
-        GOTHURT="got_hurt"
+        GOTHURT="got_hurt",
+        DAMAGEABOVE="damage_above",
+        AND="and",
+        OR="or"
     )
     """
     条件类，表示触发效果的条件
+    第一次使用时编译为 predicate(character, context) -> bool 的函数，参数在编译时取出，
+    之后每次检查只是一次函数调用；and / or 条件的 param 为子条件列表
     """
     def __init__(self, condi_type: str, param):
         """
@@ -26,40 +46,128 @@ class Condition:
         """
         self.condi_type = condi_type
         self.param = param
+        self._predicate = None
 
-    def check(self, **context) -> bool:
+    def compile(self):
         """
-        检查条件是否满足
-        :param context: 上下文参数，用于条件判断
-        :return: True表示条件满足，False表示不满足
+        把条件编译成判断函数
+        :return: predicate(character, context) -> bool
         """
+        param = self.param
         match self.condi_type:
             case Condition.TYPE.ALWAYS:
-                return True
+                return _always
             case Condition.TYPE.CONSUNRG:
-                char = context.get("character", None)
-                required_energy = self.param.get("energy", 0)
-                return char.getAttr("current.energy") >= required_energy
-            case Condition.TYPE.CONSUHP:
-                char = context.get("character", None)
-                required_hp = self.param.get("hp", 0)
-                return char.getAttr("current.hp") >= required_hp
+                required_energy = _paramValue(param, "energy")
+                return lambda character, context: character.getAttr("current.energy") >= required_energy
+            case Condition.TYPE.CONSUHP | Condition.TYPE.CONSUHEALTH:
+                required_hp = _paramValue(param, "hp")
+                return lambda character, context: character.getAttr("current.hp") >= required_hp
             case Condition.TYPE.HASSTATU:
-                char = context.get("character", None)
-                statu_name = self.param.get("statu_name", "")
-                return char.hasStatus(statu_name)
+                statu_name = _paramValue(param, "statu_name", "")
+                return lambda character, context: character.hasStatus(statu_name)
             case Condition.TYPE.GOTHURT:
-                char = context.get("character", None)
-                return char.getAttr("current.hp") < char.getAttr("max.hp")
+                return lambda character, context: character.getAttr("current.hp") < character.getAttr("max.hp")
+            case Condition.TYPE.DAMAGEABOVE:
+                # 事件中的伤害大于给定值，用于受伤类事件
+                threshold = _paramValue(param, "damage")
+                return lambda character, context: context["damage"].damage > threshold
+            case Condition.TYPE.AND:
+                return Condition._compileAll([Condition.of(c).predicate for c in param or []])
+            case Condition.TYPE.OR:
+                return Condition._compileAny([Condition.of(c).predicate for c in param or []])
             case _:
-                return False
+                return _never
+
+    @staticmethod
+    def _compileAll(predicates: list):
+        # 常量折叠：去掉恒真的子条件，有恒假的子条件时整体恒假
+        if _never in predicates:
+            return _never
+        predicates = [p for p in predicates if p is not _always]
+        if not predicates:
+            return _always
+        if len(predicates) == 1:
+            return predicates[0]
+        if len(predicates) == 2:
+            first, second = predicates
+            return lambda character, context: first(character, context) and second(character, context)
+
+        def all_of(character, context):
+            for predicate in predicates:
+                if not predicate(character, context):
+                    return False
+            return True
+        return all_of
+
+    @staticmethod
+    def _compileAny(predicates: list):
+        if _always in predicates:
+            return _always
+        predicates = [p for p in predicates if p is not _never]
+        if not predicates:
+            return _never
+        if len(predicates) == 1:
+            return predicates[0]
+
+        def any_of(character, context):
+            for predicate in predicates:
+                if predicate(character, context):
+                    return True
+            return False
+        return any_of
+
+    @property
+    def predicate(self):
+        if self._predicate is None:
+            self._predicate = self.compile()
+        return self._predicate
+
+    def __call__(self, character, context: dict = None) -> bool:
+        """
+        用位置参数检查条件，热点路径使用
+        """
+        return self.predicate(character, context)
+
+    def check(self, **context) -> bool:
+        """
+        检查条件是否满足
+        :param context: 上下文参数，用于条件判断
+        :return: True表示条件满足，False表示不满足
+        """
+        return self.predicate(context.get("character", None), context)
+
+    def isAlways(self) -> bool:
+        return self.predicate is _always
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return Condition.allOf([self, other])
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return Condition.anyOf([self, other])
     
     def __str__(self):
         return f"Condition({self.condi_type}, {self.param})"
     
     def __repr__(self):
         return self.__str__()
+
+    @classmethod
+    def allOf(cls, conditions: list) -> "Condition":
+        return cls(Condition.TYPE.AND, list(conditions))
+
+    @classmethod
+    def anyOf(cls, conditions: list) -> "Condition":
+        return cls(Condition.TYPE.OR, list(conditions))
+
+    @classmethod
+    def of(cls, data) -> "Condition":
+        """
+        Condition 原样返回，字典通过 byDict 创建
+        """
+        return data if isinstance(data, Condition) else cls.byDict(data)
     
+    @classmethod
     def byDict(cls, data: dict) -> "Condition":
         """
         通过字典创建Condition实例
@@ -73,6 +181,13 @@ class Condition:
     
 ALWAYS_CONDITION = Condition(Condition.TYPE.ALWAYS, None)
     
+MODIFY_ATTR_PATTERN = re.compile(
+    r'(?P<attr>[A-Z]+)'          # 1. 属性：任意大写字母串
+    r'(?P<op>[-+=])'             # 2. 方向：+ 增加，- 减少，= 赋值
+    r'(?P<val>0|[1-9]\d*)'       # 3. 数值：非负整数（首位不能为 0），"DMG=0" 用于抵消伤害
+    r'(?:(?P<is_pct>%)(?P<pct_base>[bmr]))?'  # 4. 可选：% 紧跟 b/m/r
+)
+
 class Effect:
     """
     
@@ -98,21 +213,22 @@ class Effect:
         self.effect_type = effect_type
         self.param = param
         self.mode = mode
+        # parse() 的结果，参数不会变化，只解析一次
+        self._info = None
     
     def parse(self):
         """
-        解析效果参数字符串，返回结构化信息
+        解析效果参数字符串，返回结构化信息，结果会被缓存，调用方不要修改
         :return: 解析后的信息字典
         """
+        if self._info is None:
+            self._info = self._parse()
+        return self._info
+
+    def _parse(self):
         match self.effect_type:
             case "modify_attr":
-                pattern = re.compile(
-                    r'(?P<attr>[A-Z]+)'          # 1. 属性：任意大写字母串
-                    r'(?P<op>[+-=])'              # 2. 方向：+ 或 -
-                    r'(?P<val>[1-9]\d*)'         # 3. 数值：正整数（首位不能为 0）
-                    r'(?:(?P<is_pct>%)(?P<pct_base>[bmr]))?'  # 4. 可选：% 紧跟 b/m/r
-                )
-                info = pattern.fullmatch(self.param).groupdict()
+                info = MODIFY_ATTR_PATTERN.fullmatch(self.param).groupdict()
                 info['attr'] = Effect.ATTRS.get(info['attr'], info['attr'].lower())
                 info['is_pct'] = True if info['is_pct'] else False
                 if info['is_pct']:
@@ -146,7 +262,7 @@ class Effect:
         
     @classmethod
     def byDict(cls, data: dict) -> "Effect":
-        return cls(data.get["typs"], data.get["param"], data.get["mode"])
+        return cls(data.get("type", ""), data.get("param", ""), data.get("mode", "self"))
 
 '''class Effect:
     """
@@ -176,7 +292,7 @@ class Effect:
         self.effect_value = _value
         self.effect_type = _type
 
-    def effectInfo(self) -> Tuple[str, float]:
+    def effectInfo(self) -> tuple[str, float]:
         """
         返回效果信息
         :return: (属性名, 效果值) 元组
@@ -245,7 +361,7 @@ class Buff:
     增益/减益类，表示一个可叠加、有持续时间的效果组合
     """
     
-    def __init__(self, name: str, effect_list: List[Effect], max_layer: int = 1, 
+    def __init__(self, name: str, effect_list: list[Effect], max_layer: int = 1, 
                  layer: int = 1, duration: int = -1):
         """
         初始化Buff
@@ -339,7 +455,7 @@ class BuffList:
         """
         初始化空的Buff列表
         """
-        self.buffs: List[Buff] = []
+        self.buffs: list[Buff] = []
     
     def update(self):
         """
@@ -389,12 +505,52 @@ class BuffList:
         # 不存在，添加新Buff
         self.buffs.append(buff)
     
+    def snapshot(self) -> tuple:
+        """
+        记录当前所有Buff及其层数、持续时间
+        :return: ((Buff, 层数, 持续时间), ...)
+        """
+        return tuple((buff, buff.layer, buff.duration) for buff in self.buffs)
+
+    def restore(self, state: tuple):
+        """
+        恢复到 snapshot() 记录的状态
+        :param state: snapshot() 的返回值
+        """
+        self.buffs = [buff for buff, _, _ in state]
+        for buff, layer, duration in state:
+            buff.layer = layer
+            buff.duration = duration
+
     def __str__(self):
         return f"BuffList({len(self.buffs)} buffs: {[str(b) for b in self.buffs]})"
     
     def __repr__(self):
         return self.__str__()
 
+def effectTargets(mode: str, character, context: dict) -> list:
+    """
+    按效果的生效模式找到作用对象
+    :param mode: self / target / source / damage
+    :param character: 技能或关键字的持有者
+    :param context: 触发事件的参数
+    """
+    match mode:
+        case "self":
+            targets = [character]
+        case "target":
+            targets = [context.get("target")]
+        case "source":
+            damage = context.get("damage")
+            targets = [context.get("source", damage.source if damage is not None else None)]
+        case "damage":
+            targets = [context.get("damage")]
+        case _:
+            # @todo randomEnemy / allAllies 等需要棋盘信息的模式
+            targets = []
+    return [t for t in targets if t is not None]
+
+
 class Skill:
     """
     技能类，表示角色的技能
@@ -434,6 +590,23 @@ class Skill:
             "condition": [Condition.byDict(c) for c in info.get("condition", [])] if info else [ALWAYS_CONDITION],
             "effect": [Effect.byDict(e) for e in info.get("effect", [])] if info else []
         }
+        # 全部条件合并编译成一个判断函数
+        self.predicate = Condition.allOf(self.info["condition"]).predicate
+
+    @property
+    def trigger(self) -> str:
+        return self.info["trigger"]
+
+    def isPositive(self) -> bool:
+        return self.info["type"] == "positive"
+
+    def check(self, character, context: dict = None) -> bool:
+        """
+        按顺序检查全部条件，遇到不满足的条件立即返回
+        :param character: 技能持有者
+        :param context: 触发事件的参数
+        """
+        return self.predicate(character, context if context is not None else {})
 
     def canUse(self, character) -> bool:
         """
@@ -441,12 +614,25 @@ class Skill:
         :param character: 角色对象
         :return: True表示可以使用，False表示不可以
         """
-        if self.info["type"] == "positive":
-            for condition in self.info["condition"]:
-                if not condition.check(character=character):
-                    return False
-            return True
-        return False
+        return self.isPositive() and self.check(character)
+
+    def release(self, character, context: dict = None):
+        """
+        释放技能，把每个效果施加到对应的对象上
+        :param character: 技能持有者
+        :param context: 触发事件的参数；以字典传入，onAttrChange 等事件自带的 character 参数不会与持有者冲突
+        """
+        if context is None:
+            context = {}
+        for effect in self.info["effect"]:
+            for target in effectTargets(effect.mode, character, context):
+                target.applyEffect(effect)
+
+    def __str__(self):
+        return f"Skill({self.info['id']}, {self.info['name']}, trigger={self.info['trigger']})"
+
+    def __repr__(self):
+        return self.__str__()
 
 if __name__ == "__main__":
     
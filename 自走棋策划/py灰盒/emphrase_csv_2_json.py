@@ -1,17 +1,76 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+把角色配置表（characters.CSV 或 characters.xlsx）转换为 character_config.json
+
+表格第一行为说明，第二行为字段名，第三行起每行一个角色。
+逐行读取、逐行校验、逐行写入临时文件，字段类型和必填项按 db/mapper.json 中 CharacterDao 的定义检查；
+有错误的行会带行号报告出来，内容没有变化时不改写输出文件。
+
+也可以作为库使用：
+    from emphrase_csv_2_json import convert
+    result = convert('characters.xlsx')
+    for err in result.errors:
+        print(err)
+"""
+import argparse
 import csv
+import filecmp
 import json
+import os
 import sys
+import xml.etree.ElementTree as ET
+import zipfile
+from dataclasses import dataclass, field
 from pathlib import Path
 
-CSV_FILE = Path('characters.CSV')     # 原始文件
-OUT_FILE = Path('character_config.json')    # 输出文件
+BASE_DIR = Path(__file__).resolve().parent
+CSV_FILE = BASE_DIR / 'characters.CSV'              # 原始文件
+XLSX_FILE = BASE_DIR / 'characters.xlsx'
+OUT_FILE = BASE_DIR / 'character_config.json'      # 输出文件
+MAPPER_FILE = BASE_DIR.parent / 'db' / 'mapper.json'
+
+HEADER_ROW = 2          # 第二行当键名
+LIST_FIELDS = {'avaliable_location'}
+MATRIX_FIELDS = {'hate_matrix'}
+# mapper.json 缺失时仍按整数处理的字段
+INT_FIELDS = {'attack_power', 'health_points', 'speed', 'hate_value', 'price', 'energy'}
+
+_XLSX_NS = {
+    'm': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+
+
+@dataclass
+class RowError:
+    """某一行的错误，line 为表格中的行号（从 1 开始）"""
+    line: int
+    column: str
+    message: str
+
+    def __str__(self):
+        where = f'第 {self.line} 行' + (f' {self.column}' if self.column else '')
+        return f'{where}：{self.message}'
+
+
+@dataclass
+class ConvertResult:
+    count: int = 0                              # 写入的角色数
+    errors: list = field(default_factory=list)  # [RowError, ...]
+    changed: bool = False                       # 是否改写了输出文件
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
 
 def split_to_list(raw: str) -> list:
     """把 a;b;c 转成 ['a','b','c']，空串返回空列表。"""
     return [s for s in raw.split(';') if s]
 
+
 def build_matrix(raw: str):
     """9 个数字用 ; 分隔 → 3×3 二维列表。"""
     nums = [int(x) for x in split_to_list(raw)]
@@ -19,48 +78,256 @@ def build_matrix(raw: str):
         raise ValueError('hate_matrix 必须是 9 个数字')
     return [nums[i:i+3] for i in range(0, 9, 3)]
 
-def row_to_dict(headers: list[str], row: list[str]) -> dict:
-    """单行转 dict，按需做类型/格式转换。"""
+
+def parse_int(raw: str) -> int:
+    """整数字段，兼容 Excel 存成 3.0 的数字。"""
+    try:
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        num = float(raw)
+    except ValueError:
+        num = None
+    if num is None or not num.is_integer():
+        raise ValueError(f'{raw!r} 不是整数')
+    return int(num)
+
+
+def load_schema(mapper_path=MAPPER_FILE, dao_name: str = 'CharacterDao') -> dict:
+    """
+    读取 mapper.json 中的字段定义
+    :return: {字段名: {"type": ..., "not_null": ..., ...}}，文件不存在时返回空字典（不做类型检查）
+    """
+    mapper_path = Path(mapper_path)
+    if not mapper_path.exists():
+        return {}
+    with mapper_path.open(encoding='utf-8') as f:
+        return json.load(f).get(dao_name, {}).get('fields', {})
+
+
+def iter_csv_rows(path):
+    """逐行读取 CSV，每行为字符串列表。"""
+    with Path(path).open(encoding='utf-8-sig', newline='') as f:
+        yield from csv.reader(f)
+
+
+def _column_index(ref: str) -> int:
+    """单元格引用 'AB12' → 列下标 27（从 0 开始）。"""
+    idx = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        idx = idx * 26 + ord(ch.upper()) - 64
+    return idx - 1
+
+
+def _first_sheet_path(zf: zipfile.ZipFile, sheet_name: str = None) -> str:
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    sheets = workbook.findall('m:sheets/m:sheet', _XLSX_NS)
+    if sheet_name is not None:
+        sheets = [s for s in sheets if s.get('name') == sheet_name]
+    if not sheets:
+        raise ValueError(f'找不到工作表 {sheet_name}')
+    rel_id = sheets[0].get(f'{{{_XLSX_NS["r"]}}}id')
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.findall('rel:Relationship', _XLSX_NS):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+    raise ValueError(f'工作表 {sheet_name or sheets[0].get("name")} 缺少关联文件')
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> list:
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    tag_si = f'{{{_XLSX_NS["m"]}}}si'
+    tag_t = f'{{{_XLSX_NS["m"]}}}t'
+    tag_rph = f'{{{_XLSX_NS["m"]}}}rPh'
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == tag_si:
+                # 拼音注音（rPh）里的文字不属于单元格内容
+                phonetic = {id(t) for rph in elem.iter(tag_rph) for t in rph.iter(tag_t)}
+                strings.append(''.join(t.text or '' for t in elem.iter(tag_t) if id(t) not in phonetic))
+                elem.clear()
+    return strings
+
+
+def iter_xlsx_rows(path, sheet_name: str = None):
+    """
+    逐行读取 xlsx 的工作表，每行为字符串列表，只依赖标准库
+    :param sheet_name: 工作表名，默认第一个
+    """
+    tag_row = f'{{{_XLSX_NS["m"]}}}row'
+    tag_c = f'{{{_XLSX_NS["m"]}}}c'
+    tag_v = f'{{{_XLSX_NS["m"]}}}v'
+    tag_t = f'{{{_XLSX_NS["m"]}}}t'
+    with zipfile.ZipFile(path) as zf:
+        strings = _shared_strings(zf)
+        with zf.open(_first_sheet_path(zf, sheet_name)) as f:
+            line = 0
+            for _, elem in ET.iterparse(f):
+                if elem.tag != tag_row:
+                    continue
+                # 空行不会出现在 sheetData 里，补齐行号
+                row_no = int(elem.get('r', line + 1))
+                while line + 1 < row_no:
+                    line += 1
+                    yield []
+                line = row_no
+                row = []
+                for cell in elem.iter(tag_c):
+                    col = _column_index(cell.get('r', '')) if cell.get('r') else len(row)
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(tag_t))
+                    else:
+                        v = cell.find(tag_v)
+                        value = v.text if v is not None and v.text is not None else ''
+                        if kind == 's' and value:
+                            value = strings[int(value)]
+                    row += [''] * (col - len(row))
+                    row.append(value)
+                elem.clear()
+                yield row
+
+
+def iter_rows(path, sheet_name: str = None):
+    """按扩展名选择 CSV / xlsx 读取方式。"""
+    if Path(path).suffix.lower() in {'.xlsx', '.xlsm'}:
+        return iter_xlsx_rows(path, sheet_name)
+    return iter_csv_rows(path)
+
+
+def row_to_dict(headers: list[str], row: list[str], schema: dict = None) -> dict:
+    """
+    单行转 dict，按需做类型/格式转换。
+    :raise ValueError: 字段格式错误，args 为 (字段名, 说明)
+    """
+    schema = schema or {}
     out = {}
     for key, val in zip(headers, row):
+        if not key:
+            continue
         val = val.strip()
         if not val:                # 空字段直接跳过
             continue
+        try:
+            # 需要转列表的字段
+            if key in LIST_FIELDS:
+                out[key] = split_to_list(val)
+            # hate_matrix 特殊处理
+            elif key in MATRIX_FIELDS:
+                out[key] = build_matrix(val)
+            # 数值字段
+            elif key in INT_FIELDS or schema.get(key, {}).get('type') == 'INTEGER':
+                out[key] = parse_int(val)
+            # 其余当字符串
+            else:
+                out[key] = val
+        except ValueError as e:
+            raise ValueError(key, str(e)) from None
 
-        # 需要转列表的字段
-        if key in {'avaliable_location'}:
-            out[key] = split_to_list(val)
-        # hate_matrix 特殊处理
-        elif key == 'hate_matrix':
-            out[key] = build_matrix(val)
-        # 数值字段
-        elif key in {'attack_power', 'health_points', 'speed', 'hate_value', 'price', 'energy'}:
-            out[key] = int(val)
-        # 其余当字符串
-        else:
-            out[key] = val
-
-        out['id'] = str(out['id']).zfill(4)  # ID 补零到 4 位
+    for key, info in schema.items():
+        if info.get('not_null') and key not in out:
+            raise ValueError(key, '不能为空')
+    if 'id' not in out:
+        raise ValueError('id', '不能为空')
+    out['id'] = str(out['id']).zfill(4)  # ID 补零到 4 位
     return out
 
-def main():
-    if not CSV_FILE.exists():
-        sys.exit(f'找不到 {CSV_FILE}')
 
-    with CSV_FILE.open(encoding='utf-8-sig') as f:
-        rdr = csv.reader(f)
-        rows = list(rdr)
+def iter_records(rows, schema: dict = None, errors: list = None):
+    """
+    逐行校验，产出 (行号, 角色配置)，出错的行记入 errors 并跳过
+    :param rows: iter_rows() 的结果
+    :param errors: 收集 RowError 的列表
+    """
+    errors = errors if errors is not None else []
+    headers = None
+    seen = {}
+    for line, row in enumerate(rows, start=1):
+        if line < HEADER_ROW:
+            continue
+        if line == HEADER_ROW:
+            headers = [h.strip() for h in row]
+            if 'id' not in headers:
+                errors.append(RowError(line, '', '表头缺少 id 列'))
+                return
+            continue
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            record = row_to_dict(headers, row, schema)
+        except ValueError as e:
+            column, message = e.args if len(e.args) == 2 else ('', str(e))
+            errors.append(RowError(line, column, message))
+            continue
+        if record['id'] in seen:
+            errors.append(RowError(line, 'id', f'与第 {seen[record["id"]]} 行的 ID {record["id"]} 重复'))
+            continue
+        seen[record['id']] = line
+        yield line, record
+    if headers is None:
+        errors.append(RowError(0, '', f'至少需要 {HEADER_ROW} 行（说明+表头）'))
+
+
+def convert(src=CSV_FILE, out=OUT_FILE, schema: dict = None, sheet_name: str = None, strict: bool = True) -> ConvertResult:
+    """
+    转换角色配置表
+    :param src: CSV 或 xlsx 文件
+    :param out: 输出的 JSON 文件
+    :param schema: 字段定义，默认读取 db/mapper.json
+    :param sheet_name: xlsx 的工作表名，默认第一个
+    :param strict: 为 True 时只要有错误就不写出；为 False 时跳过出错的行，写出其余的行
+    """
+    schema = load_schema() if schema is None else schema
+    out = Path(out)
+    result = ConvertResult()
+    tmp_path = out.with_name(out.name + '.tmp')
+    out.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # 与 json.dump(..., indent=2) 的输出格式一致，逐条写入不需要先把整张表读进内存
+        with tmp_path.open('w', encoding='utf-8') as f:
+            f.write('{')
+            for _, record in iter_records(iter_rows(src, sheet_name), schema, result.errors):
+                body = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                f.write(f'{"," if result.count else ""}\n  {json.dumps(record["id"])}: {body}')
+                result.count += 1
+            f.write('\n}' if result.count else '}')
+        if (strict and result.errors) or (out.exists() and filecmp.cmp(tmp_path, out, shallow=False)):
+            return result
+        os.replace(tmp_path, out)
+        result.changed = True
+        return result
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
 
-    if len(rows) < 2:
-        sys.exit('CSV 至少需要两行（说明+表头）')
 
-    headers = rows[1]          # 第二行当键名
-    data = [row_to_dict(headers, row) for row in rows[2:]]  # 从第三行开始是数据
+def main():
+    parser = argparse.ArgumentParser(description='角色配置表转换为 character_config.json')
+    parser.add_argument('src', nargs='?', default=str(CSV_FILE), help='CSV 或 xlsx 文件，默认 characters.CSV')
+    parser.add_argument('-o', '--out', default=str(OUT_FILE), help='输出文件')
+    parser.add_argument('--sheet', default=None, help='xlsx 的工作表名，默认第一个')
+    parser.add_argument('--keep-going', action='store_true', help='跳过出错的行，仍然写出其余的行')
+    args = parser.parse_args()
+
+    if not Path(args.src).exists():
+        sys.exit(f'找不到 {args.src}')
 
-    with OUT_FILE.open('w', encoding='utf-8') as f:
-        json.dump({item['id']: item for item in data}, f, ensure_ascii=False, indent=2)
+    result = convert(args.src, args.out, sheet_name=args.sheet, strict=not args.keep_going)
+    for err in result.errors:
+        print(err, file=sys.stderr)
+    if result.errors and not args.keep_going:
+        sys.exit(f'有 {len(result.errors)} 处错误，未写出 {args.out}')
+    if result.changed:
+        print(f'已生成 {args.out} ，共 {result.count} 条角色记录。')
+    else:
+        print(f'{args.out} 没有变化，共 {result.count} 条角色记录。')
 
-    print(f'已生成 {OUT_FILE} ，共 {len(data)} 条角色记录。')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
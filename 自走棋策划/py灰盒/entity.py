@@ -1,17 +1,23 @@
-import pygame
 from util import *
-from effect import BuffList, Buff, Effect
-from keywords import keywordFactory
+from effect import BuffList, Buff, Effect, Skill
+from keywords import registry as keyword_registry
 
 #from db.service.character_service import * 
 
-class Entity(pygame.sprite.Sprite):
+class Entity:
     """
     实体类，表示游戏中的基本单位
+    纯数据模型，不依赖 pygame；需要绘制时使用 module/character_sprite.py 中的渲染适配器
     """
-    def __init__(self, attrs: dict = None):
-        super().__init__()
+    __slots__ = ("attrs", "events", "__weakref__")
+
+    def __init__(self, attrs: dict = None, events: EventManager = None):
+        """
+        :param attrs: 属性字典
+        :param events: 实体所属对局/战斗的事件管理器，默认为全局的 em
+        """
         self.attrs = attrs if attrs is not None else {}
+        self.events = events if events is not None else em
 
     def setAttr(self, key, value):
         """
@@ -82,14 +88,26 @@ class Entity(pygame.sprite.Sprite):
             raise AttributeError(f"Cannot set attribute '{key}'")
 
     def applyEffect(self, effect: Effect):
-        em.broadcast("onEffectApplied", entity=self, effect=effect)
+        self.events.broadcast("onEffectApplied", entity=self, effect=effect)
         log.console(f"{self} applyEffect called with effect: {effect}")
         
 
-class Damage(Entity):
+class Damage:
     """
     伤害类，表示一次伤害事件
+    只有来源、数值、类型三个字段，不继承 Entity，避免每次攻击都创建嵌套属性字典；
+    保留 getAttr / setAttr 接口，onGetHurt 等监听器和 applyEffect 可以照常修改伤害数值
     """
+    # getAttr / setAttr 可以访问的字段
+    FIELDS = ("source", "damage", "damage_type")
+    # _pooled 标记对象是否在空闲池中，防止重复归还
+    __slots__ = FIELDS + ("_pooled",)
+
+    # 空闲对象池，acquire 优先复用，release 归还；池的大小上限为 POOL_SIZE
+    # 各对局可能在不同线程中运行：只用 list 的 append / pop 这类单步操作，不先检查再取
+    POOL_SIZE = 64
+    _pool: list["Damage"] = []
+
     def __init__(self, source: "Character", damage: int, damage_type: str = "physical"):
         """        
         初始化伤害事件
@@ -101,32 +119,75 @@ class Damage(Entity):
         :param damage_type: 伤害类型
         :type damage_type: str
         """
-        super().__init__()
-        self.addAttr("source", source)
-        self.addAttr("damage", damage)
-        self.addAttr("damage_type", damage_type)
+        self.source = source
+        self.damage = damage
+        self.damage_type = damage_type
+        self._pooled = False
+
+    @classmethod
+    def acquire(cls, source: "Character", damage: int, damage_type: str = "physical") -> "Damage":
+        """
+        从对象池取出一个伤害对象，池为空时新建
+        """
+        try:
+            dmg = cls._pool.pop()
+        except IndexError:
+            return cls(source, damage, damage_type)
+        dmg.source = source
+        dmg.damage = damage
+        dmg.damage_type = damage_type
+        dmg._pooled = False
+        return dmg
+
+    def release(self) -> bool:
+        """
+        把伤害对象归还对象池，归还后不能再使用；监听器不应在事件结束后继续持有伤害对象
+        :return: 对象已经归还过时返回 False，不会被重复放入池中
+        """
+        if self._pooled:
+            return False
+        self._pooled = True
+        self.source = None
+        # 池满时直接丢弃；并发归还时池可能略微超过上限，不影响正确性
+        if len(Damage._pool) < Damage.POOL_SIZE:
+            Damage._pool.append(self)
+        return True
+
+    def getAttr(self, key, value = None):
+        if key in Damage.FIELDS:
+            return getattr(self, key)
+        return value
+
+    def setAttr(self, key, value):
+        if key not in Damage.FIELDS:
+            raise AttributeError(f"Attribute '{key}' not found")
+        setattr(self, key, value)
+        return True
     
     def applyEffect(self, effect):
-        super().applyEffect(effect)
+        events = self.source.events if self.source is not None else em
+        events.broadcast("onEffectApplied", entity=self, effect=effect)
+        log.console(f"{self} applyEffect called with effect: {effect}")
         if effect.effect_type == "modify_attr":
             eff = effect.parse()
             op = eff['op']
             val = int(eff['val'])
             is_pct = eff['is_pct']
             if is_pct:
-                base_value = self.getAttr("damage")
-                val = base_value * val // 100
-            else:
-                val = val
-            current_value = self.getAttr("damage")
+                val = self.damage * val // 100
             match op:
                 case '+':
-                    new_value = current_value + val
+                    self.damage = self.damage + val
                 case '-':
-                    new_value = current_value - val
+                    self.damage = self.damage - val
                 case '=':
-                    new_value = val
-            self.setAttr("damage", new_value)
+                    self.damage = val
+
+    def __str__(self):
+        return f"Damage({self.damage}, {self.damage_type})"
+
+    def __repr__(self):
+        return self.__str__()
 
 ## todo
 ## 重构 Character 类
@@ -136,8 +197,13 @@ class Character(Entity):
     """
     角色类，表示游戏中的棋子
     """
-    def __init__(self, attrs: dict):
-        super().__init__()
+    __slots__ = (
+        "base_attrs", "buffs", "in_game_attrs", "current_attrs", "equipments",
+        "status", "skills", "keywords", "keywords_dict",
+    )
+
+    def __init__(self, attrs: dict, events: EventManager = None):
+        super().__init__(events=events)
         self.addAttr("base.atk", attrs.get("attack_power", 1))
         self.addAttr("base.hp", attrs.get("health_points", 10))
         self.addAttr("base.speed", attrs.get("speed", 1))
@@ -223,11 +289,49 @@ class Character(Entity):
         }
 
         self.status: list = []
-        self.skills: list = []
+        self.skills: list[Skill] = [Skill(info) for info in attrs.get("skills", [])]
 
         self.keywords: list = []
         self.keywords_dict = {}
     
+    def snapshot(self) -> tuple:
+        """
+        记录角色在战斗中会变化的全部状态，只做一层浅拷贝
+        :return: 可传给 restore() 的状态元组，可多次恢复
+        """
+        attrs = self.attrs
+        return (
+            attrs["base"].copy(),
+            attrs["max"].copy(),
+            attrs["current"].copy(),
+            attrs["info"].copy(),
+            self.in_game_attrs.copy(),
+            self.buffs.snapshot(),
+            tuple(self.status),
+            tuple((k, k.snapshot() if hasattr(k, "snapshot") else None) for k in self.keywords),
+            self.keywords_dict.copy(),
+        )
+
+    def restore(self, state: tuple):
+        """
+        恢复到 snapshot() 记录的状态，恢复过程不广播 onAttrChange 事件
+        :param state: snapshot() 的返回值
+        """
+        base, max_attrs, current, info, in_game, buffs, status, keywords, keywords_dict = state
+        attrs = self.attrs
+        attrs["base"] = base.copy()
+        attrs["max"] = max_attrs.copy()
+        attrs["current"] = current.copy()
+        attrs["info"] = info.copy()
+        self.in_game_attrs = in_game.copy()
+        self.buffs.restore(buffs)
+        self.status = list(status)
+        self.keywords = [k for k, _ in keywords]
+        for k, k_state in keywords:
+            if hasattr(k, "restore"):
+                k.restore(k_state)
+        self.keywords_dict = keywords_dict.copy()
+
     def hasStatus(self, status_name: str) -> bool:
         return status_name in self.status
     
@@ -247,9 +351,11 @@ class Character(Entity):
             res = self.getResultofEffect(info)
             attr_bouns = mergeDicts([attr_bouns, res])
 
-        for attr, bonus in attr_bouns.items():
-            current_value = self.getAttr(attr)
-            self.setAttr(attr, current_value + bonus)
+        # 重新计算期间的中间值不单独广播
+        with self.events.batch():
+            for attr, bonus in attr_bouns.items():
+                current_value = self.getAttr(attr)
+                self.setAttr(attr, current_value + bonus)
     # @todo
     def updateInGameAttrs(self):
         effect_dict = self.getEffectDict()
@@ -284,7 +390,7 @@ class Character(Entity):
         before_value = super().getAttr(key)
         if before_value != value:
             super().setAttr(key, value)
-            em.broadcast('onAttrChange', character=self, attr=key, before=before_value, after=value)
+            self.events.broadcast('onAttrChange', character=self, attr=key, before=before_value, after=value)
 
     # delete later
     def getInGameAttr(self, key: str):
@@ -303,7 +409,7 @@ class Character(Entity):
 
     def getAttackDamage(self) -> Damage:
         damage_amount = self.getAttr("current.atk")
-        return Damage(source=self, damage=damage_amount, damage_type="physical")
+        return Damage.acquire(self, damage_amount, "physical")
         
     def getHateValue(self) -> int:
         return self.getAttr("current.hate_value") if self.isAlive() else 0
@@ -345,9 +451,16 @@ class Character(Entity):
             case "modify_attr":
                 eff = effect.parse()
                 res = self.getResultofEffect(eff)
-                current_value = self.getAttr(list(res.keys())[0])
-                for attr, new_value in res.items():
+                for attr, bonus in res.items():
+                    new_value = self.getAttr(attr) + bonus
+                    # 生命和能量不能超过上限
+                    if attr in ("current.hp", "current.energy"):
+                        new_value = min(new_value, self.getAttr("max." + attr.split(".")[1]))
                     self.setAttr(attr, new_value)
+            case "add_statu":
+                self.addStatus(effect.param)
+            case "remove_statu":
+                self.removeStatus(effect.param)
             case _:
                 pass
 
@@ -365,13 +478,13 @@ class Character(Entity):
         return self.getAttr("current.hp") > 0
 
     def getHurt(self, damage: Damage):
-        em.broadcast('beforeGetHurt', target=self, damage=damage)
-        em.broadcast('onGetHurt', target=self, damage=damage)
+        self.events.broadcast('beforeGetHurt', target=self, damage=damage)
+        self.events.broadcast('onGetHurt', target=self, damage=damage)
         current_hp = self.getAttr("current.hp")
-        if damage.getAttr("damage") > 0:
-            log.console(f"{self.getAttr('name')} 受到 {damage.getAttr('damage')} 点{damage.getAttr('damage_type')}伤害！", "DAMAGE")
-            self.setAttr("current.hp", max(0, current_hp - damage.getAttr("damage")))
-            em.broadcast('afterGetHurt', target=self, damage=damage)
+        if damage.damage > 0:
+            log.console(f"{self.getAttr('name')} 受到 {damage.damage} 点{damage.damage_type}伤害！", "DAMAGE")
+            self.setAttr("current.hp", max(0, current_hp - damage.damage))
+            self.events.broadcast('afterGetHurt', target=self, damage=damage)
         
     @staticmethod
     def infoList(char: "Character" = None) -> list[str]:
@@ -399,15 +512,20 @@ class Character(Entity):
             for line in Character.infoList(self):
                 print(line)
         elif type == "pygame" and screen is not None:
-            pass
+            from module.character_sprite import CharacterSprite
+            CharacterSprite(self, position).draw(screen)
 
     def rollInitiative(self):
         self.setInGameAttr("initiative", roll(self.getInGameAttr("max_initiative")))
 
     def addKeyword(self, keyword_name: str):
-        keyword = keywordFactory(keyword_name)(self)
+        keyword = keyword_registry.create(keyword_name, self)
+        if keyword is None:
+            log.console(f"未定义的关键字 {keyword_name}，已忽略。", "WARN")
+            return None
         self.keywords.append(keyword)
         self.keywords_dict[keyword_name] = keyword
+        return keyword
 
     def removeKeyword(self, keyword_instance):
         if keyword_instance in self.keywords:
@@ -415,20 +533,25 @@ class Character(Entity):
             return True
         return False
 
-    def doAct(self):
-        positive_skills = [skill for skill in self.skills if skill.isPositive()]
+    def doAct(self) -> Skill | None:
+        """
+        释放第一个满足条件的主动技能
+        :return: 释放的技能，没有可用技能时返回 None
+        """
         for skill in self.skills:
             if skill.canUse(self):
-                return 
-        pass
+                skill.release(self)
+                self.events.broadcast('onSkillReleased', entity=self, skill=skill)
+                return skill
+        return None
 
     @classmethod
-    def byId(cls, char_id):
+    def byId(cls, char_id, events: EventManager = None):
 
         if not isinstance(char_id, str):
             char_id = str(char_id).zfill(4)
         char_attrs = loadCharacterAttrs(char_id)
-        new_char = Character(char_attrs)
+        new_char = Character(char_attrs, events)
 
         return new_char
     
@@ -436,20 +559,17 @@ class Character(Entity):
         return self.getInGameAttr("speed") + self.getInGameAttr("initiative") < other.getInGameAttr("speed") + other.getInGameAttr("initiative")
 
     @staticmethod
-    def randomCharacter(level = 0):
-        wight_dict = {
-            0: [100, 0, 0, 0, 0, 0],
-            1: [80, 20, 0, 0, 0, 0],
-            2: [60, 25, 14, 1, 0, 0],
-            3: [37, 30, 20, 3, 0, 0],
-            4: [20, 40, 29, 10, 1, 0],
-            5: [10, 27, 40, 20, 3, 0],
-            6: [10, 15, 30, 35, 10, 1],
-            7: [5, 10, 20, 40, 20, 5],
-        }
-        import random
-        char_pool = [1, 2, 3, 4, 5, 6, 7]
-        return Character.byId(random.choice(char_pool))
+    def randomCharacter(level = 0, pool = None, events: EventManager = None):
+        """
+        按商店等级的品质概率随机生成角色
+        :param level: 商店等级
+        :param pool: 卡池，传入时会从卡池中扣除抽到的卡；为空时使用默认卡池且不扣除
+        :param events: 生成角色所属的事件管理器
+        """
+        from card_pool import CardPool
+        if pool is None:
+            return CardPool.default().drawCharacter(level, take=False, events=events)
+        return pool.drawCharacter(level, events=events)
 
 # @todo
 class Equipment:
@@ -1,7 +1,7 @@
 from util import *
 from entity import Character, Entity
 from grid import GameRow, GameGrid, GameBoard
-import uuid
+from card_pool import CardPool
 
 class ShopEntity:
 
@@ -10,9 +10,11 @@ class ShopEntity:
 
 class ShopRow(GameRow):
 
-    def __init__(self, max_length=6):
+    def __init__(self, max_length=6, pool: CardPool = None, events: EventManager = None):
         super().__init__(max_length=max_length)
         self.locked = [False] * self.max_length
+        self.pool = pool
+        self.events = events
         
     def isLocked(self, idx):
         idx -= 1  # Convert to 0-based index
@@ -21,12 +23,18 @@ class ShopRow(GameRow):
         else:
             return False
         
-    def refresh(self):
+    def refresh(self, grade=0):
         for i in range(self.max_length):
             if not self.locked[i]:
-                if self.getCharacterByPosition(i + 1) is not None:
+                old_char = self.getCharacterByPosition(i + 1)
+                if old_char is not None:
                     self.removeCharacterByPosition(i + 1)
-                self.setCharacter(Character.randomCharacter(), i + 1)
+                    # 未购买的卡放回卡池
+                    if self.pool is not None:
+                        self.pool.putBack(old_char.getAttr("info.id"))
+                new_char = Character.randomCharacter(grade, self.pool, self.events)
+                if new_char is not None:
+                    self.setCharacter(new_char, i + 1)
 
     def lock(self, idx):
         self.locked[idx-1] = True
@@ -43,11 +51,21 @@ class ShopRow(GameRow):
 
 class Shop:
 
-    def __init__(self, owner=None):
-        self.characters = ShopRow(6)
+    def __init__(self, owner=None, pool: CardPool = None, events: EventManager = None, refresh: bool = True):
+        """
+        :param refresh: 为 False 时不从卡池抽取初始商品，读档时由存档填充商店
+        """
+        # 同一对局的商店共享同一个卡池，未指定时单独创建一个
+        self.pool = pool if pool is not None else CardPool()
+        # 未指定时使用拥有者的事件管理器
+        if events is None:
+            events = owner.events if owner is not None else em
+        self.events = events
+        self.characters = ShopRow(6, pool=self.pool, events=events)
         self.grade = 0
         self.owner = owner
-        self.characters.refresh()
+        if refresh:
+            self.characters.refresh(self.grade)
 
     def buy(self, idx):
         char = self.characters.getCharacterByPosition(idx)
@@ -56,8 +74,7 @@ class Shop:
                 self.owner.setAttr("money", self.owner.getAttr("money") - char.getAttr("info.price"))
                 self.characters.removeCharacterByPosition(idx)
                 log.console(f"玩家 {self.owner.getAttr('id')} 购买了角色 {char.getAttr('id')}，花费 {char.getAttr('info.price')} 金币。", "INFO")
-                em.broadcast("shop.bought", player=self.owner, character=char)
-                self.draw()
+                self.events.broadcast("shop.bought", player=self.owner, character=char)
                 return True
             else:
                 log.console(f"玩家 {self.owner.getAttr('id')} 购买角色失败，金币不足。需要 {char.getAttr('info.price')}，但只有 {self.owner.getAttr('money')}。", "WARNING")
@@ -69,20 +86,40 @@ class Shop:
     def refresh(self):
         if self.owner.getAttr("money") >= 2:
             self.owner.setAttr("money", self.owner.getAttr("money") - 2)
-            self.characters.refresh()
+            self.characters.refresh(self.grade)
             log.console(f"玩家 {self.owner.getAttr('id')} 刷新了商店，花费 2 金币。", "INFO")
-            em.broadcast("shop.refreshed", player=self.owner)
+            self.events.broadcast("shop.refreshed", player=self.owner)
         else:
             log.console(f"玩家 {self.owner.getAttr('id')} 刷新商店失败，金币不足。需要 2 金币，但只有 {self.owner.getAttr('money')}。", "WARNING")
-            return
-        self.draw()
+            return False
+        return True
+
+    def sell(self, char: Character):
+        """
+        出售备战席或阵容中的角色，返还购买价格并将卡放回卡池
+        :param char: 要出售的角色
+        :return: 角色不在拥有者的备战席或阵容中时返回 False
+        """
+        # 先移除角色再结算，重复出售或出售其他玩家的角色不会凭空产生金币和卡牌
+        if self.owner is None or not self.owner.removeCharacter(char):
+            log.console(f"出售角色失败，角色 {char.getAttr('id')} 不在备战席或阵容中。", "WARNING")
+            return False
+        price = char.getAttr("info.price")
+        self.owner.setAttr("money", self.owner.getAttr("money") + price)
+        self.pool.putBack(char.getAttr("info.id"))
+        log.console(f"玩家 {self.owner.getAttr('id')} 出售了角色 {char.getAttr('id')}，获得 {price} 金币。", "INFO")
+        self.events.broadcast("shop.sold", player=self.owner, character=char)
+        return True
 
     def upgrade(self):
+        if self.grade >= CardPool.MAX_GRADE:
+            log.console(f"玩家 {self.owner.getAttr('id')} 升级商店失败，商店已经是最高等级 {self.grade}。", "WARNING")
+            return False
         if self.owner.getAttr("money") >= 10:
             self.owner.setAttr("money", self.owner.getAttr("money") - 10)
             self.grade += 1
             log.console(f"玩家 {self.owner.getAttr('id')} 升级了商店到等级 {self.grade}，花费 10 金币。", "INFO")
-            em.broadcast("shop.upgraded", player=self.owner, new_grade=self.grade)
+            self.events.broadcast("shop.upgraded", player=self.owner, new_grade=self.grade)
             return True
         else:
             log.console(f"玩家 {self.owner.getAttr('id')} 升级商店失败，金币不足。需要 10 金币，但只有 {self.owner.getAttr('money')}。", "WARNING")
@@ -112,37 +149,98 @@ class Shop:
 
 class Player(Entity):
 
-    def __init__(self, player_id=None):
-        super().__init__()
-        self.addAttr("id", player_id if player_id is not None else uuid.uuid4())
+    def __init__(self, player_id=None, pool: CardPool = None, events: EventManager = None, refresh_shop: bool = True):
+        """
+        :param player_id: 玩家ID，为空时随机生成
+        :param pool: 对局共享的卡池
+        :param events: 对局的事件管理器，默认为全局的 em
+        :param refresh_shop: 为 False 时商店不从卡池抽取初始商品，读档时使用
+        """
+        super().__init__(events=events)
+        if player_id is None:
+            import uuid
+            player_id = uuid.uuid4()
+        self.addAttr("id", player_id)
         self.addAttr("money", 0)
         self.addAttr("max.hp", 100)
         self.addAttr("current.hp", 100)
 
         self.characters = GameRow(max_length=10)
-        self.shop = Shop(owner=self)
+        self.shop = Shop(owner=self, pool=pool, events=self.events, refresh=refresh_shop)
         self.team = GameGrid()
 
         self.setAttr("money", 5)
-        em.register('shop.bought', self.onBuyCharacter)
+        self.events.register('shop.bought', self.onBuyCharacter)
         pass
 
     def setAttr(self, key: str, value):
         before_value = super().getAttr(key)
         if before_value != value:
             super().setAttr(key, value)
-            em.broadcast('onAttrChange', player=self, attr=key, before=before_value, after=value)
+            self.events.broadcast('onAttrChange', player=self, attr=key, before=before_value, after=value)
 
     def onBuyCharacter(self, player: "Player", character: Character):
         if player == self:
             self.characters.setCharacter(character)
-        self.characters.draw()
+
+    def removeCharacter(self, character: Character) -> bool:
+        """
+        从备战席或阵容中移除角色
+        :return: 是否找到并移除了角色
+        """
+        if self.characters.removeCharacter(character):
+            return True
+        for game_row in self.team.grid.values():
+            if game_row.removeCharacter(character):
+                return True
+        return False
+
+    def releaseCharacters(self):
+        """
+        把备战席、阵容和商店中的角色全部放回卡池，玩家被淘汰时调用
+        """
+        pool = self.shop.pool
+        for game_row in [self.characters, self.shop.characters, *self.team.grid.values()]:
+            for i, char in enumerate(game_row.entities):
+                if isinstance(char, Character):
+                    pool.putBack(char.getAttr("info.id"))
+                    game_row.entities[i] = None
+
+    def dispose(self):
+        """
+        注销玩家注册的事件监听器，对局结束后调用
+        """
+        self.events.unregister('shop.bought', self.onBuyCharacter)
 
 class MainGame:
 
-    def __init__(self):
-        self.player = Player()
+    def __init__(self, policy=None, autosave_path=None, refresh_shop: bool = True):
+        """
+        :param policy: 自动决策策略 policy(player)，为空时通过终端输入操作
+        :param autosave_path: 自动存档路径，每回合操作结束后写入，为空时不存档
+        :param refresh_shop: 为 False 时商店不抽取初始商品，读档时使用
+        """
+        # 每局游戏使用独立的事件管理器
+        self.events = EventManager()
+        self.player = Player(events=self.events, refresh_shop=refresh_shop)
         self.game_stage = (1, 1)  # (stage, round)
+        self.policy = policy
+        self.autosave_path = autosave_path
+
+    def save(self, file_path=None):
+        """
+        保存存档，参照 savegame.py
+        :param file_path: 存档路径，默认为自动存档路径
+        """
+        import savegame
+        savegame.save(self, file_path if file_path is not None else self.autosave_path)
+
+    @staticmethod
+    def load(file_path, policy=None) -> "MainGame":
+        import savegame
+        game = savegame.load(file_path, policy)
+        game.autosave_path = file_path
+        return game
 
     def update(self):
         pass
@@ -155,8 +253,14 @@ class MainGame:
             if ipt == "0":
                 break
             self._developTeam()
+            if self.autosave_path is not None:
+                self.save()
 
     def _developTeam(self):
+        if self.policy is not None:
+            self.policy(self.player)
+            self.draw()
+            return
         self.draw()
         while True:
             if not self.waitingForInput():
@@ -174,6 +278,8 @@ class MainGame:
                 print("无效的索引.")
                 continue
             if self.player.shop.buy(int(idx)):
+                self.player.shop.draw()
+                self.player.characters.draw()
                 break
         return True
     
@@ -235,7 +341,8 @@ class MainGame:
                 self._buyCharacter()
                 return True
             case "2" | "refresh shop":
-                self.player.shop.refresh()
+                if self.player.shop.refresh():
+                    self.player.shop.draw()
                 return True
             case "3" | "upgrade shop":
                 self.player.shop.upgrade()
@@ -1,7 +1,5 @@
 #from character import Character, BattleCharacter
-import uuid
-import pygame
-from util import em
+from util import em, EventManager
 from entity import Character
 
 class GameRow:
@@ -106,7 +104,10 @@ class GameRow:
 
 class GameGrid:
     def __init__(self, team_id=None):
-        self.team_id = team_id if team_id is not None else uuid.uuid4()
+        if team_id is None:
+            import uuid
+            team_id = uuid.uuid4()
+        self.team_id = team_id
         self.grid = {
             "front": GameRow(1),
             "middle": GameRow(2),
@@ -183,6 +184,27 @@ class GameGrid:
                 return False
         return True
     
+    def snapshot(self) -> tuple:
+        """
+        记录网格的站位和所有角色的状态
+        :return: ((行名, 站位列表, 角色状态列表), ...)
+        """
+        return tuple(
+            (row_name, tuple(game_row.entities), tuple(e.snapshot() if isinstance(e, Character) else None for e in game_row.entities))
+            for row_name, game_row in self.grid.items()
+        )
+
+    def restore(self, state: tuple):
+        """
+        恢复到 snapshot() 记录的状态
+        """
+        for row_name, entities, char_states in state:
+            game_row = self.grid[row_name]
+            game_row.entities = list(entities)
+            for entity, char_state in zip(entities, char_states):
+                if char_state is not None:
+                    entity.restore(char_state)
+
     @staticmethod
     def randomGrid(stage=(1, 1)):
         import random
@@ -197,9 +219,13 @@ class GameGrid:
         return new_grid
     
 class GameBoard:
-    def __init__(self, red_group: GameGrid, blue_group: GameGrid):
+    def __init__(self, red_group: GameGrid, blue_group: GameGrid, events: EventManager = None):
+        """
+        :param events: 这场战斗的事件管理器，默认为全局的 em；应与双方角色使用同一个
+        """
         self.red_group = red_group
         self.blue_group = blue_group
+        self.events = events if events is not None else em
     
     def getTeamById(self, team_id) -> GameGrid | None:
         if self.red_group.team_id == team_id:
@@ -224,6 +250,18 @@ class GameBoard:
             print("=" * 50)
             self.red_group.draw(draw_type, screen, position)
 
+    def snapshot(self) -> tuple:
+        """
+        记录对战双方的状态，用于前瞻搜索、回滚调试和分支推演
+        :return: 可传给 restore() 的状态，可多次恢复
+        """
+        return (self.red_group.snapshot(), self.blue_group.snapshot())
+
+    def restore(self, state: tuple):
+        red_state, blue_state = state
+        self.red_group.restore(red_state)
+        self.blue_group.restore(blue_state)
+
     def getOtherTeam(self, char: Character) -> GameGrid | None:
         if self.red_group.team_id == char.getAttr("team_id"):
             return self.blue_group
@@ -1,62 +1,212 @@
-from util import *
-import uuid
-
-def keywordFactory(keyword_name: str):
-    keyword_classes = {
-        "Sheild": Sheild,
-    }
-    return keyword_classes.get(keyword_name, None)
+"""
+keywords.py - 关键字系统
+关键字定义（触发事件、条件、效果）写在 keyword_config.json 或数据库的 keyword 表里，
+第一次使用时全部编译成 KeywordTemplate；给角色添加关键字只是把模板绑定到角色上，新增关键字不需要写代码
 
-
-sheild = {
+定义格式：
+{
     "id": "sheild",
     "name": "护盾",
     "description": "抵消一次受到的伤害",
-    "type": "pessive",
-    "trigger": "onGetHurt",
-    "condition": [
-        {
-            "type": "has_statu",
-            "param": "sheild"
-        }
-    ],
-    "effects": [
-        {
-            "type": "modify_attr",
-            "param": "DMG=0",
-            "mode": "damage"
-        },
-        {
-            "type": "remove_statu",
-            "param": "sheild",
-            "mode": "self"
-        }
-    ]
+    "type": "passive",
+    "trigger": "onGetHurt",         //参照 事件文档.md
+    "charges": 1,                   //可触发次数，用完后关键字消失，-1 表示无限
+    "condition": [...],             //参照 条件文档.md
+    "effects": [...]                //参照 效果文档.md
 }
+"""
+import json
+
+from util import *
+from effect import Condition, Effect, effectTargets
+from skills import EVENT_SUBJECT
+
+KEYWORD_CONFIG_PATH = BASE_DIR / 'keyword_config.json'
+
+
+class KeywordTemplate:
+    """
+    编译后的关键字定义，所有持有该关键字的角色共用
+    """
+
+    def __init__(self, info: dict):
+        self.id: str = info.get("id", "")
+        self.name: str = info.get("name", self.id)
+        self.description: str = info.get("description", "")
+        self.type: str = info.get("type", "passive")
+        self.trigger: str = info.get("trigger", "")
+        self.charges: int = info.get("charges", -1)
+        self.predicate = Condition.allOf([Condition.of(c) for c in info.get("condition", None) or []]).predicate
+        self.effects: list[Effect] = [Effect.byDict(e) for e in info.get("effects", None) or []]
+        for effect in self.effects:
+            effect.parse()
+        self.subject = EVENT_SUBJECT.get(self.trigger)
 
+    def bind(self, owner) -> "Keyword":
+        return Keyword(self, owner)
 
+    def __str__(self):
+        return f"KeywordTemplate({self.id}, trigger={self.trigger})"
 
-class Sheild:
+    def __repr__(self):
+        return self.__str__()
 
-    uuid_dict = {}
 
-    def __init__(self, owner = None):
-        self.id = uuid.uuid4()
+class Keyword:
+    """
+    角色身上的一个关键字实例，只保存持有者和剩余次数
+    """
+    __slots__ = ("template", "owner", "events", "amount", "registered", "__weakref__")
+
+    def __init__(self, template: KeywordTemplate, owner = None):
+        self.template = template
         self.owner = owner
-        self.amount = 1  # 护盾数量，表示可以抵消多少次伤害
-        em.on("onGetHurt")(self._handle)
-    
+        # 监听持有者所属对局的事件
+        self.events = owner.events if owner is not None else em
+        self.amount = template.charges  # 剩余可触发次数，-1 表示无限
+        self.registered = False
+        self._register()
+
+    @property
+    def id(self) -> str:
+        return self.template.id
+
+    @property
+    def name(self) -> str:
+        return self.template.name
+
+    def _register(self):
+        if not self.registered and self.template.trigger:
+            self.events.register(self.template.trigger, self._handle)
+            self.registered = True
+
+    def _unregister(self):
+        if self.registered:
+            self.events.unregister(self.template.trigger, self._handle)
+            self.registered = False
+
     def _handle(self, **context):
-        if self.owner == context['target']:
-            damage = context['damage']
-            if damage.amount > 0:
-                log.console(f"{self.owner.getAttr('name')} 的护盾抵消了所有伤害！", "SHIELD")
-                damage.amount = 0
-                self.amount -= 1
-                if not self.isAlive():
-                    self.owner.removeKeyword(self)
-                    em.unregister("onGetHurt", self._handle)
-                    log.console(f"{self.owner.getAttr('name')} 的护盾消失了！", "SHIELD")
-    
+        template = self.template
+        owner = self.owner
+        if template.subject is not None and context.get(template.subject) is not owner:
+            return
+        if not self.isAlive() or not template.predicate(owner, context):
+            return
+        log.console(f"{owner.getAttr('name')} 的{template.name}触发了！", "KEYWORD")
+        for effect in template.effects:
+            for target in effectTargets(effect.mode, owner, context):
+                target.applyEffect(effect)
+        if self.amount > 0:
+            self.amount -= 1
+            if not self.isAlive():
+                owner.removeKeyword(self)
+                self._unregister()
+                log.console(f"{owner.getAttr('name')} 的{template.name}消失了！", "KEYWORD")
+
     def isAlive(self):
-        return self.amount > 0
\ No newline at end of file
+        return self.amount != 0
+
+    def snapshot(self):
+        return self.amount
+
+    def restore(self, amount):
+        """
+        恢复剩余次数，关键字重新生效时重新注册监听器
+        """
+        self.amount = amount
+        if self.isAlive():
+            self._register()
+
+    def __str__(self):
+        return f"Keyword({self.template.id}, amount={self.amount})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class KeywordRegistry:
+    """
+    关键字注册表，{关键字ID: KeywordTemplate}，ID 不区分大小写
+    """
+
+    def __init__(self, file_path = KEYWORD_CONFIG_PATH):
+        """
+        :param file_path: 默认加载的定义文件，为 None 时只使用手动注册的关键字
+        """
+        self.file_path = file_path
+        self.templates: dict[str, KeywordTemplate] = {}
+        self.loaded = False
+
+    def _ensureLoaded(self):
+        if not self.loaded:
+            self.loaded = True
+            if self.file_path is not None:
+                self.load(self.file_path)
+
+    def register(self, info: dict) -> KeywordTemplate:
+        template = KeywordTemplate(info)
+        self.templates[template.id.lower()] = template
+        return template
+
+    def load(self, file_path) -> int:
+        """
+        从 JSON 文件加载关键字定义，格式为 {关键字ID: 定义} 或 [定义, ...]
+        :return: 加载的数量
+        """
+        data = loadJsonConfig(file_path)
+        infos = data.values() if isinstance(data, dict) else data
+        for info in infos:
+            self.register(info)
+        return len(infos)
+
+    def loadDb(self, db_path) -> int:
+        """
+        从数据库的 keyword 表加载关键字定义，condition / effects 列为 JSON 文本
+        :return: 加载的数量
+        """
+        import sqlite3
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM keyword").fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            info = dict(row)
+            for key in ("condition", "effects"):
+                info[key] = json.loads(info[key]) if info.get(key) else []
+            self.register(info)
+        return len(rows)
+
+    def get(self, keyword_id: str) -> KeywordTemplate | None:
+        self._ensureLoaded()
+        return self.templates.get(keyword_id.lower())
+
+    def create(self, keyword_id: str, owner) -> Keyword | None:
+        """
+        把关键字绑定到角色上
+        :return: 关键字实例，未定义的关键字返回 None
+        """
+        template = self.get(keyword_id)
+        return template.bind(owner) if template is not None else None
+
+    def __contains__(self, keyword_id: str) -> bool:
+        return self.get(keyword_id) is not None
+
+    def __str__(self):
+        self._ensureLoaded()
+        return f"KeywordRegistry({list(self.templates)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+registry = KeywordRegistry()
+
+
+def keywordFactory(keyword_name: str):
+    """
+    :return: 关键字的构造函数 owner -> Keyword，未定义的关键字返回 None
+    """
+    template = registry.get(keyword_name)
+    return template.bind if template is not None else None
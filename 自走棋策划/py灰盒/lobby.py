@@ -0,0 +1,290 @@
+"""
+lobby.py - 无界面的多人对局模拟：收入、商店、布阵、配对、战斗、扣血的完整回合循环
+用于批量模拟对局，统计经济平衡和对局时长
+"""
+import random
+from util import *
+from entity import Character
+from grid import GameGrid, GameBoard
+from game import Player
+from card_pool import CardPool
+from simulator import attackSimulator
+from battle_cache import BattleCache, battleResult, cachedBattle
+
+
+BATTLE_ROWS = ["front", "middle", "back"]
+
+
+def battleGrid(team: GameGrid, events: EventManager = None) -> GameGrid:
+    """
+    按玩家阵容生成一份全新的战斗用网格，战斗中的伤害不会影响玩家的棋子
+    :param team: 玩家阵容
+    :param events: 这场战斗的事件管理器
+    :return: 新的 GameGrid
+    """
+    new_grid = GameGrid()
+    for row_name in BATTLE_ROWS:
+        game_row = team.grid[row_name]
+        for i, char in enumerate(game_row.entities):
+            if isinstance(char, Character):
+                new_grid.setCharacter(Character.byId(char.getAttr("info.id"), events), row_name, i + 1)
+    return new_grid
+
+
+def teamUnits(team: GameGrid) -> dict:
+    """
+    阵容中每个位置的角色ID，可以跨进程传递
+    :return: {行名: [角色ID 或 None, ...]}
+    """
+    return {
+        row_name: [char.getAttr("info.id") if isinstance(char, Character) else None for char in team.grid[row_name].entities]
+        for row_name in BATTLE_ROWS
+    }
+
+
+def unitsGrid(units: dict, events: EventManager = None) -> GameGrid:
+    """
+    按 teamUnits() 的结果生成战斗用网格
+    """
+    new_grid = GameGrid()
+    for row_name in BATTLE_ROWS:
+        for i, char_id in enumerate(units.get(row_name, [])):
+            if char_id is not None:
+                new_grid.setCharacter(Character.byId(char_id, events), row_name, i + 1)
+    return new_grid
+
+
+def simulateBattle(red_units: dict, blue_units: dict, seed: int = None) -> dict:
+    """
+    在独立的事件管理器上模拟一场战斗，参数和结果都可以跨进程传递，供进程池使用
+    :param red_units: 红方 teamUnits()
+    :param blue_units: 蓝方 teamUnits()
+    :param seed: 随机种子，战斗期间重置全局 random，结束后恢复；多线程中使用时不保证可复现
+    :return: battleResult 格式的结果
+    """
+    events = EventManager()
+    with seededRandom(seed):
+        with events.batch():
+            board = GameBoard(unitsGrid(red_units, events), unitsGrid(blue_units, events), events)
+        return battleResult(board, attackSimulator(board, headless=True))
+
+
+def simplePolicy(player: Player, lobby: "Lobby"):
+    """
+    默认策略：商店等级低于回合数的一半（且未到最高等级）时升级，否则买下能买的最贵角色并放到空位上
+    """
+    shop = player.shop
+    if shop.grade < min(lobby.round // 2, CardPool.MAX_GRADE) and player.getAttr("money") >= 10:
+        shop.upgrade()
+    while True:
+        affordable = [
+            (char.getAttr("info.price"), idx)
+            for idx, char in enumerate(shop.characters.entities, start=1)
+            if isinstance(char, Character) and char.getAttr("info.price") <= player.getAttr("money")
+        ]
+        if not affordable or None not in player.characters.entities:
+            break
+        shop.buy(max(affordable)[1])
+    lobby.placeBench(player)
+
+
+class Lobby:
+    """
+    对局类，驱动多名玩家完成整局游戏
+    """
+
+    # 每回合基础收入
+    BASE_INCOME = 5
+    # 每 10 金币获得 1 利息，最多 MAX_INTEREST
+    MAX_INTEREST = 5
+    # 战败时的基础扣血
+    BASE_DAMAGE = 2
+    # 回合上限，超过后按剩余血量排名
+    MAX_ROUNDS = 50
+    # 使用战斗缓存时，每场战斗从这些种子中选取，相同阵容才有机会命中缓存
+    BATTLE_SEEDS = 8
+
+    def __init__(self, policies: list = None, player_num: int = 8, seed: int = None, cache: BattleCache = None):
+        """
+        初始化对局
+        :param policies: 每名玩家的决策函数 policy(player, lobby)，数量不足时用 simplePolicy 补齐
+        :param player_num: 玩家数量
+        :param seed: 随机种子，用于复现卡池抽取和配对
+        :param cache: 战斗结果缓存，为空时每场战斗都重新模拟
+        """
+        self.rng = random.Random(seed)
+        self.cache = cache
+        self.pool = CardPool(rng=self.rng)
+        policies = list(policies) if policies is not None else []
+        policies += [simplePolicy] * (player_num - len(policies))
+
+        # 对局内的玩家、商店共用一个事件管理器，与其他对局互不影响
+        self.events = EventManager()
+        self.players: list[Player] = [Player(player_id=i + 1, pool=self.pool, events=self.events) for i in range(player_num)]
+        self.policies: dict = {player.getAttr("id"): policy for player, policy in zip(self.players, policies)}
+        self.round = 0
+        # 淘汰顺序，先淘汰的在前
+        self.eliminated: list[Player] = []
+        self.history: list[dict] = []
+
+    def alivePlayers(self) -> list[Player]:
+        return [player for player in self.players if player.getAttr("current.hp") > 0]
+
+    def isOver(self) -> bool:
+        return len(self.alivePlayers()) <= 1 or self.round >= Lobby.MAX_ROUNDS
+
+    def payIncome(self, player: Player):
+        money = player.getAttr("money")
+        interest = min(money // 10, Lobby.MAX_INTEREST)
+        player.setAttr("money", money + Lobby.BASE_INCOME + interest)
+
+    def beginTurn(self, player: Player):
+        """
+        玩家操作阶段开始：发放收入并刷新商店
+        """
+        self.payIncome(player)
+        player.shop.characters.refresh(player.shop.grade)
+
+    def placeBench(self, player: Player):
+        """
+        把备战席上的角色依次放到阵容的空位上（优先满足角色的可放置位置）
+        """
+        for idx, char in enumerate(player.characters.entities, start=1):
+            if not isinstance(char, Character):
+                continue
+            rows = char.getAttr("info.position_constraint") or BATTLE_ROWS
+            for row_name in rows:
+                if row_name in BATTLE_ROWS and player.team.setCharacter(char, row_name):
+                    player.characters.removeCharacterByPosition(idx)
+                    break
+
+    def pairPlayers(self) -> list[tuple]:
+        """
+        随机配对存活玩家，人数为奇数时最后一名玩家对战随机一名玩家的阵容镜像（镜像方不扣血）
+        :return: [(玩家, 对手, 对手是否为镜像), ...]
+        """
+        alive = self.alivePlayers()
+        self.rng.shuffle(alive)
+        pairs = [(alive[i], alive[i + 1], False) for i in range(0, len(alive) - 1, 2)]
+        if len(alive) % 2 == 1 and len(alive) > 1:
+            pairs.append((alive[-1], self.rng.choice(alive[:-1]), True))
+        return pairs
+
+    def fight(self, player: Player, opponent: Player, is_ghost: bool = False):
+        """
+        进行一场战斗并结算扣血
+        """
+        # 每场战斗使用独立的事件管理器，战斗中注册的关键字、技能监听器随战斗一起释放
+        events = EventManager()
+        with events.batch():
+            board = GameBoard(battleGrid(player.team, events), battleGrid(opponent.team, events), events)
+        if self.cache is not None:
+            result = cachedBattle(board, self.cache, self.rng.randrange(Lobby.BATTLE_SEEDS))
+        else:
+            result = battleResult(board, attackSimulator(board, headless=True))
+        return self.applyBattle(player, opponent, is_ghost, result)
+
+    def applyBattle(self, player: Player, opponent: Player, is_ghost: bool, result: dict):
+        """
+        按战斗结果给战败方扣血
+        :param result: battleResult 格式的结果，玩家执红
+        :return: 获胜方 "RED" / "BLUE" / None
+        """
+        winner = result["winner"]
+        if winner == "RED":
+            losers = [] if is_ghost else [opponent]
+        elif winner == "BLUE":
+            losers = [player]
+        else:
+            losers = []
+        damage = Lobby.BASE_DAMAGE + sum(price for _, price, _ in result["survivors"])
+        for loser in losers:
+            loser.setAttr("current.hp", max(0, loser.getAttr("current.hp") - damage))
+        return winner
+
+    def playRound(self):
+        """
+        进行一个完整回合：收入 -> 商店刷新 -> 玩家决策 -> 配对战斗 -> 扣血淘汰
+        """
+        self.round += 1
+        # 打乱行动顺序，避免固定顺序的玩家总是先从共享卡池中抽卡
+        order = self.alivePlayers()
+        self.rng.shuffle(order)
+        for player in order:
+            # 一名玩家的整个操作阶段只广播一次金币等属性的最终变化
+            with self.events.batch():
+                self.beginTurn(player)
+                self.policies[player.getAttr("id")](player, self)
+
+        for player, opponent, is_ghost in self.pairPlayers():
+            self.fight(player, opponent, is_ghost)
+
+        self.finishRound()
+
+    def finishRound(self):
+        """
+        回合结束：记录淘汰顺序和每名玩家的金币、血量，淘汰玩家的角色放回卡池
+        """
+        for player in self.players:
+            if player.getAttr("current.hp") <= 0 and player not in self.eliminated:
+                self.eliminated.append(player)
+                player.releaseCharacters()
+
+        self.history.append({
+            "round": self.round,
+            "money": {player.getAttr("id"): player.getAttr("money") for player in self.players},
+            "hp": {player.getAttr("id"): player.getAttr("current.hp") for player in self.players},
+        })
+
+    def run(self) -> dict:
+        """
+        进行整局游戏
+        :return: 对局结果 {"rounds": 回合数, "ranking": [玩家ID, ...], "history": [...]}
+        """
+        while not self.isOver():
+            self.playRound()
+
+        ranking = self.ranking()
+        for player in self.players:
+            player.dispose()
+        return {"rounds": self.round, "ranking": ranking, "history": self.history}
+
+    def ranking(self) -> list:
+        """
+        :return: 按名次排列的玩家ID，存活玩家按剩余血量排在前面，淘汰玩家后淘汰的在前
+        """
+        alive = sorted(self.alivePlayers(), key=lambda p: p.getAttr("current.hp"), reverse=True)
+        return [p.getAttr("id") for p in alive] + [p.getAttr("id") for p in reversed(self.eliminated)]
+
+
+def simulateLobbies(num_games: int, policies: list = None, player_num: int = 8, seed: int = None, cache: BattleCache = None) -> dict:
+    """
+    批量模拟多局游戏并汇总统计
+    :param num_games: 对局数量
+    :param policies: 每名玩家的决策函数
+    :param player_num: 每局玩家数量
+    :param seed: 随机种子
+    :param cache: 战斗结果缓存，多局之间共享
+    :return: {"games": 对局数, "avg_rounds": 平均回合数, "avg_final_money": 平均结束金币, "win_rate": {玩家ID: 胜率}}
+    """
+    rng = random.Random(seed)
+    enabled, log.enabled = log.enabled, False
+    rounds, final_money, wins = [], [], {}
+    try:
+        for _ in range(num_games):
+            res = Lobby(policies, player_num, seed=rng.randrange(2 ** 32), cache=cache).run()
+            rounds.append(res["rounds"])
+            final_money.append(sum(res["history"][-1]["money"].values()) / player_num if res["history"] else 0)
+            wins[res["ranking"][0]] = wins.get(res["ranking"][0], 0) + 1
+    finally:
+        log.enabled = enabled
+    return {
+        "games": num_games,
+        "avg_rounds": sum(rounds) / num_games if num_games else 0,
+        "avg_final_money": sum(final_money) / num_games if num_games else 0,
+        "win_rate": {pid: cnt / num_games for pid, cnt in sorted(wins.items())},
+    }
+
+
+if __name__ == "__main__":
+    print(simulateLobbies(10, seed=0))
@@ -1,6 +1,6 @@
 #from character import Character
 from grid import GameGrid, GameBoard
-import pygame, sys
+import sys
 from simulator import * 
 from util import log, em
 from entity import Damage, Character
@@ -8,9 +8,10 @@ from effect import Condition, Effect, Buff, BuffList
 from keywords import *
 
 
-from windows.main_menu import MainMenu
-
 def main():
+    # pygame 只在需要显示界面时导入，无界面的模拟进程不必加载
+    import pygame
+    from windows.main_menu import MainMenu
 
     pygame.init()
 
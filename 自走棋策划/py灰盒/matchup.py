@@ -0,0 +1,243 @@
+"""
+matchup.py - 阵容循环赛胜率矩阵
+每对阵容都交换红蓝双方各打若干场以抵消先手偏差，使用进程池并行模拟，
+结果按 (阵容哈希, 战斗规则版本, 规则配置摘要, 场次) 缓存，重复运行时只模拟发生变化的对局；
+阵容哈希包含阵容中角色的配置，修改角色属性后相关对局会重新模拟
+
+阵容文件格式（JSON 列表）：
+[
+    {
+        "name": "阵容名",
+        "units": {
+            "front": ["0001", null, "0002"],
+            "middle": [null, null, null],
+            "back": ["0003"]
+        }
+    },
+    ...
+]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from util import *
+from entity import Character
+from grid import GameGrid, GameBoard
+from simulator import attackSimulator, ENGINE_VERSION
+
+BATTLE_ROWS = ["front", "middle", "back"]
+CACHE_PATH = BASE_DIR / "logs" / "matchup_cache.json"
+CHARACTER_CONFIG_PATH = BASE_DIR / 'character_config.json'
+# 对所有角色生效的规则配置，内容变化时全部缓存失效
+RULE_CONFIG_PATHS = [BASE_DIR / 'keyword_config.json']
+
+
+def compositionHash(comp: dict, configs: dict = None) -> str:
+    """
+    阵容的规范化哈希，与各位置上的角色ID以及这些角色的配置有关，与阵容名无关
+    :param configs: 角色配置，为空时读取 character_config.json
+    """
+    if configs is None:
+        configs = loadJsonConfig(CHARACTER_CONFIG_PATH)
+    units = comp.get("units", {})
+    canonical = [[str(c).zfill(4) if c is not None else None for c in units.get(row, [])] for row in BATTLE_ROWS]
+    unit_configs = {c: configs.get(c) for row in canonical for c in row if c is not None}
+    payload = json.dumps([canonical, unit_configs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def rulesDigest(paths=RULE_CONFIG_PATHS) -> str:
+    """
+    规则配置文件内容的摘要
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def gridFromComposition(comp: dict, events: EventManager = None) -> GameGrid:
+    """
+    :param events: 这场战斗的事件管理器，角色的技能、关键字监听器注册在上面
+    """
+    grid = GameGrid()
+    units = comp.get("units", {})
+    for row_name in BATTLE_ROWS:
+        for i, char_id in enumerate(units.get(row_name, [])):
+            if char_id is not None:
+                grid.setCharacter(Character.byId(char_id, events), row_name, i + 1)
+    return grid
+
+
+def unitCompositions() -> list[dict]:
+    """
+    为每个角色生成一个单角色阵容（站在前排第一位），用于比较单个角色之间的强弱
+    """
+    config = loadJsonConfig(CHARACTER_CONFIG_PATH)
+    return [
+        {"name": char.get("name", char_id), "units": {"front": [char_id]}}
+        for char_id, char in config.items()
+    ]
+
+
+def playPairing(comp_a: dict, comp_b: dict, seeds: int) -> dict:
+    """
+    模拟一对阵容：A 执红 seeds 场，再交换双方 seeds 场
+    每场战斗使用独立的事件管理器，不经过全局的 em，上一场残留的监听器不会影响下一场
+    :return: 以 A 为视角的 {"wins": 胜, "losses": 负, "draws": 平}
+    """
+    log.enabled = False
+    res = {"wins": 0, "losses": 0, "draws": 0}
+    for seed in range(seeds):
+        for a_is_red in (True, False):
+            events = EventManager()
+            with seededRandom(seed * 2 + (0 if a_is_red else 1)):
+                with events.batch():
+                    grid_a, grid_b = gridFromComposition(comp_a, events), gridFromComposition(comp_b, events)
+                    red, blue = (grid_a, grid_b) if a_is_red else (grid_b, grid_a)
+                    board = GameBoard(red, blue, events)
+                winner = attackSimulator(board, headless=True)
+            if winner is None:
+                res["draws"] += 1
+            elif (winner == "RED") == a_is_red:
+                res["wins"] += 1
+            else:
+                res["losses"] += 1
+    return res
+
+
+def _cacheKey(hash_a: str, hash_b: str, seeds: int, rules: str) -> str:
+    return f"{hash_a}:{hash_b}:{ENGINE_VERSION}:{rules}:{seeds}"
+
+
+def loadCache(cache_path=CACHE_PATH) -> dict:
+    if not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def saveCache(cache: dict, cache_path=CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def matchupMatrix(comps: list[dict], seeds: int = 10, workers: int = None, cache_path=CACHE_PATH) -> list[list]:
+    """
+    计算胜率矩阵
+    :param comps: 阵容列表
+    :param seeds: 每对阵容每一方执红的场次
+    :param workers: 进程数，默认为 CPU 核数
+    :param cache_path: 缓存文件路径，为 None 时不使用缓存
+    :return: matrix[i][j] 为阵容 i 对阵容 j 的胜率（平局记半场），对角线为 None
+    """
+    configs = loadJsonConfig(CHARACTER_CONFIG_PATH)
+    hashes = [compositionHash(c, configs) for c in comps]
+    rules = rulesDigest()
+    cache = loadCache(cache_path) if cache_path is not None else {}
+
+    # 同一对阵容只模拟一次，以哈希较小的一方为视角
+    todo = {}
+    for i in range(len(comps)):
+        for j in range(i + 1, len(comps)):
+            a, b = (i, j) if hashes[i] <= hashes[j] else (j, i)
+            key = _cacheKey(hashes[a], hashes[b], seeds, rules)
+            if key not in cache and key not in todo and hashes[a] != hashes[b]:
+                todo[key] = (a, b)
+
+    if todo:
+        log.console(f"需要模拟 {len(todo)} 组对局，已缓存 {len(cache)} 组。", "INFO")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {key: executor.submit(playPairing, comps[a], comps[b], seeds) for key, (a, b) in todo.items()}
+            for key, future in futures.items():
+                cache[key] = future.result()
+        if cache_path is not None:
+            saveCache(cache, cache_path)
+
+    matrix = [[None] * len(comps) for _ in comps]
+    for i in range(len(comps)):
+        for j in range(len(comps)):
+            if i == j:
+                continue
+            if hashes[i] == hashes[j]:
+                matrix[i][j] = 0.5
+                continue
+            flip = hashes[i] > hashes[j]
+            res = cache[_cacheKey(*(sorted((hashes[i], hashes[j]))), seeds, rules)]
+            total = res["wins"] + res["losses"] + res["draws"]
+            wins = res["losses"] if flip else res["wins"]
+            matrix[i][j] = (wins + res["draws"] / 2) / total if total else 0.5
+    return matrix
+
+
+def compositionNames(comps: list[dict]) -> list[str]:
+    """
+    阵容名，没有名字的阵容用哈希代替
+    """
+    configs = loadJsonConfig(CHARACTER_CONFIG_PATH)
+    return [comp["name"] if "name" in comp else compositionHash(comp, configs) for comp in comps]
+
+
+def saveCsv(comps: list[dict], matrix: list[list], file_path):
+    names = compositionNames(comps)
+    with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([""] + names)
+        for name, row in zip(names, matrix):
+            writer.writerow([name] + ["" if v is None else f"{v:.3f}" for v in row])
+
+
+def saveHeatmap(comps: list[dict], matrix: list[list], file_path):
+    """
+    输出胜率热力图，需要安装 matplotlib
+    """
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        log.console("未安装 matplotlib，跳过热力图输出。", "WARN")
+        return False
+    names = compositionNames(comps)
+    data = [[float("nan") if v is None else v for v in row] for row in matrix]
+    fig, ax = plt.subplots(figsize=(max(4, len(names) * 0.6), max(4, len(names) * 0.6)))
+    image = ax.imshow(data, cmap="RdYlGn", vmin=0, vmax=1)
+    ax.set_xticks(range(len(names)), names, rotation=90)
+    ax.set_yticks(range(len(names)), names)
+    fig.colorbar(image, ax=ax)
+    fig.tight_layout()
+    fig.savefig(file_path)
+    plt.close(fig)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="阵容循环赛胜率矩阵")
+    parser.add_argument("compositions", nargs="?", help="阵容 JSON 文件，留空时使用每个角色的单角色阵容")
+    parser.add_argument("-o", "--output", default="matchup.csv", help="输出 CSV 文件")
+    parser.add_argument("--heatmap", help="输出热力图 PNG 文件（需要 matplotlib）")
+    parser.add_argument("--seeds", type=int, default=10, help="每对阵容每一方执红的场次")
+    parser.add_argument("--workers", type=int, default=None, help="进程数")
+    parser.add_argument("--no-cache", action="store_true", help="不读写缓存")
+    args = parser.parse_args()
+
+    comps = loadJsonConfig(args.compositions) if args.compositions else unitCompositions()
+    matrix = matchupMatrix(comps, args.seeds, args.workers, None if args.no_cache else CACHE_PATH)
+    saveCsv(comps, matrix, args.output)
+    print(f"已生成 {args.output}，共 {len(comps)} 个阵容。")
+    if args.heatmap and saveHeatmap(comps, matrix, args.heatmap):
+        print(f"已生成 {args.heatmap}。")
+
+
+if __name__ == "__main__":
+    main()
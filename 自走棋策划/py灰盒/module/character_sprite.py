@@ -0,0 +1,50 @@
+import pygame
+
+
+class CharacterSprite(pygame.sprite.Sprite):
+    """
+    角色的 pygame 渲染适配器，持有对数据模型 Character 的引用，只负责绘制
+    """
+    FONT = None          # 类级缓存，避免重复创建
+    SIZE = (96, 64)
+    COLOR_BOX = (50, 200, 50)
+    COLOR_DEAD = (120, 120, 120)
+    COLOR_TEXT = (0, 0, 0)
+
+    def __init__(self, character, position=(0, 0)):
+        super().__init__()
+        self.character = character
+        self.image = pygame.Surface(CharacterSprite.SIZE, pygame.SRCALPHA)
+        self.rect = self.image.get_rect(topleft=position)
+        self.render()
+
+    @classmethod
+    def font(cls) -> pygame.font.Font:
+        if cls.FONT is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            cls.FONT = pygame.font.Font(None, 20)
+        return cls.FONT
+
+    def render(self):
+        char = self.character
+        w, h = self.image.get_size()
+        color = CharacterSprite.COLOR_BOX if char.isAlive() else CharacterSprite.COLOR_DEAD
+        self.image.fill((0, 0, 0, 0))
+        pygame.draw.rect(self.image, color, (0, 0, w, h), width=2, border_radius=6)
+
+        font = CharacterSprite.font()
+        lines = [
+            str(char.getAttr("info.name")),
+            f"{char.getAttr('current.atk')}/{char.getAttr('current.hp')}",
+        ]
+        for i, line in enumerate(lines):
+            text_surface = font.render(line, True, CharacterSprite.COLOR_TEXT)
+            text_rect = text_surface.get_rect(center=(w // 2, h * (i + 1) // (len(lines) + 1)))
+            self.image.blit(text_surface, text_rect)
+
+    def update(self, *args):
+        self.render()
+
+    def draw(self, screen: pygame.Surface):
+        screen.blit(self.image, self.rect)
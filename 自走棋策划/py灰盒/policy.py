@@ -0,0 +1,313 @@
+"""
+policy.py - 玩家决策接口：观察状态 -> 选择商店/布阵动作
+供机器人对局、批量模拟使用，不依赖终端输入
+"""
+import weakref
+from types import SimpleNamespace
+from util import *
+from entity import Character
+from game import Player
+from card_pool import CardPool
+
+
+Action = SimpleNamespace(
+    END="end",              # ("end",)                            结束本回合决策
+    BUY="buy",              # ("buy", 商店位置)
+    REFRESH="refresh",      # ("refresh",)
+    UPGRADE="upgrade",      # ("upgrade",)
+    LOCK="lock",            # ("lock", 商店位置)
+    UNLOCK="unlock",        # ("unlock", 商店位置)
+    PLACE="place",          # ("place", 备战席位置, 行名, 行内位置)
+    SELL="sell",            # ("sell", 备战席位置)
+)
+
+END_ACTION = (Action.END,)
+
+BATTLE_ROWS = ("front", "middle", "back")
+
+
+class UnitInfo:
+    """
+    角色的静态信息，每个角色实例只解析一次
+    """
+    __slots__ = ("id", "price", "atk", "hp", "fetters", "rows")
+
+    # 角色实例 -> UnitInfo，角色被回收后自动移除；配置修改后新生成的角色、其他对局的角色不会取到旧数据
+    _cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, char: Character):
+        self.id = char.getAttr("info.id")
+        self.price = char.getAttr("info.price")
+        self.atk = char.getAttr("base.atk")
+        self.hp = char.getAttr("base.hp")
+        fetters = char.getAttr("info.fetters") or ()
+        self.fetters = tuple(fetters.split(';')) if isinstance(fetters, str) else tuple(fetters)
+        self.rows = tuple(r for r in (char.getAttr("info.position_constraint") or BATTLE_ROWS) if r in BATTLE_ROWS)
+
+    @classmethod
+    def of(cls, char: Character) -> "UnitInfo":
+        # 角色的 info 在角色的生命周期内不会改变
+        info = cls._cache.get(char)
+        if info is None:
+            info = cls._cache[char] = cls(char)
+        return info
+
+
+class StateView:
+    """
+    玩家状态的只读视图
+    直接引用 Shop / 备战席 GameRow / GameGrid 的内部列表，不做拷贝
+    """
+    __slots__ = ("player", "round")
+
+    def __init__(self, player: Player, round: int = 0):
+        self.player = player
+        self.round = round
+
+    @property
+    def money(self) -> int:
+        return self.player.attrs["money"]
+
+    @property
+    def hp(self) -> int:
+        return self.player.attrs["current"]["hp"]
+
+    @property
+    def grade(self) -> int:
+        return self.player.shop.grade
+
+    @property
+    def max_grade(self) -> int:
+        """商店的最高等级，达到后不能再升级"""
+        return CardPool.MAX_GRADE
+
+    @property
+    def shop(self) -> list:
+        """商店槽位列表，元素为 Character 或 None（下标 0 对应位置 1）"""
+        return self.player.shop.characters.entities
+
+    @property
+    def locked(self) -> list:
+        return self.player.shop.characters.locked
+
+    @property
+    def bench(self) -> list:
+        """备战席槽位列表，元素为 Character 或 None（下标 0 对应位置 1）"""
+        return self.player.characters.entities
+
+    def row(self, row_name: str) -> list:
+        """阵容中某一行的槽位列表"""
+        return self.player.team.grid[row_name].entities
+
+    def benchFull(self) -> bool:
+        return None not in self.player.characters.entities
+
+    def freeSlot(self, rows=BATTLE_ROWS):
+        """
+        按给定的行顺序找到阵容中第一个空位
+        :return: (行名, 位置) 或 None
+        """
+        grid = self.player.team.grid
+        for row_name in rows:
+            entities = grid[row_name].entities
+            for i in range(len(entities)):
+                if entities[i] is None:
+                    return (row_name, i + 1)
+        return None
+
+    def units(self):
+        """遍历备战席和阵容中的所有角色"""
+        for char in self.player.characters.entities:
+            if char is not None:
+                yield char
+        for row_name in BATTLE_ROWS:
+            for char in self.player.team.grid[row_name].entities:
+                if char is not None:
+                    yield char
+
+    def fetterCounts(self) -> dict:
+        """已拥有角色的羁绊计数 {羁绊: 数量}"""
+        counts = {}
+        for char in self.units():
+            for fetter in UnitInfo.of(char).fetters:
+                counts[fetter] = counts.get(fetter, 0) + 1
+        return counts
+
+
+def _validPosition(position, length: int) -> bool:
+    """
+    位置参数（从 1 开始）是否为 1 ~ length 之间的整数
+    """
+    return type(position) is int and 1 <= position <= length
+
+
+def applyAction(player: Player, action: tuple) -> bool:
+    """
+    执行一个动作
+    :param player: 执行动作的玩家
+    :param action: 动作元组，参照 Action
+    :return: 动作是否执行成功；动作格式不对、位置越界时返回 False
+    """
+    if not isinstance(action, (tuple, list)) or not action:
+        return False
+    shop = player.shop
+    bench = player.characters
+    match action[0]:
+        case Action.BUY:
+            if len(action) < 2 or not _validPosition(action[1], shop.characters.max_length):
+                return False
+            if None not in bench.entities:
+                return False
+            return shop.buy(action[1])
+        case Action.REFRESH:
+            return bool(shop.refresh())
+        case Action.UPGRADE:
+            return shop.upgrade()
+        case Action.LOCK:
+            if len(action) < 2 or not _validPosition(action[1], shop.characters.max_length):
+                return False
+            shop.lock(action[1])
+            return True
+        case Action.UNLOCK:
+            if len(action) < 2 or not _validPosition(action[1], shop.characters.max_length):
+                return False
+            shop.unlock(action[1])
+            return True
+        case Action.PLACE:
+            if len(action) != 4:
+                return False
+            _, bench_idx, row_name, pos = action
+            row = player.team.grid.get(row_name) if isinstance(row_name, str) else None
+            if row is None or not _validPosition(bench_idx, bench.max_length) or not _validPosition(pos, row.max_length):
+                return False
+            char = bench.getCharacterByPosition(bench_idx)
+            if not isinstance(char, Character) or not player.team.setCharacter(char, row_name, pos):
+                return False
+            bench.removeCharacterByPosition(bench_idx)
+            return True
+        case Action.SELL:
+            if len(action) < 2 or not _validPosition(action[1], bench.max_length):
+                return False
+            char = bench.getCharacterByPosition(action[1])
+            if not isinstance(char, Character):
+                return False
+            return shop.sell(char)
+        case _:
+            return False
+
+
+class Policy:
+    """
+    决策策略基类
+    子类实现 decide(view)，每次返回一个动作，返回 END_ACTION 时结束本回合
+    实例可直接作为 Lobby 的 policy(player, lobby) 使用
+    """
+
+    # 单回合最多执行的动作数，防止策略死循环
+    MAX_ACTIONS = 64
+
+    def decide(self, view: StateView) -> tuple:
+        return END_ACTION
+
+    def play(self, player: Player, round: int = 0) -> int:
+        """
+        让策略完成一个回合的决策
+        :return: 成功执行的动作数
+        """
+        view = StateView(player, round)
+        done = 0
+        for _ in range(self.MAX_ACTIONS):
+            action = self.decide(view)
+            if action[0] == Action.END or not applyAction(player, action):
+                break
+            done += 1
+        return done
+
+    def __call__(self, player: Player, lobby=None):
+        return self.play(player, lobby.round if lobby is not None else 0)
+
+
+class GreedyValuePolicy(Policy):
+    """
+    贪心策略：优先把备战席角色上阵，然后买入“攻击 × 生命 / 价格”最高的角色，
+    金币富余时升级商店
+    """
+
+    def __init__(self, upgrade_reserve: int = 10):
+        """
+        :param upgrade_reserve: 升级商店后至少保留的金币
+        """
+        self.upgrade_reserve = upgrade_reserve
+
+    def value(self, info: UnitInfo) -> float:
+        return info.atk * info.hp / max(info.price, 1)
+
+    def placeAction(self, view: StateView):
+        for idx, char in enumerate(view.bench, start=1):
+            if char is not None:
+                slot = view.freeSlot(UnitInfo.of(char).rows)
+                if slot is not None:
+                    return (Action.PLACE, idx, *slot)
+        return None
+
+    def buyAction(self, view: StateView):
+        if view.benchFull():
+            return None
+        money = view.money
+        best, best_idx = -1, 0
+        for idx, char in enumerate(view.shop, start=1):
+            if char is None:
+                continue
+            info = UnitInfo.of(char)
+            if info.price <= money:
+                v = self.value(info)
+                if v > best:
+                    best, best_idx = v, idx
+        return (Action.BUY, best_idx) if best_idx else None
+
+    def decide(self, view: StateView) -> tuple:
+        action = self.placeAction(view)
+        if action is not None:
+            return action
+        if view.money >= 10 + self.upgrade_reserve and view.grade < min(view.round // 2, view.max_grade):
+            return (Action.UPGRADE,)
+        action = self.buyAction(view)
+        if action is not None:
+            return action
+        return END_ACTION
+
+
+class FetterPolicy(GreedyValuePolicy):
+    """
+    羁绊策略：锁定已拥有角色中最多的羁绊，优先买入该羁绊的角色；
+    商店中没有目标羁绊的角色且金币充足时刷新商店
+    """
+
+    def __init__(self, upgrade_reserve: int = 10, refresh_reserve: int = 6):
+        """
+        :param refresh_reserve: 刷新商店后至少保留的金币
+        """
+        super().__init__(upgrade_reserve)
+        self.refresh_reserve = refresh_reserve
+
+    def targetFetter(self, view: StateView):
+        counts = view.fetterCounts()
+        if not counts:
+            return None
+        return max(counts, key=counts.get)
+
+    def decide(self, view: StateView) -> tuple:
+        action = self.placeAction(view)
+        if action is not None:
+            return action
+        target = self.targetFetter(view)
+        if target is not None and not view.benchFull():
+            money = view.money
+            for idx, char in enumerate(view.shop, start=1):
+                if char is not None:
+                    info = UnitInfo.of(char)
+                    if target in info.fetters and info.price <= money:
+                        return (Action.BUY, idx)
+            if money >= 2 + self.refresh_reserve:
+                return (Action.REFRESH,)
+        return super().decide(view)
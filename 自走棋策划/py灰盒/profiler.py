@@ -0,0 +1,170 @@
+"""
+profiler.py - 战斗热点路径的分阶段计时
+开启后临时替换选敌、攻击、伤害结算、事件广播、日志等函数，按阶段累计调用次数和纳秒耗时；
+关闭时恢复原函数，不开启就没有任何额外开销
+
+用法：
+    from profiler import profiler
+    with profiler:
+        simulateLobbies(10)
+    print(profiler.summary())
+    profiler.saveFlamegraph("logs/battle.folded")   # 可交给 flamegraph.pl / speedscope
+
+    python profiler.py [-n 对局数] [--seed 种子] [--flamegraph 输出文件]
+"""
+import argparse
+import importlib
+import time
+
+# (模块, 属性路径, 阶段名)，同一函数的别名使用相同的阶段名
+# 只替换模块或类上的属性，被其他模块 from ... import 过的名字不会被替换
+HOOKS = [
+    ("simulator", "generateActionList", "generateActionList"),
+    ("simulator", "attackSelector", "attackSelector"),
+    ("simulator", "attack", "attack"),
+    ("entity", "Character.getHurt", "Character.getHurt"),
+    ("util", "EventManager.broadcast", "EventManager.broadcast"),
+    ("util", "EventManager.__call__", "EventManager.broadcast"),
+    ("util", "Log.console", "Log.console"),
+]
+
+
+class Profiler:
+    """
+    分阶段计时器
+    """
+
+    def __init__(self, hooks: list = None):
+        self.hooks = hooks if hooks is not None else HOOKS
+        self.enabled = False
+        # {阶段名: [调用次数, 累计纳秒, 自身纳秒]}
+        self.calls = {}
+        # {调用栈: 自身纳秒}，调用栈为阶段名元组
+        self.stacks = {}
+        # 当前调用栈，每帧为 [阶段名, 子阶段累计纳秒]
+        self._stack = []
+        # {(所属对象, 属性名): 原函数}
+        self._originals = {}
+
+    def _wrap(self, phase: str, fn):
+        stack = self._stack
+        record = self._record
+        perf_counter_ns = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            frame = [phase, 0]
+            stack.append(frame)
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                record(frame, elapsed)
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+
+        wrapper.__name__ = getattr(fn, "__name__", phase)
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def _record(self, frame: list, elapsed: int):
+        phase, children = frame
+        stat = self.calls.get(phase)
+        if stat is None:
+            stat = self.calls[phase] = [0, 0, 0]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += elapsed - children
+        key = tuple(f[0] for f in self._stack)
+        self.stacks[key] = self.stacks.get(key, 0) + elapsed - children
+
+    def enable(self):
+        """
+        替换所有挂载点的函数，开始计时
+        """
+        if self.enabled:
+            return
+        for module_name, path, phase in self.hooks:
+            owner = importlib.import_module(module_name)
+            *parents, attr = path.split(".")
+            for name in parents:
+                owner = getattr(owner, name)
+            fn = owner.__dict__[attr] if isinstance(owner, type) else getattr(owner, attr)
+            self._originals[(owner, attr)] = fn
+            setattr(owner, attr, self._wrap(phase, fn))
+        self.enabled = True
+
+    def disable(self):
+        """
+        恢复原函数，已累计的数据保留
+        """
+        if not self.enabled:
+            return
+        for (owner, attr), fn in self._originals.items():
+            setattr(owner, attr, fn)
+        self._originals = {}
+        self.enabled = False
+
+    def reset(self):
+        self.calls = {}
+        self.stacks = {}
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+        return False
+
+    def summary(self) -> str:
+        """
+        :return: 按自身耗时降序排列的文本表格
+        """
+        total = sum(stat[2] for stat in self.calls.values()) or 1
+        lines = [f"{'phase':<26}{'calls':>10}{'total(ms)':>12}{'self(ms)':>12}{'self%':>8}{'avg(us)':>10}"]
+        for phase, (count, cum, own) in sorted(self.calls.items(), key=lambda item: -item[1][2]):
+            lines.append(
+                f"{phase:<26}{count:>10}{cum / 1e6:>12.2f}{own / 1e6:>12.2f}"
+                f"{own / total * 100:>7.1f}%{cum / count / 1e3:>10.2f}"
+            )
+        return "\n".join(lines)
+
+    def saveFlamegraph(self, file_path):
+        """
+        输出折叠调用栈格式（每行 "阶段;阶段;阶段 自身纳秒"），可直接交给 flamegraph.pl 或 speedscope
+        """
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for stack, own in sorted(self.stacks.items()):
+                f.write(f"{';'.join(stack)} {own}\n")
+
+    def __str__(self):
+        return f"Profiler(enabled={self.enabled}, phases={len(self.calls)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+profiler = Profiler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分阶段统计批量对局的战斗耗时")
+    parser.add_argument("-n", "--games", type=int, default=5, help="模拟的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--flamegraph", help="输出折叠调用栈文件")
+    args = parser.parse_args()
+
+    from lobby import simulateLobbies
+    with profiler:
+        simulateLobbies(args.games, seed=args.seed)
+    print(profiler.summary())
+    if args.flamegraph:
+        profiler.saveFlamegraph(args.flamegraph)
+        print(f"已生成 {args.flamegraph}。")
+
+
+if __name__ == "__main__":
+    main()
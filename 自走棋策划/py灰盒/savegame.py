@@ -0,0 +1,268 @@
+"""
+savegame.py - 存档：把 MainGame / Player 的局外状态编码为紧凑的二进制
+包括玩家金币和血量、商店等级和锁定、备战席、阵容站位以及卡池剩余数量，
+用于每回合自动存档和在工作进程之间传递玩家状态
+
+格式（小端）：
+    文件头  4s 魔数 b"WLSG" | H 版本号 | B 内容类型（1 = MainGame，2 = Player）
+    MainGame  H 大阶段 | H 小回合 | Player
+    Player    ID | i 金币 | i 最大血量 | i 当前血量 | 卡池 | 商店 | 备战席 | 阵容
+    ID        B 类型（0 = 整数，1 = UUID，2 = 字符串）| q / 16s / H 长度 + UTF-8
+    卡池      H 角色数 | 每个角色 H 角色ID + H 剩余数量
+    商店      B 商店等级 | H 锁定位掩码 | 行
+    行        B 格子数 | 每格 H 角色ID（0 表示空位）
+    阵容      ID | front、middle、back、bench 四行
+角色在局外不会受伤，只保存角色ID，读档时按配置重新生成
+"""
+import os
+import struct
+import uuid
+
+from util import *
+from entity import Character, Entity
+from grid import GameRow, GameGrid
+from card_pool import CardPool
+from game import Player, MainGame
+
+SAVE_MAGIC = b"WLSG"
+SAVE_VERSION = 1
+
+KIND_GAME = 1
+KIND_PLAYER = 2
+
+GRID_ROWS = ("front", "middle", "back", "bench")
+
+_HEADER = struct.Struct("<4sHB")
+_STAGE = struct.Struct("<HH")
+_PLAYER_ATTRS = struct.Struct("<iii")
+_SHOP = struct.Struct("<BH")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_I64 = struct.Struct("<q")
+
+_ID_INT = 0
+_ID_UUID = 1
+_ID_STR = 2
+
+
+def _charId(char) -> int:
+    return int(char.getAttr("info.id")) if isinstance(char, Character) else 0
+
+
+class SaveWriter:
+    """
+    按顺序写入各部分，最后一次性拼接
+    """
+
+    def __init__(self):
+        self.parts: list[bytes] = []
+
+    def pack(self, packer: struct.Struct, *values):
+        self.parts.append(packer.pack(*values))
+
+    def writeId(self, value):
+        if isinstance(value, bool) or not isinstance(value, (int, uuid.UUID, str)):
+            raise TypeError(f"无法保存的ID类型 {type(value).__name__}")
+        if isinstance(value, int):
+            self.parts.append(_U8.pack(_ID_INT) + _I64.pack(value))
+        elif isinstance(value, uuid.UUID):
+            self.parts.append(_U8.pack(_ID_UUID) + value.bytes)
+        else:
+            data = value.encode("utf-8")
+            self.parts.append(_U8.pack(_ID_STR) + _U16.pack(len(data)) + data)
+
+    def writeRow(self, game_row: GameRow):
+        n = game_row.max_length
+        self.parts.append(struct.pack(f"<B{n}H", n, *map(_charId, game_row.entities)))
+
+    def writeGrid(self, team: GameGrid):
+        self.writeId(team.team_id)
+        for row_name in GRID_ROWS:
+            self.writeRow(team.grid[row_name])
+
+    def writePool(self, pool: CardPool):
+        counts = []
+        for tier, ids in pool.tier_ids.items():
+            weights = pool.tier_trees[tier].weights
+            for char_id, weight in zip(ids, weights):
+                counts += (int(char_id), weight)
+        self.parts.append(struct.pack(f"<H{len(counts)}H", len(counts) // 2, *counts))
+
+    def writePlayer(self, player: Player):
+        shop = player.shop
+        self.writeId(player.getAttr("id"))
+        self.pack(_PLAYER_ATTRS, player.getAttr("money"), player.getAttr("max.hp"), player.getAttr("current.hp"))
+        self.writePool(shop.pool)
+        mask = sum(1 << i for i, locked in enumerate(shop.characters.locked) if locked)
+        self.pack(_SHOP, shop.grade, mask)
+        self.writeRow(shop.characters)
+        self.writeRow(player.characters)
+        self.writeGrid(player.team)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class SaveReader:
+    """
+    按写入顺序读取，读档时直接修改传入的对象，不广播事件
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+        # 角色配置只读一次，Character.byId 每次都会重新读取配置文件
+        self.char_configs = loadJsonConfig(BASE_DIR / 'character_config.json')
+
+    def unpack(self, packer: struct.Struct) -> tuple:
+        try:
+            values = packer.unpack_from(self.data, self.offset)
+        except struct.error as e:
+            raise ValueError(f"存档数据不完整：{e}") from None
+        self.offset += packer.size
+        return values
+
+    def readFormat(self, fmt: str) -> tuple:
+        return self.unpack(struct.Struct(fmt))
+
+    def readId(self):
+        kind, = self.unpack(_U8)
+        if kind == _ID_INT:
+            return self.unpack(_I64)[0]
+        if kind == _ID_UUID:
+            return uuid.UUID(bytes=bytes(self.readFormat("<16s")[0]))
+        if kind == _ID_STR:
+            length, = self.unpack(_U16)
+            return bytes(self.readFormat(f"<{length}s")[0]).decode("utf-8")
+        raise ValueError(f"未知的ID类型 {kind}")
+
+    def readRow(self, events: EventManager = None) -> list:
+        """
+        :return: 角色实例列表，空位为 None
+        """
+        n, = self.unpack(_U8)
+        configs = self.char_configs
+        return [
+            Character(configs.get(str(char_id).zfill(4), EMPTY_CHARACTER_CONFIG), events) if char_id else None
+            for char_id in self.readFormat(f"<{n}H")
+        ]
+
+    def readGrid(self, team: GameGrid, events: EventManager = None):
+        team.team_id = self.readId()
+        for row_name in GRID_ROWS:
+            game_row = team.grid[row_name]
+            game_row.entities = self.readRow(events)
+            game_row.max_length = len(game_row.entities)
+            # 与 GameGrid.setCharacter 记录相同的站位信息，但不经过 Character.setAttr，不广播 onAttrChange
+            for pos, char in enumerate(game_row.entities, start=1):
+                if char is not None:
+                    Entity.setAttr(char, "info.position", (row_name, pos))
+                    Entity.setAttr(char, "info.team_id", team.team_id)
+
+    def readPool(self, pool: CardPool):
+        n, = self.unpack(_U16)
+        counts = self.readFormat(f"<{n * 2}H")
+        for char_id, weight in zip(counts[::2], counts[1::2]):
+            key = str(char_id).zfill(4)
+            if key in pool.index:
+                tier, i = pool.index[key]
+                tree = pool.tier_trees[tier]
+                tree.add(i, weight - tree.weights[i])
+
+    def readPlayer(self, player: Player):
+        events = player.events
+        shop = player.shop
+        Entity.setAttr(player, "id", self.readId())
+        money, max_hp, current_hp = self.unpack(_PLAYER_ATTRS)
+        Entity.setAttr(player, "money", money)
+        Entity.setAttr(player, "max.hp", max_hp)
+        Entity.setAttr(player, "current.hp", current_hp)
+        # 卡池计数已包含商店里的角色，直接覆盖；玩家应以 refresh_shop=False 创建，商店里没有从卡池抽出的角色
+        self.readPool(shop.pool)
+        grade, mask = self.unpack(_SHOP)
+        shop.grade = grade
+        shop.characters.entities = self.readRow(events)
+        shop.characters.max_length = len(shop.characters.entities)
+        shop.characters.locked = [bool(mask >> i & 1) for i in range(shop.characters.max_length)]
+        player.characters.entities = self.readRow(events)
+        player.characters.max_length = len(player.characters.entities)
+        self.readGrid(player.team, events)
+
+    def readHeader(self, kind: int) -> int:
+        magic, version, data_kind = self.unpack(_HEADER)
+        if magic != SAVE_MAGIC:
+            raise ValueError("不是存档文件")
+        if version > SAVE_VERSION:
+            raise ValueError(f"存档版本 {version} 高于当前支持的版本 {SAVE_VERSION}")
+        if data_kind != kind:
+            raise ValueError(f"存档内容类型为 {data_kind}，需要 {kind}")
+        return version
+
+    def finish(self):
+        if self.offset != len(self.data):
+            raise ValueError(f"存档末尾有 {len(self.data) - self.offset} 字节多余数据")
+
+
+def dumpPlayer(player: Player) -> bytes:
+    """
+    编码单个玩家（含其卡池），用于在进程之间传递
+    """
+    writer = SaveWriter()
+    writer.pack(_HEADER, SAVE_MAGIC, SAVE_VERSION, KIND_PLAYER)
+    writer.writePlayer(player)
+    return writer.getvalue()
+
+
+def loadPlayer(data: bytes, pool: CardPool = None, events: EventManager = None) -> Player:
+    """
+    :param pool: 玩家使用的卡池，会被存档中的剩余数量覆盖；为空时新建一个
+    :param events: 玩家所属的事件管理器
+    """
+    reader = SaveReader(data)
+    reader.readHeader(KIND_PLAYER)
+    # 商店由存档填充，不从卡池抽取，共享卡池的计数在读档前后保持一致
+    player = Player(pool=pool if pool is not None else CardPool(), events=events, refresh_shop=False)
+    reader.readPlayer(player)
+    reader.finish()
+    return player
+
+
+def dumps(game: MainGame) -> bytes:
+    """
+    编码整局游戏
+    """
+    writer = SaveWriter()
+    writer.pack(_HEADER, SAVE_MAGIC, SAVE_VERSION, KIND_GAME)
+    writer.pack(_STAGE, *game.game_stage)
+    writer.writePlayer(game.player)
+    return writer.getvalue()
+
+
+def loads(data: bytes, policy=None) -> MainGame:
+    """
+    :param policy: 读档后游戏使用的自动决策策略
+    """
+    reader = SaveReader(data)
+    reader.readHeader(KIND_GAME)
+    game = MainGame(policy=policy, refresh_shop=False)
+    game.game_stage = reader.unpack(_STAGE)
+    reader.readPlayer(game.player)
+    reader.finish()
+    return game
+
+
+def save(game: MainGame, file_path):
+    """
+    写入存档文件，先写临时文件再替换，写入中断不会损坏旧存档
+    """
+    file_path = str(file_path)
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(game))
+    os.replace(tmp_path, file_path)
+
+
+def load(file_path, policy=None) -> MainGame:
+    with open(file_path, 'rb') as f:
+        return loads(f.read(), policy)
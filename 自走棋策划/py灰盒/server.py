@@ -0,0 +1,528 @@
+"""
+server.py - asyncio 对局服务器与脚本化客户端
+服务器同时托管多局游戏：玩家加入后自动分配到未满的对局，满员后开局；
+每回合收集所有玩家的商店/布阵动作，全部结束后在进程池中结算战斗，不阻塞事件循环
+
+协议：每行一个 JSON 请求，服务器按行返回 JSON 响应
+    {"op": "join"}                          -> {"ok": true, "lobby": 对局ID, "player": 玩家ID}
+    {"op": "wait"}                          -> 等到新回合的操作阶段，返回 {"ok": true, "state": {...}}；
+                                               对局结束返回 {"ok": true, "over": true, "ranking": [...]}，
+                                               被淘汰返回 {"ok": true, "over": true, "eliminated": true}，
+                                               战斗结算出错返回 {"ok": false, "over": true, "error": 错误信息}
+    {"op": "act", "action": [...]}          -> 执行一个动作（格式参照 policy.Action），返回 {"ok": 是否成功, "state": {...}}
+    {"op": "end"}                           -> 结束本回合操作
+    {"op": "state"}                         -> 当前状态
+    {"op": "stats"}                         -> 服务器统计
+    无法解析、格式错误或处理出错的请求返回 {"ok": false, "error": 错误信息}，连接不会断开
+
+用法：
+    python server.py serve [--host 127.0.0.1] [--port 8765] [--players 8]
+    python server.py loadtest [-n 客户端数] [--players 每局人数] [--tcp] [--workers 进程数]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from util import *
+from entity import Character
+from game import Player
+from lobby import Lobby, teamUnits, simulateBattle, BATTLE_ROWS
+from policy import Action, applyAction
+
+# 操作阶段的超时时间（秒），超时后未结束的玩家自动结束
+TURN_TIMEOUT = 30
+
+
+def _initWorker():
+    log.enabled = False
+
+
+def playerState(player: Player, lobby: Lobby) -> dict:
+    """
+    玩家可见的状态，只包含 JSON 类型
+    """
+    shop = player.shop
+    return {
+        "round": lobby.round,
+        "money": player.getAttr("money"),
+        "hp": player.getAttr("current.hp"),
+        "grade": shop.grade,
+        "shop": [
+            [idx, char.getAttr("info.id"), char.getAttr("info.price")] if isinstance(char, Character) else None
+            for idx, char in enumerate(shop.characters.entities, start=1)
+        ],
+        "locked": list(shop.characters.locked),
+        "bench": [
+            [idx, char.getAttr("info.id")] if isinstance(char, Character) else None
+            for idx, char in enumerate(player.characters.entities, start=1)
+        ],
+        "team": teamUnits(player.team),
+    }
+
+
+class LobbySession:
+    """
+    服务器上的一局游戏
+    """
+
+    def __init__(self, server: "GameServer", lobby_id: int, player_num: int, seed: int = None):
+        self.server = server
+        self.lobby_id = lobby_id
+        self.lobby = Lobby([], player_num, seed=seed)
+        self.player_num = player_num
+        # {玩家ID: Player}，加入的玩家依次占用座位
+        self.seats: dict = {}
+        # 本回合已结束操作的玩家
+        self.ended: set = set()
+        # 已断开连接的玩家，之后每回合自动结束
+        self.absent: set = set()
+        # waiting / shop / battle / over
+        self.phase = "waiting"
+        # 结算出错时的错误信息，对局随之结束
+        self.error: str | None = None
+        self.changed = asyncio.Condition()
+        self._timeout: asyncio.TimerHandle | None = None
+
+    def isFull(self) -> bool:
+        return len(self.seats) >= self.player_num
+
+    def join(self) -> Player:
+        player = self.lobby.players[len(self.seats)]
+        self.seats[player.getAttr("id")] = player
+        if self.isFull():
+            self._startRound()
+        return player
+
+    def isAlive(self, player: Player) -> bool:
+        return player.getAttr("current.hp") > 0
+
+    async def _notify(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    def _startRound(self):
+        lobby = self.lobby
+        lobby.round += 1
+        self.ended = {pid for pid in self.absent}
+        order = lobby.alivePlayers()
+        lobby.rng.shuffle(order)
+        for player in order:
+            with lobby.events.batch():
+                lobby.beginTurn(player)
+        self.phase = "shop"
+        self._timeout = asyncio.get_running_loop().call_later(TURN_TIMEOUT, self._forceEnd, lobby.round)
+        asyncio.ensure_future(self._notify())
+        self._checkTurnOver()
+
+    def _forceEnd(self, round_num: int):
+        if self.phase == "shop" and self.lobby.round == round_num:
+            self.ended.update(self.seats)
+            self._checkTurnOver()
+
+    def endTurn(self, player_id):
+        self.ended.add(player_id)
+        self._checkTurnOver()
+
+    def leave(self, player_id):
+        self.absent.add(player_id)
+        if self.phase == "shop":
+            self.endTurn(player_id)
+
+    def _checkTurnOver(self):
+        if self.phase != "shop":
+            return
+        alive = {p.getAttr("id") for p in self.lobby.alivePlayers()}
+        if alive <= self.ended:
+            self.phase = "battle"
+            if self._timeout is not None:
+                self._timeout.cancel()
+            asyncio.ensure_future(self._resolveRound())
+
+    async def _resolveRound(self):
+        """
+        在进程池中结算本回合的全部战斗，然后开始下一回合或结束对局
+        作为独立任务运行，出错时结束对局并通知等待中的客户端，不能让客户端一直等下去
+        """
+        try:
+            await self._playBattles()
+        except Exception as e:
+            await self._fail(e)
+
+    async def _playBattles(self):
+        lobby = self.lobby
+        loop = asyncio.get_running_loop()
+        pairs = lobby.pairPlayers()
+        futures = [
+            loop.run_in_executor(
+                self.server.executor, simulateBattle,
+                teamUnits(player.team), teamUnits(opponent.team), lobby.rng.randrange(2 ** 32),
+            )
+            for player, opponent, _ in pairs
+        ]
+        results = await asyncio.gather(*futures)
+        self.server.battles += len(results)
+        for (player, opponent, is_ghost), result in zip(pairs, results):
+            lobby.applyBattle(player, opponent, is_ghost, result)
+        lobby.finishRound()
+
+        if lobby.isOver():
+            self.phase = "over"
+            for player in lobby.players:
+                player.dispose()
+            self.server.finished += 1
+            await self._notify()
+        else:
+            self._startRound()
+
+    async def _fail(self, error: Exception):
+        self.phase = "over"
+        self.error = f"对局 {self.lobby_id} 结算出错：{error!r}"
+        log.console(self.error, "ERROR")
+        for player in self.lobby.players:
+            player.dispose()
+        self.server.failed += 1
+        await self._notify()
+
+    async def wait(self, player: Player, last_round: int) -> dict:
+        """
+        等到 last_round 之后的操作阶段或对局结束
+        """
+        player_id = player.getAttr("id")
+
+        def ready():
+            return (
+                self.phase == "over"
+                or not self.isAlive(player)
+                or (self.phase == "shop" and self.lobby.round > last_round and player_id not in self.ended)
+            )
+
+        async with self.changed:
+            await self.changed.wait_for(ready)
+        if self.error is not None:
+            return {"ok": False, "over": True, "error": self.error}
+        if self.phase == "over":
+            return {"ok": True, "over": True, "ranking": self.lobby.ranking()}
+        if not self.isAlive(player):
+            return {"ok": True, "over": True, "eliminated": True}
+        return {"ok": True, "state": playerState(player, self.lobby)}
+
+
+class Connection:
+    """
+    一个客户端连接的会话状态
+    """
+
+    def __init__(self, server: "GameServer"):
+        self.server = server
+        self.session: LobbySession | None = None
+        self.player: Player | None = None
+        self.last_round = 0
+
+    async def handle(self, request: dict) -> dict:
+        """
+        处理一个请求；请求格式错误或处理出错时返回 {"ok": false, "error": ...}，连接可以继续使用
+        """
+        self.server.requests += 1
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "请求必须是 JSON 对象"}
+        try:
+            return await self._handle(request)
+        except Exception as e:
+            log.console(f"处理请求 {request} 出错：{e!r}", "ERROR")
+            return {"ok": False, "error": f"处理请求出错：{e!r}"}
+
+    async def _handle(self, request: dict) -> dict:
+        op = request.get("op")
+        session, player = self.session, self.player
+        if op == "join":
+            if session is not None:
+                return {"ok": False, "error": "已加入对局"}
+            self.session = session = self.server.openSession()
+            self.player = player = session.join()
+            return {"ok": True, "lobby": session.lobby_id, "player": player.getAttr("id")}
+        if op == "stats":
+            return {"ok": True, "stats": self.server.stats()}
+        if session is None:
+            return {"ok": False, "error": "尚未加入对局"}
+        player_id = player.getAttr("id")
+        match op:
+            case "wait":
+                res = await session.wait(player, self.last_round)
+                self.last_round = session.lobby.round
+                return res
+            case "state":
+                return {"ok": True, "phase": session.phase, "state": playerState(player, session.lobby)}
+            case "act":
+                if session.phase != "shop" or player_id in session.ended:
+                    return {"ok": False, "error": "当前不是操作阶段"}
+                action = request.get("action")
+                if not isinstance(action, list) or not action or action[0] == Action.END:
+                    return {"ok": False, "error": "动作格式错误", "state": playerState(player, session.lobby)}
+                with session.lobby.events.batch():
+                    ok = applyAction(player, tuple(action))
+                return {"ok": ok, "state": playerState(player, session.lobby)}
+            case "end":
+                if session.phase == "shop":
+                    session.endTurn(player_id)
+                return {"ok": True}
+            case _:
+                return {"ok": False, "error": f"未知操作 {op}"}
+
+    def close(self):
+        if self.session is not None and self.session.phase != "over":
+            self.session.leave(self.player.getAttr("id"))
+
+
+class GameServer:
+    """
+    托管多局游戏的服务器
+    """
+
+    def __init__(self, player_num: int = 8, executor: Executor = None, workers: int = None, seed: int = None):
+        """
+        :param player_num: 每局玩家数量
+        :param executor: 结算战斗使用的执行器，默认创建进程池
+        :param workers: 默认进程池的进程数
+        :param seed: 随机种子，用于生成每局的种子
+        """
+        self.player_num = player_num
+        self.own_executor = executor is None
+        # 用 spawn 启动工作进程，fork 会让工作进程继承已建立的 socket，客户端断开后连接无法关闭
+        self.executor = executor if executor is not None else ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_initWorker,
+        )
+        self.rng = random.Random(seed)
+        self.sessions: dict[int, LobbySession] = {}
+        self._open: LobbySession | None = None
+        self.requests = 0
+        self.battles = 0
+        self.finished = 0
+        self.failed = 0
+        self._server: asyncio.AbstractServer | None = None
+        # 正在处理的 socket 连接
+        self._handlers: set[asyncio.Task] = set()
+
+    def openSession(self) -> LobbySession:
+        """
+        :return: 未满的对局，没有时新建一个
+        """
+        if self._open is None or self._open.isFull():
+            lobby_id = len(self.sessions) + 1
+            self._open = LobbySession(self, lobby_id, self.player_num, seed=self.rng.randrange(2 ** 32))
+            self.sessions[lobby_id] = self._open
+        return self._open
+
+    def connect(self) -> "LocalClient":
+        """
+        进程内连接，不经过网络
+        """
+        return LocalClient(Connection(self))
+
+    async def _handleStream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = Connection(self)
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"ok": False, "error": f"无法解析请求：{e}"}
+                else:
+                    response = await conn.handle(request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            conn.close()
+            writer.close()
+            self._handlers.discard(task)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        self._server = await asyncio.start_server(self._handleStream, host, port, limit=2 ** 20)
+        return self._server
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._handlers:
+            # 等客户端断开后的连接处理结束
+            await asyncio.wait(self._handlers, timeout=1)
+        if self.own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "lobbies": len(self.sessions),
+            "finished": self.finished,
+            "failed": self.failed,
+            "players": sum(len(s.seats) for s in self.sessions.values()),
+            "requests": self.requests,
+            "battles": self.battles,
+        }
+
+
+class LocalClient:
+    """
+    进程内传输，直接调用服务器的连接处理函数
+    """
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+
+    async def request(self, message: dict) -> dict:
+        return await self.conn.handle(message)
+
+    async def close(self):
+        self.conn.close()
+
+
+class TcpClient:
+    """
+    通过本地 socket 连接服务器
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str = "127.0.0.1", port: int = 8765) -> "TcpClient":
+        reader, writer = await asyncio.open_connection(host, port, limit=2 ** 20)
+        return cls(reader, writer)
+
+    async def request(self, message: dict) -> dict:
+        self.writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def scriptedActions(state: dict) -> list:
+    """
+    脚本客户端的决策：买下能买得起的最便宜的角色，再把备战席上的角色放到阵容空位上
+    :return: 依次执行的动作列表，每执行一个动作后根据新状态重新决策
+    """
+    bench_free = sum(1 for slot in state["bench"] if slot is None)
+    offers = sorted((price, idx) for idx, _, price in filter(None, state["shop"]))
+    for price, idx in offers:
+        if price <= state["money"] and bench_free > 0:
+            return [[Action.BUY, idx]]
+    for slot in filter(None, state["bench"]):
+        for row_name in BATTLE_ROWS:
+            for pos, char_id in enumerate(state["team"][row_name], start=1):
+                if char_id is None:
+                    return [[Action.PLACE, slot[0], row_name, pos]]
+    return []
+
+
+async def scriptedClient(client, max_actions: int = 32) -> dict:
+    """
+    脚本化客户端：加入对局并按 scriptedActions 自动操作直到对局结束或被淘汰
+    :return: {"player": 玩家ID, "rounds": 参与的回合数, "requests": 请求数, "result": 最后一次 wait 的响应}
+    """
+    requests = 1
+    joined = await client.request({"op": "join"})
+    rounds = 0
+    while True:
+        res = await client.request({"op": "wait"})
+        requests += 1
+        if res.get("over"):
+            break
+        rounds += 1
+        state = res["state"]
+        for _ in range(max_actions):
+            actions = scriptedActions(state)
+            if not actions:
+                break
+            res_act = await client.request({"op": "act", "action": actions[0]})
+            requests += 1
+            if not res_act["ok"]:
+                break
+            state = res_act["state"]
+        await client.request({"op": "end"})
+        requests += 1
+    await client.close()
+    return {"player": joined.get("player"), "rounds": rounds, "requests": requests, "result": res}
+
+
+async def loadTest(num_clients: int = 64, player_num: int = 8, tcp: bool = False, workers: int = None,
+                   seed: int = None, port: int = 0) -> dict:
+    """
+    启动服务器并用 num_clients 个脚本客户端并发游戏
+    :param tcp: 为 True 时通过本地 socket 连接，否则使用进程内传输
+    :return: 耗时、请求数、对局数等统计
+    """
+    server = GameServer(player_num, workers=workers, seed=seed)
+    start = time.perf_counter()
+    try:
+        if tcp:
+            tcp_server = await server.start("127.0.0.1", port)
+            host, port = tcp_server.sockets[0].getsockname()[:2]
+            clients = [await TcpClient.open(host, port) for _ in range(num_clients)]
+        else:
+            clients = [server.connect() for _ in range(num_clients)]
+        # 人数不足一局的对局不会开始，只让凑满的客户端参与
+        playing = clients[:num_clients - num_clients % player_num]
+        for client in clients[len(playing):]:
+            await client.close()
+        results = await asyncio.gather(*(scriptedClient(client) for client in playing))
+    finally:
+        await server.stop()
+    elapsed = time.perf_counter() - start
+    requests = sum(r["requests"] for r in results)
+    return {
+        "clients": len(results),
+        "elapsed": elapsed,
+        "requests": requests,
+        "requests_per_sec": requests / elapsed if elapsed else 0,
+        **{k: v for k, v in server.stats().items() if k != "requests"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio 对局服务器")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="启动服务器")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--players", type=int, default=8, help="每局玩家数量")
+    serve.add_argument("--workers", type=int, default=None, help="结算战斗的进程数")
+    load = sub.add_parser("loadtest", help="用脚本客户端压测")
+    load.add_argument("-n", "--clients", type=int, default=64, help="客户端数量")
+    load.add_argument("--players", type=int, default=8, help="每局玩家数量")
+    load.add_argument("--tcp", action="store_true", help="通过本地 socket 连接，默认进程内传输")
+    load.add_argument("--workers", type=int, default=None, help="结算战斗的进程数")
+    load.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    log.enabled = False
+    if args.command == "serve":
+        async def serveForever():
+            server = GameServer(args.players, workers=args.workers)
+            tcp_server = await server.start(args.host, args.port)
+            print(f"服务器已启动：{args.host}:{args.port}")
+            async with tcp_server:
+                await tcp_server.serve_forever()
+        asyncio.run(serveForever())
+    else:
+        res = asyncio.run(loadTest(args.clients, args.players, args.tcp, args.workers, args.seed))
+        print(
+            f"{res['clients']} 个客户端，{res['lobbies']} 局（完成 {res['finished']} 局），"
+            f"{res['battles']} 场战斗，{res['requests']} 个请求，"
+            f"耗时 {res['elapsed']:.2f}s，{res['requests_per_sec']:.0f} 请求/秒"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,28 @@
 import random
 from entity import Entity, Character, Damage
 from grid import GameGrid, GameBoard, GameRow
-from character import BattleCharacter
 from util import *
+from skills import SkillEngine
+
+# 战斗规则版本号，修改战斗结算逻辑后需递增，用于使缓存的战斗结果失效
+ENGINE_VERSION = "2"
 
 def attack(attacker_info: tuple, defender_info: tuple, skill = None) -> int:
     attacker, attacker_team = attacker_info
     defender, defender_team = defender_info
 
+    attacker.events.broadcast('onAttack', source=attacker, target=defender)
     damage: Damage = attacker.getAttackDamage()
-    log.console(f"[{attacker_team}]{attacker.getAttr('name')}({attacker.getInGameAttr('atk')}/{attacker.getInGameAttr('current_hp')})[/{attacker_team}] 攻击 [{defender_team}]{defender.getAttr('name')}({defender.getInGameAttr('atk')}/{defender.getInGameAttr('current_hp')})[/{defender_team}] 造成了 {damage.amount} 点伤害。")
+    log.console(f"[{attacker_team}]{attacker.getAttr('name')}({attacker.getAttr('current.atk')}/{attacker.getAttr('current.hp')})[/{attacker_team}] 攻击 [{defender_team}]{defender.getAttr('name')}({defender.getAttr('current.atk')}/{defender.getAttr('current.hp')})[/{defender_team}] 造成了 {damage.damage} 点伤害。")
     defender.getHurt(damage)
-    log.console(f"[{defender_team}]{defender.getAttr('name')} 当前状态： {defender.getInGameAttr('atk')}/{defender.getInGameAttr('current_hp')}[/{defender_team}]")
+    damage.release()
+    log.console(f"[{defender_team}]{defender.getAttr('name')} 当前状态： {defender.getAttr('current.atk')}/{defender.getAttr('current.hp')}[/{defender_team}]")
 
     counter_attack_damage: Damage = defender.getAttackDamage()
-    log.console(f"[{defender_team}]{defender.getAttr('name')}({defender.getInGameAttr('atk')}/{defender.getInGameAttr('current_hp')})[/{defender_team}] 反击了 [{attacker_team}]{attacker.getAttr('name')}({attacker.getInGameAttr('atk')}/{attacker.getInGameAttr('current_hp')})[/{attacker_team}] 造成了 {counter_attack_damage.amount} 点伤害。")
+    log.console(f"[{defender_team}]{defender.getAttr('name')}({defender.getAttr('current.atk')}/{defender.getAttr('current.hp')})[/{defender_team}] 反击了 [{attacker_team}]{attacker.getAttr('name')}({attacker.getAttr('current.atk')}/{attacker.getAttr('current.hp')})[/{attacker_team}] 造成了 {counter_attack_damage.damage} 点伤害。")
     attacker.getHurt(counter_attack_damage)
-    log.console(f"[{attacker_team}]{attacker.getAttr('name')} 当前状态： {attacker.getInGameAttr('atk')}/{attacker.getInGameAttr('current_hp')}[/{attacker_team}]")
+    counter_attack_damage.release()
+    log.console(f"[{attacker_team}]{attacker.getAttr('name')} 当前状态： {attacker.getAttr('current.atk')}/{attacker.getAttr('current.hp')}[/{attacker_team}]")
 
 
 def attackSelector(char: Character, aimed_group: GameGrid) -> Entity | None:
@@ -45,7 +51,14 @@ def attackSelector(char: Character, aimed_group: GameGrid) -> Entity | None:
     return aimed_entity
 
 
-def attackSimulator(game_board: GameBoard):
+def attackSimulator(game_board: GameBoard, headless: bool = False, max_rounds: int = 100) -> str | None:
+    """
+    模拟一场战斗直到一方全灭
+    :param game_board: 对战棋盘
+    :param headless: 无界面模式，不绘制棋盘、不等待，用于批量模拟
+    :param max_rounds: 最大回合数，超过后判为平局
+    :return: 获胜方 "RED" / "BLUE"，平局返回 None
+    """
     red_group = game_board.red_group
     blue_group = game_board.blue_group
 
@@ -53,32 +66,45 @@ def attackSimulator(game_board: GameBoard):
 
     import time
 
-    while not game_board.isBattleOver():
-        time.sleep(0.5)
+    events = game_board.events
+    skill_engine = SkillEngine(game_board.getCharacterList(), events)
+    events.broadcast('onGameStart')
+
+    while not game_board.isBattleOver() and round_counter <= max_rounds:
+        if not headless:
+            time.sleep(0.5)
         log.console(f"--- Round {round_counter} ---")
+        events.broadcast('onTurnStart', turn_count=round_counter)
         round_counter += 1
-        act_list = generateActionList(game_board)
+        act_list = generateActionList(game_board, draw=not headless)
         for char in act_list:
             attacker: Character = char
-            if not attacker.alive:
+            if not attacker.isAlive():
                 continue
             aimed_group = game_board.getOtherTeam(attacker)
             aimed_entity = attackSelector(attacker, aimed_group)
-            if aimed_entity is not None and isinstance(aimed_entity, Character):
+            if isinstance(aimed_entity, Character) and aimed_entity.isAlive():
                 attack((attacker, game_board.getTeamById(attacker.getAttr("team_id")).lower()), (aimed_entity, game_board.getTeamById(aimed_entity.getAttr("team_id")).lower()))
                 if not aimed_entity.isAlive():
                     log.console(f"{aimed_entity.getAttr('name')} has been defeated!")
-                game_board.draw()
+                if not headless:
+                    game_board.draw()
 
+    skill_engine.dispose()
     log.console("Battle Over!")
+    red_dead, blue_dead = red_group.isAllDead(), blue_group.isAllDead()
+    if red_dead == blue_dead:
+        return None
+    return "BLUE" if red_dead else "RED"
 
-def generateActionList(game_board: GameBoard) -> list[Character]:
+def generateActionList(game_board: GameBoard, draw: bool = True) -> list[Character]:
 
     character_list: list[Character] = game_board.getCharacterList()
     for char in character_list:
         char.rollInitiative()
-    action_row = GameRow.byList(character_list)
-    action_row.draw()
+    if draw:
+        action_row = GameRow.byList(character_list)
+        action_row.draw()
     character_list = sorted(character_list)
 
     return character_list
@@ -0,0 +1,98 @@
+"""
+skills.py - 技能运行时
+战斗开始时把所有角色的技能按触发事件建立索引，每个事件只注册一个监听器；
+事件触发时按事件主体直接查到持有者的技能，不需要遍历全场角色的全部技能
+"""
+from util import *
+
+# 事件中表示事件主体的参数名，只有主体自己的技能会被触发
+# 不在表中的事件（如 onTurnStart、onGameStart）触发全场所有持有该技能的角色
+EVENT_SUBJECT = {
+    "onAttack": "source",
+    "beforeAttack": "source",
+    "afterAttack": "source",
+    "onGetHurt": "target",
+    "beforeGetHurt": "target",
+    "afterGetHurt": "target",
+    "onAct": "entity",
+    "onEntityDead": "entity",
+    "onAttrChange": "character",
+    "onAddStatu": "entity",
+    "onRemoveStatu": "entity",
+}
+
+
+class SkillEngine:
+    """
+    一场战斗的技能调度器
+    """
+
+    def __init__(self, characters: list, manager: EventManager = None):
+        """
+        :param characters: 参战角色
+        :param manager: 事件管理器，默认为全局的 em
+        """
+        self.manager = manager if manager is not None else em
+        # {触发事件: {角色: [技能, ...]}}
+        self.index: dict[str, dict] = {}
+        # {触发事件: 监听器}
+        self.handlers = {}
+        # 正在结算的 (角色, 技能)，防止技能效果再次触发自己造成死循环
+        self._running = set()
+
+        for char in characters:
+            for skill in char.skills:
+                if skill.trigger:
+                    self.index.setdefault(skill.trigger, {}).setdefault(char, []).append(skill)
+
+        for trigger in self.index:
+            handler = self._handler(trigger)
+            self.handlers[trigger] = handler
+            self.manager.register(trigger, handler)
+
+    def _handler(self, trigger: str):
+        owners = self.index[trigger]
+        subject = EVENT_SUBJECT.get(trigger)
+        run = self._run
+
+        if subject is None:
+            def handle(**context):
+                for char, skills in list(owners.items()):
+                    run(char, skills, context)
+        else:
+            def handle(**context):
+                char = context.get(subject)
+                skills = owners.get(char)
+                if skills:
+                    run(char, skills, context)
+
+        handle.__name__ = f"skill_{trigger}"
+        return handle
+
+    def _run(self, char, skills: list, context: dict):
+        if not char.isAlive():
+            return
+        for skill in skills:
+            key = (char, skill)
+            if key in self._running or not skill.predicate(char, context):
+                continue
+            self._running.add(key)
+            try:
+                skill.release(char, context)
+                self.manager.broadcast("onSkillReleased", entity=char, skill=skill)
+            finally:
+                self._running.discard(key)
+
+    def dispose(self):
+        """
+        战斗结束后注销全部监听器
+        """
+        for trigger, handler in self.handlers.items():
+            self.manager.unregister(trigger, handler)
+        self.handlers = {}
+
+    def __str__(self):
+        return f"SkillEngine({ {trigger: sum(len(s) for s in owners.values()) for trigger, owners in self.index.items()} })"
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PKG_DIR))
+
+from util import log
+
+# 测试中不输出日志，也就不需要 rich
+log.enabled = False
@@ -0,0 +1,119 @@
+import json
+import random
+
+import battle_cache
+from battle_cache import BattleCache, boardHash, cachedBattle, configDigest
+from entity import Character
+from grid import GameBoard, GameGrid
+from util import EventManager
+
+
+def make_board(red: list, blue: list, skills: list = None) -> GameBoard:
+    events = EventManager()
+    grids = []
+    for units in (red, blue):
+        grid = GameGrid()
+        for i, config in enumerate(units):
+            grid.setCharacter(Character({"skills": skills or [], **config}, events), "front", i + 1)
+        grids.append(grid)
+    return GameBoard(*grids, events=events)
+
+
+RED = [{"id": "0002", "attack_power": 3, "health_points": 10}]
+BLUE = [{"id": "0001", "attack_power": 1, "health_points": 20}]
+SKILL = {"id": "s1", "type": "passive", "trigger": "onAttack", "condition": [], "effect": [
+    {"type": "modify_attr", "param": "ATK+1", "mode": "self"}]}
+
+
+def test_board_hash_is_stable_and_ignores_team_ids():
+    assert boardHash(make_board(RED, BLUE), 1) == boardHash(make_board(RED, BLUE), 1)
+    assert boardHash(make_board(RED, BLUE), 1) != boardHash(make_board(RED, BLUE), 2)
+    assert boardHash(make_board(RED, BLUE), 1) != boardHash(make_board(BLUE, RED), 1)
+
+
+def test_board_hash_changes_with_skills():
+    plain = boardHash(make_board(RED, BLUE), 1)
+    with_skill = boardHash(make_board(RED, BLUE, [SKILL]), 1)
+    assert with_skill != plain
+    changed = {**SKILL, "effect": [{"type": "modify_attr", "param": "ATK+2", "mode": "self"}]}
+    assert boardHash(make_board(RED, BLUE, [changed]), 1) != with_skill
+
+
+def test_board_hash_changes_with_config_digest():
+    board = make_board(RED, BLUE)
+    assert boardHash(board, 1, "a") != boardHash(board, 1, "b")
+
+
+def test_config_digest_follows_characters_and_keywords(tmp_path):
+    chars, keywords = tmp_path / "character_config.json", tmp_path / "keyword_config.json"
+    chars.write_text(json.dumps({"0001": {"skills": [SKILL]}}), encoding="utf-8")
+    keywords.write_text(json.dumps({"sheild": {"charges": 1}}), encoding="utf-8")
+    before = configDigest([chars, keywords])
+    assert configDigest([chars, keywords]) == before
+
+    keywords.write_text(json.dumps({"sheild": {"charges": 2}}), encoding="utf-8")
+    after_keyword = configDigest([chars, keywords])
+    assert after_keyword != before
+
+    chars.write_text(json.dumps({"0001": {"skills": []}}), encoding="utf-8")
+    assert configDigest([chars, keywords]) not in (before, after_keyword)
+    # 文件内容拼接相同但分属不同文件时摘要不同
+    files = {}
+    for name, text in {"a": "xy", "b": "", "c": "x", "d": "y"}.items():
+        files[name] = tmp_path / name
+        files[name].write_text(text)
+    assert configDigest([files["a"], files["b"]]) != configDigest([files["c"], files["d"]])
+
+
+def test_default_digest_uses_keyword_registry_file(tmp_path, monkeypatch):
+    keywords = tmp_path / "keyword_config.json"
+    keywords.write_text("{}", encoding="utf-8")
+    before = configDigest()
+    monkeypatch.setattr(battle_cache.keyword_registry, "file_path", keywords)
+    assert configDigest() != before
+    assert BattleCache(db_path=None).config == configDigest()
+
+
+def test_cached_battle_hits_and_keeps_global_random():
+    cache = BattleCache(db_path=None, config="")
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    first = cachedBattle(make_board(RED, BLUE), cache, seed=3)
+    assert random.random() == expected
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cachedBattle(make_board(RED, BLUE), cache, seed=3) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first["winner"] in ("RED", "BLUE", None)
+
+
+def test_config_change_misses_the_cache(tmp_path):
+    db_path = tmp_path / "cache.db"
+    cache = BattleCache(db_path=db_path, config="a")
+    cachedBattle(make_board(RED, BLUE), cache, seed=3)
+    cache.close()
+
+    cache = BattleCache(db_path=db_path, config="a")
+    cachedBattle(make_board(RED, BLUE), cache, seed=3)
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.close()
+
+    cache = BattleCache(db_path=db_path, config="b")
+    cachedBattle(make_board(RED, BLUE), cache, seed=3)
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.close()
+
+
+def test_lru_evicts_oldest():
+    cache = BattleCache(db_path=None, capacity=2, config="")
+    for key in "abc":
+        cache.put(key, {"winner": key})
+    assert cache.get("a") is None
+    assert cache.get("b") == {"winner": "b"}
+    cache.put("d", {"winner": "d"})
+    assert cache.get("c") is None and cache.get("b") is not None
+
+
+def test_default_path_is_outside_the_package():
+    assert battle_cache.BASE_DIR not in battle_cache.CACHE_DB_PATH.parents
+
@@ -0,0 +1,49 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+BENCH_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "bench_hotpath.py"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench_hotpath", BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_measure_reports_rate_and_peak(bench):
+    calls = []
+    res = bench.measure(lambda: calls.append(bytearray(64 * 1024)), min_time=0.01, rounds=2)
+    assert res["ops_per_sec"] > 0
+    assert res["peak_kib"] >= 64
+    assert len(calls) > 2
+
+
+def test_history_round_trip(bench, tmp_path):
+    path = tmp_path / "history.json"
+    assert bench.loadHistory(path) == []
+    history = [{"commit": "abc", "results": {"case": {"ops_per_sec": 1.0, "peak_kib": 0.5}}}]
+    bench.saveHistory(history, path)
+    assert bench.loadHistory(path) == history
+
+
+def test_history_path_is_ignored_by_git(bench):
+    gitignore = BENCH_PATH.parent.parent / ".gitignore"
+    assert "benchmarks/history.json" in gitignore.read_text().splitlines()
+    assert bench.HISTORY_PATH == BENCH_PATH.parent / "history.json"
+
+
+@pytest.mark.parametrize("name", ["Character.byId", "Character.setAttr", "EventManager.broadcast",
+                                  "attackSelector", "generateActionList", "attackSimulator", "ShopRow.refresh"])
+def test_core_cases_run(bench, name):
+    fn = bench.BENCHMARKS[name]()
+    for _ in range(3):
+        fn()
+
+
+def test_run_benchmarks_filters_by_keyword(bench):
+    results = bench.runBenchmarks("Character.byId", min_time=0.01, rounds=1)
+    assert list(results) == ["Character.byId"]
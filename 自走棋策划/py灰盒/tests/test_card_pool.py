@@ -0,0 +1,148 @@
+import random
+
+import pytest
+
+from card_pool import CardPool, FenwickTree
+from entity import Character
+from game import Player
+from util import EventManager
+
+CONFIGS = {
+    "1": {"price": 1}, "2": {"price": 1}, "3": {"price": 1},
+    "4": {"price": 2}, "5": {"price": 2},
+    "6": {"price": 3},
+}
+COPIES = {1: 3, 2: 2, 3: 1}
+
+
+def pool_total(pool: CardPool) -> int:
+    return sum(pool.tierRemaining(tier) for tier in pool.tier_ids)
+
+
+def held_ids(player: Player) -> list:
+    rows = [player.characters, player.shop.characters, *player.team.grid.values()]
+    return [char.getAttr("info.id") for row in rows for char in row.entities if isinstance(char, Character)]
+
+
+def test_fenwick_matches_naive_sums():
+    rng = random.Random(1)
+    weights = [rng.randrange(5) for _ in range(37)]
+    tree = FenwickTree(weights)
+    for _ in range(200):
+        i = rng.randrange(len(weights))
+        delta = rng.randrange(-weights[i], 4)
+        weights[i] += delta
+        tree.add(i, delta)
+        k = rng.randrange(len(weights) + 1)
+        assert tree.prefix(k) == sum(weights[:k])
+    assert tree.weights == weights
+    # find 返回的下标正好覆盖 target 所在的权重区间
+    for target in range(tree.total()):
+        i = tree.find(target)
+        assert sum(weights[:i]) <= target < sum(weights[:i + 1])
+
+
+def test_pool_counts():
+    pool = CardPool(CONFIGS, COPIES)
+    assert pool.tier_ids == {1: ["0001", "0002", "0003"], 2: ["0004", "0005"], 3: ["0006"]}
+    assert [pool.tierRemaining(t) for t in (1, 2, 3, 4)] == [9, 4, 1, 0]
+    assert pool.remaining(4) == 2 and pool.remaining("9999") == 0
+
+
+def test_draw_and_put_back_keep_totals():
+    pool = CardPool(CONFIGS, COPIES, rng=random.Random(0))
+    total = pool_total(pool)
+    drawn = [pool.draw(CardPool.MAX_GRADE) for _ in range(total)]
+    assert None not in drawn
+    assert pool_total(pool) == 0
+    # 每个角色被抽到的次数正好是它的卡牌数量
+    assert {char_id: drawn.count(char_id) for char_id in set(drawn)} == {
+        char_id: COPIES[CONFIGS[char_id.lstrip("0")]["price"]] for char_id in pool.index}
+    assert pool.draw(CardPool.MAX_GRADE) is None
+    for char_id in drawn:
+        assert pool.putBack(char_id)
+    assert pool_total(pool) == total
+    assert not pool.putBack("9999")
+
+
+def test_draw_without_take_and_take():
+    pool = CardPool(CONFIGS, COPIES, rng=random.Random(0))
+    pool.draw(0, take=False)
+    assert pool_total(pool) == 14
+    assert pool.take("0006") and not pool.take("0006")
+    assert pool.remaining("0006") == 0
+
+
+def test_grade_limits_tiers():
+    pool = CardPool(CONFIGS, COPIES, rng=random.Random(0))
+    # 0 级商店只出 1 费角色；1 费被抽空后不会出现其他品质
+    assert {pool.draw(0) for _ in range(9)} <= {"0001", "0002", "0003"}
+    assert pool.draw(0) is None
+    assert pool.draw(1) in {"0004", "0005"}
+
+
+def test_seeded_pools_draw_the_same_sequence():
+    a = CardPool(CONFIGS, COPIES, rng=random.Random(42))
+    b = CardPool(CONFIGS, COPIES, rng=random.Random(42))
+    assert [a.draw(7) for _ in range(14)] == [b.draw(7) for _ in range(14)]
+
+
+@pytest.fixture
+def players():
+    pool = CardPool(rng=random.Random(3))
+    events = EventManager()
+    total = pool_total(pool)
+    a, b = Player(pool=pool, events=events), Player(pool=pool, events=events)
+    for player in (a, b):
+        player.setAttr("money", 100)
+    return pool, total, a, b
+
+
+def assert_conserved(pool, total, *players):
+    assert pool_total(pool) + sum(len(held_ids(p)) for p in players) == total
+
+
+def test_shop_buy_refresh_sell_conserve_cards(players):
+    pool, total, a, b = players
+    assert_conserved(pool, total, a, b)
+    assert a.shop.buy(1) and a.shop.buy(2)
+    a.shop.lock(3)
+    locked = a.shop.characters.getCharacterByPosition(3)
+    a.shop.refresh()
+    b.shop.refresh()
+    assert a.shop.characters.getCharacterByPosition(3) is locked
+    assert_conserved(pool, total, a, b)
+
+    char = a.characters.entities[0]
+    money = a.getAttr("money")
+    assert a.shop.sell(char)
+    assert a.getAttr("money") == money + char.getAttr("info.price")
+    assert_conserved(pool, total, a, b)
+    # 重复出售、出售其他玩家的角色都不会产生金币和卡牌
+    assert not a.shop.sell(char)
+    assert not b.shop.sell(a.characters.entities[1])
+    assert a.getAttr("money") == money + char.getAttr("info.price")
+    assert_conserved(pool, total, a, b)
+
+
+def test_sell_from_team(players):
+    pool, total, a, b = players
+    a.shop.buy(1)
+    char = a.characters.entities[0]
+    assert a.removeCharacter(char)
+    a.team.setCharacter(char, "front")
+    assert a.shop.sell(char)
+    assert char not in a.team.grid["front"].entities
+    assert_conserved(pool, total, a, b)
+
+
+def test_release_returns_every_card(players):
+    pool, total, a, b = players
+    a.shop.buy(1)
+    a.shop.buy(2)
+    char = a.characters.entities[0]
+    a.removeCharacter(char)
+    a.team.setCharacter(char, "back")
+    a.releaseCharacters()
+    assert held_ids(a) == []
+    assert_conserved(pool, total, a, b)
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from effect import ALWAYS_CONDITION, Condition, _always, _never
+from entity import Character, Damage
+from util import EventManager
+
+
+def param_value(param, key, default=0):
+    if isinstance(param, dict):
+        return param.get(key, default)
+    return param if param is not None else default
+
+
+def interpret(cond: Condition, character, context: dict) -> bool:
+    """逐次解释条件，作为编译结果的参照"""
+    param = cond.param
+    match cond.condi_type:
+        case "always":
+            return True
+        case "consume_energy":
+            return character.getAttr("current.energy") >= param_value(param, "energy")
+        case "consume_hp" | "consume_health":
+            return character.getAttr("current.hp") >= param_value(param, "hp")
+        case "has_statu":
+            return character.hasStatus(param_value(param, "statu_name", ""))
+        case "got_hurt":
+            return character.getAttr("current.hp") < character.getAttr("max.hp")
+        case "damage_above":
+            return context["damage"].damage > param_value(param, "damage")
+        case "and":
+            return all(interpret(Condition.of(c), character, context) for c in param or [])
+        case "or":
+            return any(interpret(Condition.of(c), character, context) for c in param or [])
+        case _:
+            return False
+
+
+def random_condition(rng: random.Random, depth: int = 0) -> dict:
+    kinds = ["always", "consume_energy", "consume_hp", "consume_health", "has_statu", "got_hurt",
+             "damage_above", "unknown"]
+    if depth < 3:
+        kinds += ["and", "or"] * 2
+    kind = rng.choice(kinds)
+    value = rng.randrange(0, 12)
+    match kind:
+        case "and" | "or":
+            param = [random_condition(rng, depth + 1) for _ in range(rng.randrange(0, 4))]
+        case "consume_energy":
+            param = rng.choice([{"energy": value}, value])
+        case "consume_hp" | "consume_health":
+            param = rng.choice([{"hp": value}, value])
+        case "has_statu":
+            param = rng.choice([{"statu_name": "stun"}, "poison"])
+        case "damage_above":
+            param = {"damage": value}
+        case _:
+            param = None
+    return {"type": kind, "param": param}
+
+
+def random_character(rng: random.Random) -> Character:
+    char = Character({"id": "0002", "health_points": 10}, EventManager())
+    char.setAttr("current.hp", rng.randrange(0, 11))
+    char.setAttr("current.energy", rng.randrange(0, 6))
+    for status in ("stun", "poison"):
+        if rng.random() < 0.5:
+            char.addStatus(status)
+    return char
+
+
+def test_compiled_matches_interpreted():
+    rng = random.Random(0)
+    for _ in range(500):
+        data = random_condition(rng)
+        char = random_character(rng)
+        context = {"damage": Damage(None, rng.randrange(0, 12))}
+        cond = Condition.byDict(data)
+        assert cond(char, context) == interpret(Condition.byDict(data), char, context), data
+
+
+def test_constant_folding():
+    always, never = Condition("always", None), Condition("unknown", None)
+    energy = Condition("consume_energy", 1)
+    assert Condition.allOf([]).predicate is _always
+    assert Condition.allOf([always, always]).predicate is _always
+    assert Condition.allOf([energy, never]).predicate is _never
+    assert Condition.anyOf([]).predicate is _never
+    assert Condition.anyOf([energy, always]).predicate is _always
+    assert (always & energy).predicate is energy.predicate
+    assert (never | energy).predicate is energy.predicate
+    assert ALWAYS_CONDITION.isAlways()
+
+
+def test_predicate_is_compiled_once():
+    cond = Condition("consume_hp", {"hp": 3})
+    assert cond.predicate is cond.predicate
+
+
+@pytest.mark.parametrize("hp, expected", [(2, False), (3, True)])
+def test_keyword_check_uses_character_from_context(hp, expected):
+    char = Character({"id": "0002", "health_points": 10}, EventManager())
+    char.setAttr("current.hp", hp)
+    assert Condition("consume_hp", {"hp": 3}).check(character=char) is expected
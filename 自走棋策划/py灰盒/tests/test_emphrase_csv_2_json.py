@@ -0,0 +1,158 @@
+import csv
+import json
+import zipfile
+from xml.sax.saxutils import escape
+
+import pytest
+
+import emphrase_csv_2_json as conv
+
+HEADERS = ["id", "name", "attack_power", "avaliable_location", "fetter", "price", "hate_matrix"]
+MATRIX = "1;2;3;4;5;6;7;8;9"
+SCHEMA = {"name": {"type": "TEXT", "not_null": True}}
+
+
+def _table(*rows) -> list:
+    """第一行是说明，第二行是表头"""
+    return [["说明"] * len(HEADERS), HEADERS, *rows]
+
+
+def write_csv(path, rows):
+    with path.open("w", encoding="utf-8-sig", newline="") as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+
+def write_xlsx(path, rows, sheet_name="角色"):
+    """
+    用标准库写一个最小的 xlsx：字符串放在共享字符串表里，数字写成数值单元格，
+    为 None 的行不写入（和 Excel 省略空行一样），空单元格不写入
+    """
+    strings, sheet_rows = [], []
+    for r, row in enumerate(rows, start=1):
+        if row is None:
+            continue
+        cells = []
+        for c, value in enumerate(row):
+            ref = f"{chr(ord('A') + c)}{r}"
+            if isinstance(value, (int, float)):
+                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+            elif value:
+                strings.append(value)
+                cells.append(f'<c r="{ref}" t="s"><v>{len(strings) - 1}</v></c>')
+        sheet_rows.append(f'<row r="{r}">{"".join(cells)}</row>')
+    # 带拼音注音的共享字符串，注音不属于单元格内容
+    strings_xml = "".join(f"<si><t>{escape(s)}</t><rPh sb=\"0\" eb=\"1\"><t>ピン</t></rPh></si>" for s in strings)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("xl/workbook.xml", (
+            f'<workbook xmlns="{conv._XLSX_NS["m"]}" xmlns:r="{conv._XLSX_NS["r"]}"><sheets>'
+            f'<sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets></workbook>'))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            f'<Relationships xmlns="{conv._XLSX_NS["rel"]}">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>'))
+        zf.writestr("xl/sharedStrings.xml", f'<sst xmlns="{conv._XLSX_NS["m"]}">{strings_xml}</sst>')
+        zf.writestr("xl/worksheets/sheet1.xml", (
+            f'<worksheet xmlns="{conv._XLSX_NS["m"]}"><sheetData>{"".join(sheet_rows)}</sheetData></worksheet>'))
+    return path
+
+
+def read_json(path) -> dict:
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+EXPECTED = {
+    "0001": {"id": "0001", "name": "木头人", "attack_power": 1, "avaliable_location": ["front", "back"],
+             "price": 1, "hate_matrix": [[1, 2, 3], [4, 5, 6], [7, 8, 9]]},
+    "0012": {"id": "0012", "name": "一前", "attack_power": 3, "fetter": "武当", "price": 2},
+}
+
+
+def test_convert_csv(tmp_path):
+    src = write_csv(tmp_path / "characters.csv", _table(
+        ["1", "木头人", "1", "front;back", "", "1", MATRIX],
+        ["", "", "", "", "", "", ""],
+        ["12", " 一前 ", "3.0", "", "武当", "2", ""],
+    ))
+    out = tmp_path / "character_config.json"
+    result = conv.convert(src, out, schema=SCHEMA)
+    assert result.ok and result.changed and result.count == 2
+    assert read_json(out) == EXPECTED
+    # 内容一致时不改写输出文件
+    assert not conv.convert(src, out, schema=SCHEMA).changed
+
+
+def test_convert_xlsx_matches_csv(tmp_path):
+    src = write_xlsx(tmp_path / "characters.xlsx", [
+        ["说明"],
+        HEADERS,
+        [1, "木头人", 1, "front;back", None, 1, MATRIX],
+        None,
+        [12, "一前", 3.0, None, "武当", 2, None],
+    ])
+    rows = list(conv.iter_rows(src))
+    assert rows[3] == []
+    assert rows[2][:2] == ["1", "木头人"]
+    out = tmp_path / "character_config.json"
+    result = conv.convert(src, out, schema=SCHEMA, sheet_name="角色")
+    assert result.ok and result.count == 2
+    assert read_json(out) == EXPECTED
+
+
+def test_xlsx_unknown_sheet(tmp_path):
+    src = write_xlsx(tmp_path / "characters.xlsx", _table())
+    with pytest.raises(ValueError):
+        list(conv.iter_rows(src, "不存在"))
+
+
+BAD_ROWS = _table(
+    ["1", "木头人", "1", "", "", "1", ""],
+    ["2", "一前", "很高", "", "", "1", ""],
+    ["3", "一后", "1", "", "", "1", "1;2;3"],
+    ["", "无名", "1", "", "", "1", ""],
+    ["4", "", "1", "", "", "1", ""],
+    ["01", "重复", "1", "", "", "1", ""],
+    ["5", "中排", "2", "", "", "3", ""],
+)
+
+
+def test_bad_rows_are_reported(tmp_path):
+    errors = []
+    records = list(conv.iter_records(iter(BAD_ROWS), SCHEMA, errors))
+    assert [line for line, _ in records] == [3, 9]
+    assert [(e.line, e.column) for e in errors] == [
+        (4, "attack_power"), (5, "hate_matrix"), (6, "id"), (7, "name"), (8, "id"),
+    ]
+    assert "第 3 行" in errors[-1].message
+
+
+def test_strict_convert_writes_nothing_on_error(tmp_path):
+    src = write_csv(tmp_path / "characters.csv", BAD_ROWS)
+    out = tmp_path / "character_config.json"
+    out.write_text("{}", encoding="utf-8")
+    result = conv.convert(src, out, schema=SCHEMA)
+    assert not result.ok and not result.changed
+    assert out.read_text(encoding="utf-8") == "{}"
+    assert not (tmp_path / "character_config.json.tmp").exists()
+
+
+def test_keep_going_writes_valid_rows(tmp_path):
+    src = write_csv(tmp_path / "characters.csv", BAD_ROWS)
+    out = tmp_path / "character_config.json"
+    result = conv.convert(src, out, schema=SCHEMA, strict=False)
+    assert len(result.errors) == 5 and result.changed
+    assert list(read_json(out)) == ["0001", "0005"]
+
+
+def test_missing_id_header(tmp_path):
+    errors = []
+    assert list(conv.iter_records(iter([["说明"], ["name"], ["木头人"]]), {}, errors)) == []
+    assert [(e.line, e.message) for e in errors] == [(2, "表头缺少 id 列")]
+
+
+def test_convert_creates_output_directory(tmp_path):
+    src = write_csv(tmp_path / "characters.csv", _table(["1", "木头人", "1", "", "", "1", ""]))
+    out = tmp_path / "build" / "config" / "character_config.json"
+    result = conv.convert(src, out, schema=SCHEMA)
+    assert result.ok and result.changed
+    assert list(read_json(out)) == ["0001"]
@@ -0,0 +1,117 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from effect import Effect
+from entity import Character, Damage, Entity
+from util import EventManager
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-c", code], cwd=PKG_DIR, capture_output=True, text=True)
+
+
+def test_simulation_runs_without_pygame():
+    # sys.modules 中为 None 的模块无法导入，模拟没有安装 pygame 的环境
+    res = run_python(
+        "import sys; sys.modules['pygame'] = None\n"
+        "from util import log; log.enabled = False\n"
+        "from grid import GameGrid, GameBoard\n"
+        "from entity import Character\n"
+        "from simulator import attackSimulator\n"
+        "red, blue = GameGrid(), GameGrid()\n"
+        "red.setCharacter(Character.byId('0002'), 'front')\n"
+        "blue.setCharacter(Character.byId('0001'), 'front')\n"
+        "print(attackSimulator(GameBoard(red, blue), headless=True))\n"
+    )
+    assert res.returncode == 0, res.stderr
+    assert res.stdout.strip() in ("RED", "BLUE", "None")
+
+
+def test_entity_is_a_plain_slotted_object():
+    entity = Entity({"hp": 1})
+    assert not hasattr(entity, "__dict__")
+    with pytest.raises(AttributeError):
+        entity.image = None
+    char = Character({"id": "0002"}, EventManager())
+    assert not hasattr(char, "__dict__")
+    assert char.events is not None
+
+
+def test_terminal_draw_does_not_need_pygame(capsys):
+    char = Character({"id": "0002", "name": "tester"}, EventManager())
+    char.draw()
+    assert capsys.readouterr().out
+    # 没有传入 screen 时不会加载渲染适配器
+    char.draw(type="pygame")
+    assert "module.character_sprite" not in sys.modules
+
+
+@pytest.fixture
+def empty_pool(monkeypatch):
+    monkeypatch.setattr(Damage, "_pool", [])
+    return Damage._pool
+
+
+def test_damage_pool_reuses_released_objects(empty_pool):
+    source = Character({"id": "0002"}, EventManager())
+    dmg = Damage.acquire(source, 5)
+    assert dmg.release()
+    assert dmg.source is None and empty_pool == [dmg]
+    again = Damage.acquire(source, 7, "magic")
+    assert again is dmg
+    assert (again.source, again.damage, again.damage_type) == (source, 7, "magic")
+    assert empty_pool == []
+
+
+def test_damage_double_release_is_ignored(empty_pool):
+    dmg = Damage.acquire(None, 1)
+    assert dmg.release()
+    assert not dmg.release()
+    assert empty_pool == [dmg]
+    # 池中的对象被取出后才能再次归还
+    assert Damage.acquire(None, 2) is dmg
+    assert dmg.release()
+
+
+def test_damage_pool_is_bounded(empty_pool):
+    damages = [Damage.acquire(None, i) for i in range(Damage.POOL_SIZE + 10)]
+    for dmg in damages:
+        dmg.release()
+    assert len(empty_pool) == Damage.POOL_SIZE
+
+
+def test_damage_pool_across_threads(empty_pool):
+    import threading
+    errors = []
+
+    def work():
+        for i in range(2000):
+            dmg = Damage.acquire(None, i)
+            if dmg.damage != i or dmg._pooled:
+                errors.append(dmg)
+            dmg.release()
+            dmg.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(set(map(id, empty_pool))) == len(empty_pool)
+    assert all(dmg._pooled for dmg in empty_pool)
+
+
+def test_damage_attrs_and_effects():
+    dmg = Damage(Character({"id": "0002"}, EventManager()), 8)
+    assert dmg.getAttr("damage") == 8 and dmg.getAttr("hp", 0) == 0
+    dmg.setAttr("damage", 6)
+    with pytest.raises(AttributeError):
+        dmg.setAttr("hp", 1)
+    dmg.applyEffect(Effect.byDict({"type": "modify_attr", "param": "DMG=0", "mode": "damage"}))
+    assert dmg.damage == 0
@@ -0,0 +1,171 @@
+import gc
+import weakref
+
+import pytest
+
+from entity import Character
+from util import EventManager, Signal
+
+
+@pytest.fixture
+def events() -> EventManager:
+    return EventManager()
+
+
+@pytest.fixture
+def changes(events) -> list:
+    changes = []
+    events.register("onAttrChange", lambda **context: changes.append(
+        (context["character"].getAttr("info.id"), context["attr"], context["before"], context["after"])))
+    return changes
+
+
+def make(events, char_id: str) -> Character:
+    return Character({"id": char_id, "health_points": 10, "attack_power": 1}, events)
+
+
+def test_without_batch_every_change_is_broadcast(events, changes):
+    char = make(events, "a")
+    char.setAttr("current.hp", 9)
+    char.setAttr("current.hp", 8)
+    assert changes == [("a", "current.hp", 10, 9), ("a", "current.hp", 9, 8)]
+
+
+def test_batch_coalesces_changes(events, changes):
+    a, b = make(events, "a"), make(events, "b")
+    with events.batch():
+        a.setAttr("current.hp", 9)
+        b.setAttr("current.atk", 5)
+        a.setAttr("current.hp", 4)
+        a.setAttr("current.atk", 2)
+        assert changes == []
+    # 按首次变化的顺序，保留第一次的 before 和最后一次的 after
+    assert changes == [("a", "current.hp", 10, 4), ("b", "current.atk", 1, 5), ("a", "current.atk", 1, 2)]
+
+
+def test_unchanged_values_are_not_broadcast(events, changes):
+    char = make(events, "a")
+    with events.batch():
+        char.setAttr("current.hp", 3)
+        char.setAttr("current.hp", 10)
+    assert changes == []
+
+
+def test_nested_batches_flush_at_the_outermost(events, changes):
+    char = make(events, "a")
+    with events.batch():
+        with events.batch():
+            char.setAttr("current.hp", 9)
+        assert changes == []
+        char.setAttr("current.hp", 7)
+    assert changes == [("a", "current.hp", 10, 7)]
+
+
+def test_other_events_are_not_deferred(events):
+    seen = []
+    events.register("onTurnStart", lambda **context: seen.append(context["turn_count"]))
+    with events.batch():
+        events.broadcast("onTurnStart", turn_count=1)
+        assert seen == [1]
+
+
+def test_batch_flushes_on_error(events, changes):
+    char = make(events, "a")
+    with pytest.raises(RuntimeError):
+        with events.batch():
+            char.setAttr("current.hp", 5)
+            raise RuntimeError
+    assert changes == [("a", "current.hp", 10, 5)]
+    char.setAttr("current.hp", 4)
+    assert len(changes) == 2
+
+
+def test_listeners_run_outside_the_batch(events, changes):
+    char = make(events, "a")
+
+    def react(**context):
+        if context["attr"] == "current.hp":
+            char.setAttr("current.atk", 3)
+    events.register("onAttrChange", react)
+    with events.batch():
+        char.setAttr("current.hp", 5)
+    assert changes == [("a", "current.hp", 10, 5), ("a", "current.atk", 1, 3)]
+
+
+def test_explicit_flush(events, changes):
+    char = make(events, "a")
+    with events.batch():
+        char.setAttr("current.hp", 5)
+        events.flush()
+        assert changes == [("a", "current.hp", 10, 5)]
+    assert len(changes) == 1
+
+
+class Listener:
+    def __init__(self):
+        self.seen = []
+
+    def handle(self, **context):
+        self.seen.append(context)
+
+
+def test_weak_listener_is_removed_after_gc(events):
+    listener = Listener()
+    events.register("onTest", listener.handle)
+    events.broadcast("onTest", value=1)
+    assert listener.seen == [{"value": 1}]
+    assert events.listenerCount("onTest") == 1
+    del listener
+    gc.collect()
+    assert events.listeners["onTest"] == []
+    events.broadcast("onTest", value=2)
+
+
+def test_strong_listeners_are_kept(events):
+    seen = []
+    listener = Listener()
+    events.register("onTest", listener.handle, weak=False)
+    events.register("onTest", lambda **context: seen.append(context))
+    listener_ref = weakref.ref(listener)
+    del listener
+    gc.collect()
+    assert listener_ref() is not None
+    events.broadcast("onTest", value=1)
+    assert listener_ref().seen == [{"value": 1}] and seen == [{"value": 1}]
+
+
+def test_unregister_weak_listener(events):
+    listener = Listener()
+    events.register("onTest", listener.handle)
+    events.unregister("onTest", listener.handle)
+    events.broadcast("onTest", value=1)
+    assert listener.seen == [] and events.listenerCount("onTest") == 0
+
+
+def test_listener_collected_during_broadcast(events):
+    # 回调中释放另一个监听器时不会调用已回收的对象
+    calls = []
+
+    class Counted(Listener):
+        def handle(self, **context):
+            calls.append(context)
+
+    holder = {"other": Counted()}
+    events.register("onTest", lambda **context: holder.clear())
+    events.register("onTest", holder["other"].handle)
+    events.broadcast("onTest", value=1)
+    gc.collect()
+    assert calls == []
+    assert events.listenerCount("onTest") == 1
+
+
+def test_signal_disconnects_collected_slots():
+    signal = Signal()
+    listener = Listener()
+    signal.connect(listener.handle)
+    signal.emit(value=1)
+    assert listener.seen == [{"value": 1}]
+    del listener
+    gc.collect()
+    assert len(signal) == 0
+    signal.emit(value=2)
@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parent.parent
+
+# 模拟核心不应在导入时加载的模块
+HEAVY_MODULES = ["rich", "pygame", "sqlite3", "uuid", "weakref", "inspect", "typing"]
+
+_SNIPPET = (
+    "import json, sys; before = set(sys.modules)\n"
+    "{imports}\n"
+    "print(json.dumps(sorted(set(sys.modules) - before)))\n"
+)
+
+
+def loaded_by(imports: str) -> set:
+    """在新的解释器中执行导入语句，返回因此新加载的模块"""
+    res = subprocess.run([sys.executable, "-c", _SNIPPET.format(imports=imports)],
+                         cwd=PKG_DIR, capture_output=True, text=True)
+    assert res.returncode == 0, res.stderr
+    return {name.split(".")[0] for name in json.loads(res.stdout.strip().splitlines()[-1])}
+
+
+@pytest.mark.parametrize("module", ["simulator", "entity", "game", "grid", "effect", "util"])
+def test_core_import_is_cheap(module):
+    assert loaded_by(f"import {module}") & set(HEAVY_MODULES) == set()
+
+
+def test_building_a_battle_stays_cheap():
+    loaded = loaded_by(
+        "from util import log; log.enabled = False\n"
+        "from grid import GameGrid, GameBoard\n"
+        "from entity import Character\n"
+        "from simulator import attackSimulator\n"
+        "red, blue = GameGrid(team_id=1), GameGrid(team_id=2)\n"
+        "red.setCharacter(Character.byId('0002'), 'front')\n"
+        "blue.setCharacter(Character.byId('0001'), 'front')\n"
+        "attackSimulator(GameBoard(red, blue), headless=True)\n"
+    )
+    assert loaded & {"rich", "pygame", "sqlite3", "uuid"} == set()
+
+
+def test_uuid_is_loaded_only_when_needed():
+    assert "uuid" in loaded_by("from grid import GameGrid; GameGrid()")
@@ -0,0 +1,119 @@
+import json
+import sqlite3
+
+import pytest
+
+from entity import Character, Damage
+from keywords import KeywordRegistry, registry
+from util import EventManager
+
+SHEILD = {
+    "id": "sheild", "name": "护盾", "type": "passive", "trigger": "onGetHurt", "charges": 1,
+    "condition": [{"type": "damage_above", "param": {"damage": 0}}],
+    "effects": [{"type": "modify_attr", "param": "DMG=0", "mode": "damage"}],
+}
+THORNS = {
+    "id": "Thorns", "trigger": "onGetHurt", "charges": -1,
+    "effects": [{"type": "modify_attr", "param": "HP-1", "mode": "source"}],
+}
+
+
+def test_registry_loads_lazily_and_ignores_case(tmp_path):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps({"sheild": SHEILD}), encoding="utf-8")
+    reg = KeywordRegistry(path)
+    assert not reg.loaded and reg.templates == {}
+    assert "SHEILD" in reg and reg.get("Sheild").name == "护盾"
+    assert reg.loaded
+    assert reg.get("missing") is None and reg.create("missing", None) is None
+
+
+def test_registry_loads_lists_and_manual_definitions(tmp_path):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps([SHEILD, THORNS]), encoding="utf-8")
+    reg = KeywordRegistry(None)
+    assert reg.load(path) == 2
+    assert "thorns" in reg
+    reg.register({"id": "sheild", "name": "新护盾"})
+    assert reg.get("sheild").name == "新护盾"
+
+
+def test_registry_loads_from_db(tmp_path):
+    db_path = tmp_path / "keywords.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE keyword (id TEXT, name TEXT, trigger TEXT, charges INTEGER, condition TEXT, effects TEXT)")
+    conn.execute("INSERT INTO keyword VALUES (?, ?, ?, ?, ?, ?)",
+                 ("sheild", "护盾", "onGetHurt", 1, json.dumps(SHEILD["condition"]), json.dumps(SHEILD["effects"])))
+    conn.execute("INSERT INTO keyword VALUES ('noop', 'noop', '', -1, NULL, '')")
+    conn.commit()
+    conn.close()
+    reg = KeywordRegistry(None)
+    assert reg.loadDb(db_path) == 2
+    template = reg.get("sheild")
+    assert template.charges == 1 and [e.param for e in template.effects] == ["DMG=0"]
+    assert reg.get("noop").effects == []
+
+
+def test_default_registry_has_sheild():
+    assert "sheild" in registry
+
+
+@pytest.fixture
+def reg() -> KeywordRegistry:
+    reg = KeywordRegistry(None)
+    reg.register(SHEILD)
+    reg.register(THORNS)
+    return reg
+
+
+def test_templates_are_shared_between_owners(reg):
+    events = EventManager()
+    a, b = Character({"id": "a"}, events), Character({"id": "b"}, events)
+    ka, kb = reg.create("sheild", a), reg.create("sheild", b)
+    assert ka.template is kb.template
+    assert events.listenerCount("onGetHurt") == 2
+
+
+def test_sheild_blocks_one_hit_then_unregisters(reg):
+    events = EventManager()
+    char = Character({"id": "a", "health_points": 10}, events)
+    keyword = reg.create("sheild", char)
+    char.keywords.append(keyword)
+    char.keywords_dict["sheild"] = keyword
+
+    char.getHurt(Damage(None, 4))
+    assert char.getAttr("current.hp") == 10
+    assert keyword not in char.keywords and not keyword.registered
+    assert events.listenerCount("onGetHurt") == 0
+    char.getHurt(Damage(None, 4))
+    assert char.getAttr("current.hp") == 6
+
+
+def test_keyword_only_reacts_to_its_owner(reg):
+    events = EventManager()
+    owner = Character({"id": "a", "health_points": 10}, events)
+    other = Character({"id": "b", "health_points": 10}, events)
+    attacker = Character({"id": "c", "health_points": 10}, events)
+    # 监听器是弱引用，关键字要由角色持有
+    owner.keywords.append(reg.create("thorns", owner))
+    other.getHurt(Damage(attacker, 2))
+    assert attacker.getAttr("current.hp") == 10
+    for _ in range(3):
+        owner.getHurt(Damage(attacker, 2))
+    assert attacker.getAttr("current.hp") == 7
+
+
+def test_snapshot_restores_charges(reg):
+    char = Character({"id": "a", "health_points": 10}, EventManager())
+    keyword = reg.create("sheild", char)
+    amount = keyword.snapshot()
+    keyword.amount = 0
+    keyword._unregister()
+    keyword.restore(amount)
+    assert keyword.amount == 1 and keyword.registered
+
+
+def test_add_keyword_ignores_unknown_names():
+    char = Character({"id": "a"}, EventManager())
+    assert char.addKeyword("no_such_keyword") is None
+    assert char.keywords == []
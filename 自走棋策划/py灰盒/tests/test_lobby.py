@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from battle_cache import BattleCache
+from card_pool import CardPool
+from entity import Character
+from lobby import Lobby, simplePolicy, simulateLobbies
+from util import log, seededRandom
+
+
+@pytest.fixture
+def short_games(monkeypatch):
+    monkeypatch.setattr(Lobby, "MAX_ROUNDS", 12)
+
+
+def held(player) -> int:
+    rows = [player.characters, player.shop.characters, *player.team.grid.values()]
+    return sum(isinstance(char, Character) for row in rows for char in row.entities)
+
+
+def pool_total(pool: CardPool) -> int:
+    return sum(pool.tierRemaining(tier) for tier in pool.tier_ids)
+
+
+def test_income_and_interest():
+    lobby = Lobby(player_num=2, seed=0)
+    player = lobby.players[0]
+    for money, expected in [(0, 5), (19, 25), (80, 90)]:
+        player.setAttr("money", money)
+        lobby.payIncome(player)
+        assert player.getAttr("money") == expected
+
+
+def test_pairing_covers_every_player_and_adds_ghost_for_odd_count():
+    lobby = Lobby(player_num=5, seed=0)
+    pairs = lobby.pairPlayers()
+    assert [is_ghost for _, _, is_ghost in pairs] == [False, False, True]
+    fighters = [p for player, opponent, is_ghost in pairs for p in ((player,) if is_ghost else (player, opponent))]
+    assert sorted(p.getAttr("id") for p in fighters) == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("winner, is_ghost, hp", [
+    ("RED", False, (100, 91)),
+    ("RED", True, (100, 100)),
+    ("BLUE", False, (91, 100)),
+    ("BLUE", True, (91, 100)),
+    (None, False, (100, 100)),
+])
+def test_apply_battle_damages_loser(winner, is_ghost, hp):
+    lobby = Lobby(player_num=2, seed=0)
+    player, opponent = lobby.players
+    result = {"winner": winner, "survivors": [("0002", 3, 5), ("0004", 4, 1)]}
+    assert lobby.applyBattle(player, opponent, is_ghost, result) == winner
+    assert (player.getAttr("current.hp"), opponent.getAttr("current.hp")) == hp
+
+
+def test_simple_policy_stops_at_max_grade():
+    lobby = Lobby(player_num=2, seed=0)
+    lobby.round = 40
+    player = lobby.players[0]
+    player.shop.grade = CardPool.MAX_GRADE
+    player.setAttr("money", 15)
+    simplePolicy(player, lobby)
+    assert player.shop.grade == CardPool.MAX_GRADE
+    # 没有把钱花在升级上，而是买了角色
+    assert player.getAttr("money") < 15
+    assert not player.shop.upgrade()
+
+
+def test_seeded_lobby_is_reproducible(short_games):
+    # 不使用战斗缓存时，seed 只决定卡池和配对，战斗使用全局 random
+    runs = []
+    for _ in range(2):
+        with seededRandom(0):
+            runs.append(Lobby(player_num=4, seed=7).run())
+    a, b = runs
+    assert a == b
+    assert a["rounds"] == len(a["history"]) <= Lobby.MAX_ROUNDS
+    assert sorted(a["ranking"]) == [1, 2, 3, 4]
+
+
+def test_cached_lobby_is_reproducible_from_its_seed(short_games):
+    # 使用战斗缓存时每场战斗的种子也来自对局的 seed
+    a = Lobby(player_num=4, seed=7, cache=BattleCache(db_path=None)).run()
+    random.seed()
+    b = Lobby(player_num=4, seed=7, cache=BattleCache(db_path=None)).run()
+    assert a == b
+
+
+def test_cards_are_conserved_through_a_game(short_games):
+    lobby = Lobby(player_num=4, seed=3)
+    total = pool_total(lobby.pool) + sum(held(p) for p in lobby.players)
+    while not lobby.isOver():
+        lobby.playRound()
+        assert pool_total(lobby.pool) + sum(held(p) for p in lobby.players) == total
+        for player in lobby.eliminated:
+            assert held(player) == 0
+    assert all(p.shop.grade <= CardPool.MAX_GRADE for p in lobby.players)
+
+
+def test_simulate_lobbies_restores_logging(short_games):
+    log.enabled = True
+    try:
+        stats = simulateLobbies(2, player_num=2, seed=1)
+        assert log.enabled
+    finally:
+        log.enabled = False
+    assert stats["games"] == 2
+    assert sum(stats["win_rate"].values()) == pytest.approx(1)
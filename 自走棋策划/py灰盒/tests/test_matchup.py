@@ -0,0 +1,129 @@
+import json
+from concurrent.futures import Future
+
+import pytest
+
+import matchup
+import util
+from matchup import compositionHash, gridFromComposition, matchupMatrix, playPairing, rulesDigest
+from util import EventManager
+
+CONFIGS = {
+    "0001": {"attack_power": 1, "health_points": 20},
+    "0002": {"attack_power": 3, "health_points": 10},
+}
+
+
+def comp(name: str, front: list) -> dict:
+    return {"name": name, "units": {"front": front}}
+
+
+def test_composition_hash_ignores_name_and_pads_ids():
+    a = compositionHash(comp("a", ["0001", None, "0002"]), CONFIGS)
+    assert compositionHash(comp("b", [1, None, 2]), CONFIGS) == a
+    assert compositionHash(comp("a", ["0002", None, "0001"]), CONFIGS) != a
+
+
+def test_composition_hash_follows_unit_configs():
+    a = compositionHash(comp("a", ["0001"]), CONFIGS)
+    changed = {**CONFIGS, "0001": {"attack_power": 2, "health_points": 20}}
+    assert compositionHash(comp("a", ["0001"]), changed) != a
+    # 阵容中没有的角色的配置不影响哈希
+    changed = {**CONFIGS, "0002": {"attack_power": 9, "health_points": 10}}
+    assert compositionHash(comp("a", ["0001"]), changed) == a
+
+
+def test_rules_digest_follows_file_content(tmp_path):
+    path = tmp_path / "keyword_config.json"
+    assert rulesDigest([path]) == rulesDigest([])
+    path.write_text(json.dumps({"sheild": {"charges": 1}}), encoding="utf-8")
+    before = rulesDigest([path])
+    path.write_text(json.dumps({"sheild": {"charges": 2}}), encoding="utf-8")
+    assert rulesDigest([path]) != before
+
+
+def test_play_pairing_is_deterministic():
+    a, b = comp("a", ["0002"]), comp("b", ["0001"])
+    res = playPairing(a, b, 2)
+    assert sum(res.values()) == 4
+    assert playPairing(a, b, 2) == res
+    # 交换双方后胜负互换
+    swapped = playPairing(b, a, 2)
+    assert (swapped["wins"], swapped["losses"], swapped["draws"]) == (res["losses"], res["wins"], res["draws"])
+
+
+class InlineExecutor:
+    """在当前进程中执行任务，记录提交次数"""
+    submitted = 0
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        InlineExecutor.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    InlineExecutor.submitted = 0
+    monkeypatch.setattr(matchup, "ProcessPoolExecutor", InlineExecutor)
+    return InlineExecutor
+
+
+def test_matrix_is_symmetric_and_cached(tmp_path, executor):
+    comps = [comp("a", ["0002"]), comp("b", ["0001"]), comp("c", ["0003"]), comp("a2", ["0002"])]
+    cache_path = tmp_path / "cache.json"
+    matrix = matchupMatrix(comps, seeds=1, cache_path=cache_path)
+    # a 与 a2 是同一阵容，不需要模拟
+    assert executor.submitted == 3
+    for i in range(len(comps)):
+        assert matrix[i][i] is None
+        for j in range(len(comps)):
+            if i != j:
+                assert matrix[i][j] + matrix[j][i] == pytest.approx(1)
+    assert matrix[0][3] == 0.5 and matrix[0][1] == matrix[3][1]
+
+    assert matchupMatrix(comps, seeds=1, cache_path=cache_path) == matrix
+    assert executor.submitted == 3
+    # 场次或规则配置变化时重新模拟
+    matchupMatrix(comps, seeds=2, cache_path=cache_path)
+    assert executor.submitted == 6
+    rules = tmp_path / "keyword_config.json"
+    rules.write_text("{}", encoding="utf-8")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(rulesDigest, "__defaults__", ([rules],))
+        matchupMatrix(comps, seeds=1, cache_path=cache_path)
+    assert executor.submitted == 9
+
+
+def test_matrix_without_cache_does_not_write(tmp_path, executor, monkeypatch):
+    monkeypatch.setattr(matchup, "CACHE_PATH", tmp_path / "cache.json")
+    matchupMatrix([comp("a", ["0002"]), comp("b", ["0001"])], seeds=1, cache_path=None)
+    assert not (tmp_path / "cache.json").exists()
+
+
+def test_play_pairing_does_not_touch_the_global_event_manager(monkeypatch):
+    broadcasts = []
+    monkeypatch.setattr(util.em, "broadcast", lambda *args, **kwargs: broadcasts.append(args))
+    monkeypatch.setattr(util.em, "register", lambda *args, **kwargs: broadcasts.append(args))
+    res = playPairing(comp("a", ["0002", "0003"]), comp("b", ["0001"]), 2)
+    assert sum(res.values()) == 4
+    assert broadcasts == []
+    assert util.em.listenerCount() == {}
+
+
+def test_grid_from_composition_uses_given_events():
+    events = EventManager()
+    grid = gridFromComposition(comp("a", ["0002", None, "0003"]), events)
+    chars = [c for c in grid.grid["front"].entities if c is not None]
+    assert [c.getAttr("info.id") for c in chars] == ["0002", "0003"]
+    assert all(c.events is events for c in chars)
@@ -0,0 +1,133 @@
+import gc
+
+import pytest
+
+from card_pool import CardPool
+from entity import Character
+from game import Player
+from lobby import Lobby
+from policy import (Action, END_ACTION, FetterPolicy, GreedyValuePolicy, Policy, StateView, UnitInfo,
+                    applyAction)
+from util import EventManager
+
+
+@pytest.fixture
+def player() -> Player:
+    player = Player(player_id=1, events=EventManager())
+    player.setAttr("money", 100)
+    return player
+
+
+def state(player: Player) -> tuple:
+    return (
+        player.getAttr("money"),
+        list(player.shop.characters.entities),
+        list(player.shop.characters.locked),
+        list(player.characters.entities),
+        {name: list(row.entities) for name, row in player.team.grid.items()},
+    )
+
+
+@pytest.mark.parametrize("action", [
+    (), [], "lock", None, ("fly",),
+    ("lock", 0), ("lock", -1), ("lock", 7), ("lock", 100), ("lock",), ("lock", "1"), ("lock", True), ("lock", 1.0),
+    ("unlock", 0), ("unlock", 7),
+    ("buy", 0), ("buy", 7), ("buy",), ("buy", None),
+    ("sell", 0), ("sell", 11), ("sell", 1),
+    ("place", 1, "front"), ("place", 1, "nowhere", 1), ("place", 1, "front", 0), ("place", 1, "front", 9),
+    ("place", 1, ["front"], 1), ("place", 99, "front", 1), ("place", 1, "front", 1),
+])
+def test_invalid_actions_are_rejected_without_side_effects(player, action):
+    before = state(player)
+    assert applyAction(player, action) is False
+    assert state(player) == before
+
+
+def test_lock_and_unlock_only_the_given_slot(player):
+    assert applyAction(player, (Action.LOCK, 6))
+    assert player.shop.characters.locked == [False] * 5 + [True]
+    assert applyAction(player, [Action.UNLOCK, 6])
+    assert player.shop.characters.locked == [False] * 6
+
+
+def test_buy_place_sell(player):
+    assert applyAction(player, (Action.BUY, 2))
+    char = player.characters.entities[0]
+    assert applyAction(player, (Action.PLACE, 1, "middle", 2))
+    assert player.team.grid["middle"].entities[1] is char
+    assert player.characters.entities[0] is None
+    # 位置已被占用
+    assert applyAction(player, (Action.BUY, 3))
+    assert not applyAction(player, (Action.PLACE, 1, "middle", 2))
+    money = player.getAttr("money")
+    assert applyAction(player, (Action.SELL, 1))
+    assert player.getAttr("money") > money
+
+
+def test_buy_fails_when_bench_is_full(player):
+    player.characters.entities = [Character.byId("0002", player.events) for _ in player.characters.entities]
+    assert not applyAction(player, (Action.BUY, 1))
+
+
+def test_upgrade_stops_at_max_grade(player):
+    player.shop.grade = CardPool.MAX_GRADE
+    assert not applyAction(player, (Action.UPGRADE,))
+    assert player.shop.grade == CardPool.MAX_GRADE
+
+
+def test_greedy_policy_respects_max_grade(player):
+    player.shop.grade = CardPool.MAX_GRADE
+    view = StateView(player, round=40)
+    assert view.max_grade == CardPool.MAX_GRADE
+    assert GreedyValuePolicy().decide(view)[0] != Action.UPGRADE
+
+
+def test_policy_play_stops_on_end_and_on_failure(player):
+    class Scripted(Policy):
+        def __init__(self, actions):
+            self.actions = iter(actions)
+
+        def decide(self, view):
+            return next(self.actions, END_ACTION)
+
+    assert Scripted([(Action.LOCK, 1), (Action.LOCK, 2), END_ACTION, (Action.LOCK, 3)]).play(player) == 2
+    assert Scripted([(Action.LOCK, 4), (Action.LOCK, 0), (Action.LOCK, 5)]).play(player) == 1
+    assert player.shop.characters.locked == [True, True, False, True, False, False]
+
+
+@pytest.mark.parametrize("policy", [GreedyValuePolicy(), FetterPolicy()], ids=["greedy", "fetter"])
+def test_policies_play_full_games(monkeypatch, policy):
+    monkeypatch.setattr(Lobby, "MAX_ROUNDS", 10)
+    lobby = Lobby([policy, policy], player_num=4, seed=2)
+    res = lobby.run()
+    assert res["rounds"] == 10 or len(lobby.alivePlayers()) <= 1
+    placed = sum(char is not None for p in lobby.players for row in p.team.grid.values() for char in row.entities)
+    assert placed > 0
+
+
+def test_fetter_policy_buys_target_fetter(player):
+    events = player.events
+    owned = Character({"id": "0002", "price": 1, "fetter": ["武当"]}, events)
+    player.characters.entities[0] = owned
+    shop = player.shop.characters.entities
+    shop[:] = [Character({"id": "0003", "price": 1, "attack_power": 99}, events) for _ in shop]
+    shop[4] = Character({"id": "0004", "price": 1, "fetter": ["武当"]}, events)
+    view = StateView(player)
+    # 先上阵，再买同羁绊的角色
+    assert FetterPolicy().decide(view)[0] == Action.PLACE
+    player.characters.entities[0] = None
+    player.team.setCharacter(owned, "front")
+    assert FetterPolicy().decide(view) == (Action.BUY, 5)
+
+
+def test_unit_info_is_per_character():
+    a = Character({"id": "0002", "price": 1, "attack_power": 3})
+    b = Character({"id": "0002", "price": 4, "attack_power": 7})
+    assert UnitInfo.of(a) is UnitInfo.of(a)
+    assert (UnitInfo.of(a).price, UnitInfo.of(b).price) == (1, 4)
+    gc.collect()
+    size = len(UnitInfo._cache)
+    del a, b
+    gc.collect()
+    # 角色被回收后缓存随之释放
+    assert len(UnitInfo._cache) == size - 2
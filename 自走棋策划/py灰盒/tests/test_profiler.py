@@ -0,0 +1,100 @@
+import sys
+import types
+
+import pytest
+
+import simulator
+from entity import Character
+from grid import GameBoard, GameGrid
+from profiler import Profiler
+from util import EventManager, seededRandom
+
+
+@pytest.fixture
+def fake_module(monkeypatch):
+    module = types.ModuleType("fake_hot")
+
+    def inner(x):
+        return x + 1
+
+    def outer(x):
+        return module.inner(x) + module.inner(x)
+
+    def boom():
+        raise RuntimeError("boom")
+
+    class Worker:
+        def work(self):
+            return module.inner(1)
+
+    module.inner, module.outer, module.boom, module.Worker = inner, outer, boom, Worker
+    monkeypatch.setitem(sys.modules, "fake_hot", module)
+    return module
+
+
+HOOKS = [("fake_hot", "inner", "inner"), ("fake_hot", "outer", "outer"),
+         ("fake_hot", "boom", "boom"), ("fake_hot", "Worker.work", "work")]
+
+
+def test_counts_and_self_time(fake_module):
+    profiler = Profiler(HOOKS)
+    with profiler:
+        assert fake_module.outer(1) == 4
+        assert fake_module.Worker().work() == 2
+    assert {phase: stat[0] for phase, stat in profiler.calls.items()} == {"inner": 3, "outer": 1, "work": 1}
+    for count, cum, own in profiler.calls.values():
+        assert 0 <= own <= cum
+    assert set(profiler.stacks) == {("outer",), ("outer", "inner"), ("work",), ("work", "inner")}
+    assert sum(profiler.stacks.values()) == sum(stat[2] for stat in profiler.calls.values())
+
+
+def test_disable_restores_originals(fake_module):
+    originals = (fake_module.inner, fake_module.outer, fake_module.Worker.__dict__["work"])
+    profiler = Profiler(HOOKS)
+    profiler.enable()
+    profiler.enable()
+    assert fake_module.inner is not originals[0]
+    assert fake_module.inner.__wrapped__ is originals[0]
+    profiler.disable()
+    profiler.disable()
+    assert (fake_module.inner, fake_module.outer, fake_module.Worker.__dict__["work"]) == originals
+    # 关闭后不再计数，已有数据保留
+    fake_module.outer(1)
+    assert profiler.calls == {}
+    with profiler:
+        fake_module.inner(1)
+    fake_module.inner(1)
+    assert profiler.calls["inner"][0] == 1
+    profiler.reset()
+    assert profiler.calls == {} and profiler.stacks == {}
+
+
+def test_exceptions_are_recorded_and_unwind_the_stack(fake_module):
+    profiler = Profiler(HOOKS)
+    with pytest.raises(RuntimeError):
+        with profiler:
+            fake_module.boom()
+    assert not profiler.enabled
+    assert profiler.calls["boom"][0] == 1
+    assert profiler._stack == []
+
+
+def test_default_hooks_cover_a_battle(tmp_path):
+    original = simulator.attackSelector
+    events = EventManager()
+    red, blue = GameGrid(), GameGrid()
+    red.setCharacter(Character.byId("0002", events), "front")
+    blue.setCharacter(Character.byId("0001", events), "front")
+    profiler = Profiler()
+    with profiler, seededRandom(0):
+        simulator.attackSimulator(GameBoard(red, blue, events=events), headless=True)
+    assert simulator.attackSelector is original
+    assert {"generateActionList", "attackSelector", "attack", "Character.getHurt"} <= set(profiler.calls)
+    assert profiler.summary().splitlines()[0].startswith("phase")
+
+    path = tmp_path / "battle.folded"
+    profiler.saveFlamegraph(path)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == len(profiler.stacks)
+    stack, own = lines[0].rsplit(" ", 1)
+    assert tuple(stack.split(";")) in profiler.stacks and int(own) >= 0
@@ -0,0 +1,131 @@
+import random
+import struct
+
+import pytest
+
+import savegame
+from card_pool import CardPool
+from entity import Character
+from game import MainGame, Player
+from util import EventManager
+
+
+def _ids(entities) -> list:
+    return [char.getAttr("info.id") if char is not None else None for char in entities]
+
+
+def snapshot(player: Player) -> dict:
+    """存档应当保存的全部玩家状态"""
+    pool = player.shop.pool
+    return {
+        "id": player.getAttr("id"),
+        "money": player.getAttr("money"),
+        "max.hp": player.getAttr("max.hp"),
+        "current.hp": player.getAttr("current.hp"),
+        "grade": player.shop.grade,
+        "shop": _ids(player.shop.characters.entities),
+        "locked": list(player.shop.characters.locked),
+        "bench": _ids(player.characters.entities),
+        "team_id": player.team.team_id,
+        "team": {row: _ids(player.team.grid[row].entities) for row in savegame.GRID_ROWS},
+        "pool": {char_id: pool.remaining(char_id) for char_id in pool.index},
+    }
+
+
+@pytest.fixture
+def game() -> MainGame:
+    """打过几回合的一局游戏：买了角色、上了阵、升了商店、锁了格子"""
+    game = MainGame()
+    player = game.player
+    player.setAttr("money", 50)
+    player.setAttr("current.hp", 73)
+    player.shop.buy(1)
+    player.shop.buy(2)
+    char = player.characters.entities[0]
+    assert player.removeCharacter(char)
+    player.team.setCharacter(char, "front")
+    player.team.setCharacter(Character.byId("0003"), "back", 2)
+    player.shop.upgrade()
+    player.shop.lock(3)
+    game.game_stage = (2, 3)
+    return game
+
+
+def test_roundtrip_restores_player_state(game):
+    loaded = savegame.loads(savegame.dumps(game))
+    assert loaded.game_stage == (2, 3)
+    assert snapshot(loaded.player) == snapshot(game.player)
+
+
+def test_dumps_is_stable_across_roundtrip(game):
+    data = savegame.dumps(game)
+    assert savegame.dumps(savegame.loads(data)) == data
+
+
+def test_save_and_load_file(game, tmp_path):
+    path = tmp_path / "saves" / "auto.sav"
+    game.save(path)
+    assert not (tmp_path / "saves" / "auto.sav.tmp").exists()
+    loaded = MainGame.load(path)
+    assert loaded.autosave_path == path
+    assert snapshot(loaded.player) == snapshot(game.player)
+
+
+@pytest.mark.parametrize("player_id", [7, "玩家一"])
+def test_player_roundtrip_keeps_id_type(player_id):
+    player = Player(player_id=player_id)
+    pool = CardPool()
+    loaded = savegame.loadPlayer(savegame.dumpPlayer(player), pool=pool)
+    assert loaded.shop.pool is pool
+    assert snapshot(loaded) == snapshot(player)
+
+
+def _header(magic=savegame.SAVE_MAGIC, version=savegame.SAVE_VERSION, kind=savegame.KIND_GAME) -> bytes:
+    return struct.pack("<4sHB", magic, version, kind)
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: b"",
+    lambda data: data[:len(data) // 2],
+    lambda data: data + b"\x00",
+    lambda data: _header(magic=b"XXXX") + data[7:],
+    lambda data: _header(version=savegame.SAVE_VERSION + 1) + data[7:],
+    lambda data: _header(kind=savegame.KIND_PLAYER) + data[7:],
+], ids=["empty", "truncated", "trailing", "magic", "version", "kind"])
+def test_corrupt_data_raises_value_error(game, corrupt):
+    with pytest.raises(ValueError):
+        savegame.loads(corrupt(savegame.dumps(game)))
+
+
+def test_loading_does_not_broadcast_character_changes(game):
+    data = savegame.dumps(game)
+    events = EventManager()
+    changes = []
+    events.register("onAttrChange", lambda **context: changes.append(context))
+    player = savegame.loadPlayer(savegame.dumpPlayer(game.player), events=events)
+    assert [c for c in changes if "character" in c] == []
+    # 站位信息和 GameGrid.setCharacter 记录的一致
+    char = player.team.grid["back"].entities[1]
+    assert char.getAttr("info.position") == ("back", 2)
+    assert char.getAttr("info.team_id") == player.team.team_id == game.player.team.team_id
+    assert snapshot(savegame.loads(data).player) == snapshot(game.player)
+
+
+def test_loading_into_a_shared_pool_does_not_draw():
+    pool = CardPool(rng=random.Random(1))
+    other = Player(pool=pool)
+    data = savegame.dumpPlayer(other)
+    counts = {char_id: pool.remaining(char_id) for char_id in pool.index}
+    rng_state = pool.rng.getstate()
+    loaded = savegame.loadPlayer(data, pool=pool)
+    assert pool.rng.getstate() == rng_state
+    assert {char_id: pool.remaining(char_id) for char_id in pool.index} == counts
+    assert _ids(loaded.shop.characters.entities) == _ids(other.shop.characters.entities)
+
+
+def test_player_without_shop_refresh_keeps_pool_full():
+    pool = CardPool()
+    total = sum(pool.tierRemaining(tier) for tier in pool.tier_ids)
+    player = Player(pool=pool, refresh_shop=False)
+    assert player.shop.characters.entities == [None] * 6
+    assert sum(pool.tierRemaining(tier) for tier in pool.tier_ids) == total
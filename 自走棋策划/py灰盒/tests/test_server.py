@@ -0,0 +1,107 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import server
+from lobby import Lobby
+from server import GameServer, TcpClient, scriptedClient
+
+
+@pytest.fixture
+def game_server():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield GameServer(player_num=2, executor=executor, seed=0)
+    executor.shutdown()
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=30))
+
+
+BAD_ACTIONS = [["lock", 100], ["lock", 0], ["lock", "1"], ["buy", 7], ["sell", -1], ["place", 1, "front"],
+               ["place", 1, "nowhere", 1], ["fly"], ["end"], [], "lock", {"op": "lock"}, None, 3]
+
+
+def test_bad_requests_keep_the_connection(game_server):
+    async def scenario():
+        client = game_server.connect()
+        for request in ([1], "join", None, 3.5):
+            res = await client.request(request)
+            assert res["ok"] is False and res["error"]
+        assert (await client.request({"op": "act", "action": ["buy", 1]}))["ok"] is False
+        assert (await client.request({"op": "fly"}))["ok"] is False
+
+        other = game_server.connect()
+        assert (await client.request({"op": "join"}))["ok"]
+        assert (await client.request({"op": "join"}))["ok"] is False
+        assert (await other.request({"op": "join"}))["ok"]
+        state = (await client.request({"op": "wait"}))["state"]
+        for action in BAD_ACTIONS:
+            res = await client.request({"op": "act", "action": action})
+            assert res["ok"] is False, action
+            assert res["state"] == state
+        res = await client.request({"op": "act", "action": ["lock", 2]})
+        assert res["ok"] and res["state"]["locked"] == [False, True, False, False, False, False]
+        assert (await client.request({"op": "stats"}))["ok"]
+        await client.close()
+        await other.close()
+    run(scenario())
+
+
+def test_unexpected_errors_are_reported(game_server, monkeypatch):
+    def broken(player, action):
+        raise IndexError("list index out of range")
+    monkeypatch.setattr(server, "applyAction", broken)
+
+    async def scenario():
+        clients = [game_server.connect() for _ in range(2)]
+        for client in clients:
+            await client.request({"op": "join"})
+        await clients[0].request({"op": "wait"})
+        res = await clients[0].request({"op": "act", "action": ["buy", 1]})
+        assert res["ok"] is False and "IndexError" in res["error"]
+        assert (await clients[0].request({"op": "state"}))["ok"]
+        for client in clients:
+            await client.close()
+    run(scenario())
+
+
+def test_stream_survives_bad_lines(game_server):
+    async def scenario():
+        tcp_server = await game_server.start("127.0.0.1", 0)
+        host, port = tcp_server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            lines = [b"[1]", b"not json", b"\xff\xfe", b'"text"', b'{"op": "join"}',
+                     b'{"op": "act", "action": ["lock", 100]}', b'{"op": "stats"}']
+            responses = []
+            for line in lines:
+                writer.write(line + b"\n")
+                await writer.drain()
+                responses.append(json.loads(await reader.readline()))
+            assert [r["ok"] for r in responses] == [False, False, False, False, True, False, True]
+            assert all(r.get("error") for r in responses if not r["ok"])
+        finally:
+            writer.close()
+            await writer.wait_closed()
+            await game_server.stop()
+    run(scenario())
+
+
+def test_scripted_clients_finish_a_game(game_server, monkeypatch):
+    monkeypatch.setattr(Lobby, "MAX_ROUNDS", 4)
+
+    async def scenario():
+        tcp_server = await game_server.start("127.0.0.1", 0)
+        host, port = tcp_server.sockets[0].getsockname()[:2]
+        try:
+            clients = [game_server.connect(), await TcpClient.open(host, port)]
+            return await asyncio.gather(*(scriptedClient(client) for client in clients))
+        finally:
+            await game_server.stop()
+    results = run(scenario())
+    assert all(r["result"]["over"] for r in results)
+    assert sorted(r["player"] for r in results) == [1, 2]
+    assert game_server.stats()["finished"] == 1 and game_server.stats()["failed"] == 0
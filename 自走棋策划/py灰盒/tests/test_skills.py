@@ -0,0 +1,89 @@
+import pytest
+
+from effect import Effect
+from entity import Character
+from skills import SkillEngine
+from util import EventManager
+
+
+def skill(skill_id: str, trigger: str, effect: str, condition: list = None) -> dict:
+    return {"id": skill_id, "type": "passive", "trigger": trigger, "condition": condition or [],
+            "effect": [{"type": "modify_attr", "param": effect, "mode": "self"}]}
+
+
+@pytest.fixture
+def events() -> EventManager:
+    return EventManager()
+
+
+def make(events, char_id: str, *skills, hp: int = 10) -> Character:
+    return Character({"id": char_id, "health_points": hp, "skills": list(skills)}, events)
+
+
+def test_one_listener_per_trigger(events):
+    chars = [make(events, str(i), skill("a", "onAttack", "ATK+1"), skill("b", "onTurnStart", "ATK+1"))
+             for i in range(5)]
+    engine = SkillEngine(chars, events)
+    assert events.listenerCount("onAttack") == 1
+    assert events.listenerCount("onTurnStart") == 1
+    engine.dispose()
+    assert events.listenerCount() == {}
+
+
+def test_subject_events_trigger_only_the_subject(events):
+    a = make(events, "a", skill("s", "onAttack", "ATK+1"))
+    b = make(events, "b", skill("s", "onAttack", "ATK+1"))
+    SkillEngine([a, b], events)
+    events.broadcast("onAttack", source=a, target=b)
+    assert (a.getAttr("current.atk"), b.getAttr("current.atk")) == (2, 1)
+
+
+def test_global_events_trigger_every_owner(events):
+    chars = [make(events, str(i), skill("s", "onTurnStart", "ATK+1")) for i in range(3)]
+    SkillEngine(chars, events)
+    events.broadcast("onTurnStart", turn_count=1)
+    assert [c.getAttr("current.atk") for c in chars] == [2, 2, 2]
+
+
+def test_conditions_and_dead_owners_are_skipped(events):
+    needs_energy = skill("s", "onTurnStart", "ATK+1", [{"type": "consume_energy", "param": {"energy": 2}}])
+    poor = make(events, "poor", needs_energy)
+    rich = make(events, "rich", needs_energy)
+    rich.setAttr("current.energy", 2)
+    dead = make(events, "dead", skill("s", "onTurnStart", "ATK+1"))
+    dead.setAttr("current.hp", 0)
+    SkillEngine([poor, rich, dead], events)
+    events.broadcast("onTurnStart", turn_count=1)
+    assert [c.getAttr("current.atk") for c in (poor, rich, dead)] == [1, 2, 1]
+
+
+def test_skill_does_not_retrigger_itself(events):
+    # 技能效果再次触发 onAttrChange 时不会重复结算
+    char = make(events, "a", skill("s", "onAttrChange", "ATK+1"))
+    released = []
+    events.register("onSkillReleased", lambda **context: released.append(context["skill"]), weak=False)
+    SkillEngine([char], events)
+    char.setAttr("current.hp", 9)
+    assert char.getAttr("current.atk") == 2
+    assert len(released) == 1
+
+
+def test_dispose_stops_triggering(events):
+    char = make(events, "a", skill("s", "onTurnStart", "ATK+1"))
+    SkillEngine([char], events).dispose()
+    events.broadcast("onTurnStart", turn_count=1)
+    assert char.getAttr("current.atk") == 1
+
+
+@pytest.mark.parametrize("param, hp", [("HP+5", 10), ("HP+1", 9), ("HP-3", 5), ("HP-50%m", 3)])
+def test_modify_attr_adds_and_clamps(events, param, hp):
+    char = make(events, "a", hp=10)
+    char.setAttr("current.hp", 8)
+    char.applyEffect(Effect.byDict({"type": "modify_attr", "param": param}))
+    assert char.getAttr("current.hp") == hp
+
+
+def test_modify_attr_on_uncapped_attr(events):
+    char = make(events, "a")
+    char.applyEffect(Effect.byDict({"type": "modify_attr", "param": "ATK+5"}))
+    assert char.getAttr("current.atk") == 6
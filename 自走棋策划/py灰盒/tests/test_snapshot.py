@@ -0,0 +1,87 @@
+from battle_cache import gridState
+from effect import Buff, Effect
+from entity import Character
+from grid import GameBoard, GameGrid
+from simulator import attackSimulator
+from util import EventManager, seededRandom
+
+
+def make_board(events: EventManager) -> GameBoard:
+    red, blue = GameGrid(), GameGrid()
+    red.setCharacter(Character({"id": "0002", "attack_power": 3, "health_points": 10}, events), "front")
+    red.setCharacter(Character({"id": "0003", "attack_power": 2, "health_points": 8}, events), "back")
+    blue.setCharacter(Character({"id": "0001", "attack_power": 1, "health_points": 25}, events), "front")
+    return GameBoard(red, blue, events=events)
+
+
+def test_character_round_trip():
+    events = EventManager()
+    char = Character({"id": "0002", "attack_power": 3, "health_points": 10}, events)
+    char.addStatus("stun")
+    state = char.snapshot()
+
+    char.setAttr("current.hp", 1)
+    char.setAttr("base.atk", 99)
+    char.removeStatus("stun")
+    char.addStatus("poison")
+    char.buffs.addBuff(Buff("rage", [Effect.byDict({"type": "modify_attr", "param": "ATK+1"})], duration=2))
+
+    for _ in range(2):
+        char.restore(state)
+        assert char.snapshot() == state
+        assert char.getAttr("current.hp") == 10 and char.getAttr("base.atk") == 3
+        assert char.status == ["stun"] and char.buffs.buffs == []
+        # 恢复后的修改不影响快照
+        char.setAttr("current.hp", 2)
+
+
+def test_restore_does_not_broadcast():
+    events = EventManager()
+    char = Character({"id": "0002", "health_points": 10}, events)
+    state = char.snapshot()
+    char.setAttr("current.hp", 1)
+    changes = []
+    events.register("onAttrChange", lambda **context: changes.append(context))
+    char.restore(state)
+    assert changes == []
+
+
+def test_buff_layers_and_duration_round_trip():
+    char = Character({"id": "0002"}, EventManager())
+    buff = Buff("rage", [Effect.byDict({"type": "modify_attr", "param": "ATK+1"})], max_layer=3, duration=3)
+    char.buffs.addBuff(buff)
+    state = char.snapshot()
+    buff.layer, buff.duration = 3, 1
+    char.buffs.update()
+    char.restore(state)
+    assert char.buffs.buffs == [buff]
+    assert (buff.layer, buff.duration) == (1, 3)
+
+
+def test_grid_restores_positions():
+    events = EventManager()
+    grid = make_board(events).red_group
+    state = grid.snapshot()
+    front = grid.grid["front"].entities[0]
+    grid.grid["front"].removeCharacter(front)
+    grid.setCharacter(Character({"id": "0004"}, events), "middle")
+    grid.restore(state)
+    assert grid.grid["front"].entities[0] is front
+    assert grid.grid["middle"].entities == [None] * 3
+    assert grid.snapshot() == state
+
+
+def test_board_replays_the_same_battle():
+    board = make_board(EventManager())
+    state = board.snapshot()
+    before = (gridState(board.red_group), gridState(board.blue_group))
+
+    results = []
+    for _ in range(3):
+        board.restore(state)
+        assert (gridState(board.red_group), gridState(board.blue_group)) == before
+        with seededRandom(4):
+            winner = attackSimulator(board, headless=True)
+        results.append((winner, gridState(board.red_group), gridState(board.blue_group)))
+    assert results[0][1:] != before
+    assert results.count(results[0]) == 3
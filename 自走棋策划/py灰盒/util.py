@@ -15,14 +15,21 @@ EMPTY_CHARACTER_CONFIG = {
     ]
 }
 
-from rich.console import Console
-import uuid, os
+import os
+from contextlib import contextmanager
 from datetime import datetime
-import weakref, inspect
+from pathlib import Path
+from types import MethodType
 
-_term_console = Console()
+# rich 只在第一次输出到终端时导入，避免拖慢无界面模拟进程的启动
+_term_console = None
 
-from pathlib import Path
+def _console():
+    global _term_console
+    if _term_console is None:
+        from rich.console import Console
+        _term_console = Console()
+    return _term_console
 
 # 当前正在执行的 .py 文件绝对目录
 BASE_DIR = Path(__file__).resolve().parent
@@ -61,10 +68,14 @@ class Entry:
 class Log:
     def __init__(self):
         self.entries: list[Entry] = []
+        # 关闭后不输出也不记录日志，用于批量模拟
+        self.enabled = True
 
     def console(self, content: str, info_type: str = "INFO") -> bool:
+        if not self.enabled:
+            return False
         entry = Entry(content, info_type)
-        _term_console.print(entry.rich_str())   # ① 终端走 rich
+        _console().print(entry.rich_str())      # ① 终端走 rich
         self.addEntry(entry)                    # ② 文件走 __str__
         return True
     
@@ -100,6 +111,23 @@ def loadJsonConfig(file_path: str) -> dict:
     with open(file_path, 'r', encoding='utf-8') as file:
         return json.load(file)
 
+@contextmanager
+def seededRandom(seed=None):
+    """
+    在代码块内用 seed 重置全局 random，结束后恢复原来的状态，调用方之后的随机数不受影响
+    :param seed: 为 None 时既不重置也不恢复
+    """
+    if seed is None:
+        yield
+        return
+    import random
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
 def loadCharacterAttrs(char_id: str) -> dict:
     config = loadJsonConfig(BASE_DIR / 'character_config.json')
     return config.get(char_id, EMPTY_CHARACTER_CONFIG)
@@ -148,13 +176,43 @@ def mergeDicts(dict_list: list) -> dict:
     return merged_dict
 
 
+# weakref.WeakMethod，第一次注册弱引用监听器时才导入；在此之前不会有 WeakMethod 类型的监听器
+_WeakMethod = None
+
+def _listenerRef(callback, weak: bool, on_dead):
+    """
+    绑定方法包装为 WeakMethod，对象被回收时调用 on_dead(ref)；其他可调用对象原样返回
+    """
+    global _WeakMethod
+    if weak and isinstance(callback, MethodType):
+        if _WeakMethod is None:
+            from weakref import WeakMethod
+            _WeakMethod = WeakMethod
+        return _WeakMethod(callback, on_dead)
+    return callback
+
+def _resolve(entry):
+    return entry() if entry.__class__ is _WeakMethod else entry
+
+def _prune(listeners: list, ref):
+    try:
+        listeners.remove(ref)
+    except ValueError:
+        pass
+
+
 class EventManager:
 
+    # 批处理期间合并的事件：同一对象同一属性的多次变化只在批处理结束时广播一次
+    COALESCED_EVENTS = {"onAttrChange"}
+
     def __init__(self):
         # 事件监听器字典，结构：{事件名: [回调函数1, 回调函数2, ...]}
         self.listeners = {}
-
-        log.console("事件管理器初始化成功。", "INFO")
+        # 批处理嵌套层数，大于 0 时合并 COALESCED_EVENTS 中的事件
+        self._batch_depth = 0
+        # 待广播的合并事件，结构：{(事件名, 对象id, 属性名): (事件名, context)}，按首次变化的顺序保存
+        self._pending = {}
 
     def on(self, event_name: str):
         """
@@ -166,15 +224,19 @@ class EventManager:
             return callback
         return decorator
 
-    def register(self, event_name: str, callback):
+    def register(self, event_name: str, callback, weak: bool = True):
         """
         注册事件监听器。
+        绑定方法默认以弱引用保存，对象被回收后监听器自动移除，不需要手动注销；
+        普通函数和 lambda 始终以强引用保存。
         :param event_name: 事件名称（字符串）
         :param callback:   回调函数，函数签名需匹配事件参数
+        :param weak:       为 False 时绑定方法也以强引用保存
         """
         if event_name not in self.listeners:
             self.listeners[event_name] = []
-        self.listeners[event_name].append(callback)
+        listeners = self.listeners[event_name]
+        listeners.append(_listenerRef(callback, weak, lambda ref: _prune(listeners, ref)))
 
         log.console(f"Registered event '{event_name}' with callback {callback.__name__}.", "INFO")
 
@@ -184,8 +246,23 @@ class EventManager:
         :param event_name: 事件名称
         :param callback:   需移除的回调函数
         """
-        if event_name in self.listeners:
-            self.listeners[event_name].remove(callback)
+        listeners = self.listeners.get(event_name)
+        if not listeners:
+            return
+        for i, entry in enumerate(listeners):
+            if _resolve(entry) == callback:
+                del listeners[i]
+                return
+
+    def listenerCount(self, event_name: str = None) -> int | dict:
+        """
+        当前存活的监听器数量
+        :param event_name: 事件名称，为空时返回所有事件的数量
+        :return: 监听器数量，或 {事件名: 监听器数量}
+        """
+        if event_name is not None:
+            return sum(1 for entry in self.listeners.get(event_name, ()) if _resolve(entry) is not None)
+        return {name: self.listenerCount(name) for name in self.listeners if self.listeners[name]}
 
     def broadcast(self, event_name: str, **context):
         """
@@ -193,32 +270,85 @@ class EventManager:
         :param event_name: 事件名称
         :param context:    任意关键字参数
         """
+        if self._batch_depth and event_name in EventManager.COALESCED_EVENTS:
+            self._defer(event_name, context)
+            return
+        self._dispatch(event_name, context)
+
+    __call__ = broadcast
+
+    def _dispatch(self, event_name: str, context: dict):
         log.console(f"事件 {event_name} 触发了，内容：{context}", "EVENT")
 
-        if event_name in self.listeners:
-            for callback in self.listeners[event_name]:
-                callback(**context)
+        listeners = self.listeners.get(event_name)
+        if listeners:
+            # 复制一份，监听器可以在回调中注销自己
+            for entry in tuple(listeners):
+                callback = entry() if entry.__class__ is _WeakMethod else entry
+                if callback is not None:
+                    callback(**context)
 
-    __call__ = broadcast
+    def _defer(self, event_name: str, context: dict):
+        """
+        暂存一个合并事件，同一对象同一属性保留第一次的 before 和最后一次的 after
+        """
+        subject = context.get("character", context.get("player"))
+        key = (event_name, id(subject), context.get("attr"))
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = (event_name, context)
+        else:
+            pending[1]["after"] = context.get("after")
+
+    @contextmanager
+    def batch(self):
+        """
+        批处理作用域，用法：
+            with em.batch():
+                ...
+        作用域内的属性变化事件被合并，在最外层作用域结束时统一广播；最终值与初始值相同的变化不再广播
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def flush(self):
+        """
+        立即广播所有暂存的合并事件
+        """
+        pending, self._pending = self._pending, {}
+        for event_name, context in pending.values():
+            if context.get("before") != context.get("after"):
+                self._dispatch(event_name, context)
 
 class Signal():
+    """
+    单个事件的信号，绑定方法以弱引用保存，对象被回收后自动断开
+    """
     def __init__(self):
-        self._slots = weakref.WeakSet()
+        self._slots = []
 
-    def connect(self, slot):
-        # 如果是绑定方法，包装成弱引用
-        if inspect.ismethod(slot):
-            self._slots.add(weakref.WeakMethod(slot))
-        else:
-            self._slots.add(slot)
+    def connect(self, slot, weak: bool = True):
+        self._slots.append(_listenerRef(slot, weak, lambda ref: _prune(self._slots, ref)))
 
     def disconnect(self, slot):
-        if slot in self._slots:
-            self._slots.remove(slot)
+        for i, entry in enumerate(self._slots):
+            if _resolve(entry) == slot:
+                del self._slots[i]
+                return
 
     def emit(self, *args, **kwargs):
-        for slot in self._slots:
-            slot(*args, **kwargs)
+        for entry in tuple(self._slots):
+            slot = _resolve(entry)
+            if slot is not None:
+                slot(*args, **kwargs)
+
+    def __len__(self):
+        return len(self._slots)
 
 em = EventManager()
 